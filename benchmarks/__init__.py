@@ -0,0 +1,4 @@
+"""Performance benchmarks for rendering, combat, hit-testing and app reruns.
+
+Run ``python -m benchmarks.run`` from the repository root.
+"""
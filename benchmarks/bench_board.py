@@ -0,0 +1,32 @@
+"""Bulk position analysis on the array board"""
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.harness import Stats, measure, synthetic_game
+from realm import board as boards
+from realm import engine
+
+TERRITORIES = [None, 1000, 10000]
+BATCH = 256
+
+
+def run(quick: bool = False) -> Dict[str, Stats]:
+    results = {}
+    rng = np.random.default_rng(0)
+    for territories in TERRITORIES[:2] if quick else TERRITORIES:
+        game = synthetic_game(territories)
+        engine.start_game(game, "Red", "Blue", 1)
+        count = len(game.store)
+        game.store.load_columns(rng.integers(0, 3, count), rng.integers(1, 9, count))
+        label = "default" if territories is None else territories
+        board = boards.Board.from_store(game.store)
+        results[f"board/clone/{label}"] = measure(board.clone)
+        results[f"board/frontier/{label}"] = measure(board.frontier)
+        results[f"board/legal_moves/{label}"] = measure(lambda: board.legal_moves(1))
+        results[f"board/engine_legal_moves/{label}"] = measure(lambda: engine.legal_moves(game))
+        owner = rng.integers(0, 3, (BATCH, count)).astype(np.int8)
+        units = rng.integers(1, 9, (BATCH, count)).astype(np.int32)
+        results[f"board/evaluate_batch/{label}"] = measure(
+            lambda: boards.evaluate(owner, units, board.edges.is_hq, 1), per_call=BATCH)
+    return results
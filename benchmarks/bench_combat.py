@@ -0,0 +1,19 @@
+"""Scalar combat resolution across army sizes"""
+from typing import Dict
+
+from benchmarks.harness import Stats, measure
+from realm import engine
+from realm.dice import DiceStream
+
+ARMIES = [1, 5, 20, 100, 1000]
+
+
+def run(quick: bool = False) -> Dict[str, Stats]:
+    rng = DiceStream(0)
+    results = {}
+    for units in ARMIES[:3] if quick else ARMIES:
+        defenders = max(1, units // 2)
+        results[f"combat/neutral/{units}v{defenders}"] = measure(
+            lambda: engine.resolve_neutral_combat(units, defenders, rng=rng))
+        results[f"combat/pvp/{units}v{units}"] = measure(lambda: engine.resolve_pvp_combat(units, units, rng=rng))
+    return results
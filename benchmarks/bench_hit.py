@@ -0,0 +1,32 @@
+"""Click hit-testing against the rendered layout, as main() does per click"""
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.harness import Stats, measure, synthetic_game
+from realm.hit_index import HitIndex
+
+TERRITORIES = [None, 100, 1000, 5000]
+CLICKS = 1000
+
+
+def run(quick: bool = False) -> Dict[str, Stats]:
+    import streamlit_app as app
+
+    results = {}
+    rng = np.random.default_rng(0)
+    for territories in TERRITORIES[:3] if quick else TERRITORIES:
+        game = synthetic_game(territories)
+        label = "default" if territories is None else territories
+        layout = app.territory_layout(game, 720, 360)
+        clicks = list(zip(rng.integers(0, 720, CLICKS).tolist(), rng.integers(0, 360, CLICKS).tolist()))
+
+        def click_all():
+            for x, y in clicks:
+                layout.find(x, y)
+
+        results[f"hit/find/{label}"] = measure(click_all, per_call=CLICKS)
+        # First click after a layout change pays for building the index
+        results[f"hit/build/{label}"] = measure(
+            lambda: HitIndex(app.territory_positions(game, 720, 360)), repeat=5)
+    return results
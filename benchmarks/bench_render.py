@@ -0,0 +1,37 @@
+"""Map rendering: PIL compositing, encoding and the browser overlay rows"""
+from typing import Dict
+
+from benchmarks.harness import Stats, measure, synthetic_game
+from realm import render_cache
+
+SIZES = [(720, 360), (1440, 720)]
+TERRITORIES = [None, 100, 1000]  # None is the bundled map
+
+
+def run(quick: bool = False) -> Dict[str, Stats]:
+    import streamlit_app as app
+
+    results = {}
+    image = synthetic_game(None).game_map.image
+    for width, height in SIZES[:1] if quick else SIZES:
+        # First draw at a size in a fresh process: open the pyramid and resize from its nearest level
+        def base_map_miss():
+            render_cache.clear()
+            render_cache.get_base_map(image, width, height)
+
+        results[f"render/base_map_miss/{width}x{height}"] = measure(base_map_miss, repeat=5)
+    for territories in TERRITORIES[:2] if quick else TERRITORIES:
+        game = synthetic_game(territories)
+        label = "default" if territories is None else territories
+        for width, height in SIZES[:1] if quick else SIZES:
+            size = f"{width}x{height}"
+            results[f"render/overlays/{label}/{size}"] = measure(
+                lambda: app.create_map_with_overlays(game, width, height))
+            img, _ = app.create_map_with_overlays(game, width, height)
+            for encoding in render_cache.ENCODINGS:
+                results[f"render/encode/{encoding}/{label}/{size}"] = measure(
+                    lambda: render_cache.encode_image(img, encoding), repeat=5)
+            results[f"render/encoded_hit/{label}/{size}"] = measure(
+                lambda: app.encoded_map(game, "png", render_cache.DEFAULT_QUALITY, width, height))
+            results[f"render/client_overlay/{label}/{size}"] = measure(lambda: app.map_overlay(game, width, height))
+    return results
@@ -0,0 +1,70 @@
+"""End-to-end rerun latency of streamlit_app.py through Streamlit's AppTest harness"""
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.harness import Stats, summarize
+from realm.storage import DB_ENV
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+ROUNDS = 5
+
+
+def click(at, text: str):
+    for button in at.button:
+        if text in button.label:
+            button.click()
+            return
+    raise LookupError(f"no button containing {text!r}")
+
+
+def timed_run(at, timings: List[float]):
+    start = time.perf_counter()
+    at.run()
+    timings.append((time.perf_counter() - start) * 1e6)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def flow(samples: Dict[str, List[float]]):
+    """One game through setup, a move, an attack and reinforcement, timing each rerun"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    timed_run(at, samples["rerun/first_load"])
+    timed_run(at, samples["rerun/idle"])
+    click(at, "Goes First")
+    timed_run(at, samples["rerun/setup_start"])
+    at.session_state.game.selected_territory = "hq1"
+    timed_run(at, samples["rerun/select"])
+    click(at, "✅ Move")
+    timed_run(at, samples["rerun/move"])
+    at.session_state.game.selected_territory = "hq1"
+    at.run()
+    click(at, "⚔️ Attack")
+    timed_run(at, samples["rerun/attack"])
+    click(at, "End Turn")
+    timed_run(at, samples["rerun/end_turn"])
+    click(at, "Roll")
+    timed_run(at, samples["rerun/reinforce"])
+
+
+def run(quick: bool = False) -> Dict[str, Stats]:
+    names = ["first_load", "idle", "setup_start", "select", "move", "attack", "end_turn", "reinforce"]
+    samples: Dict[str, List[float]] = {f"rerun/{name}": [] for name in names}
+    cwd, db = os.getcwd(), os.environ.get(DB_ENV)
+    with tempfile.TemporaryDirectory() as scratch:
+        # Journals and saved games written by the app land in the scratch directory
+        os.chdir(scratch)
+        os.environ[DB_ENV] = os.path.join(scratch, "games.db")
+        try:
+            for _ in range(2 if quick else ROUNDS):
+                flow(samples)
+        finally:
+            os.chdir(cwd)
+            if db is None:
+                os.environ.pop(DB_ENV, None)
+            else:
+                os.environ[DB_ENV] = db
+    return {name: summarize(values) for name, values in samples.items()}
@@ -0,0 +1,58 @@
+"""Timing helpers and test games shared by the benchmark modules"""
+import statistics
+import time
+from typing import Any, Callable, Dict, Optional
+
+from realm import map_generator
+from realm.maps import load_map
+from realm.state import GameState
+
+Stats = Dict[str, Any]
+
+
+def measure(fn: Callable[[], Any], repeat: int = 7, min_batch_time: float = 0.05,
+            setup: Optional[Callable[[], Any]] = None, per_call: int = 1) -> Stats:
+    """Time fn() like timeit: calls are batched until a batch takes min_batch_time.
+
+    setup, when given, runs before every batch outside the timed region.
+    per_call divides the results when one fn() call covers several operations.
+    Times are reported in microseconds per operation.
+    """
+    number = 1
+    while True:
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_batch_time or number >= 1 << 20:
+            break
+        number *= 2
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number / per_call * 1e6)
+    return summarize(samples, number * per_call)
+
+
+def summarize(samples, ops_per_sample: int = 1) -> Stats:
+    ordered = sorted(samples)
+    return {
+        "median_us": statistics.median(ordered),
+        "p95_us": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "min_us": ordered[0],
+        "samples": len(ordered),
+        "ops_per_sample": ops_per_sample,
+    }
+
+
+def synthetic_game(territories: Optional[int], seed: int = 0) -> GameState:
+    """A game on the bundled map (territories=None) or on a generated map of that size"""
+    if territories is None:
+        return GameState(load_map(), log_capacity=0, seed=seed)
+    return map_generator.new_game(territories, seed)
@@ -0,0 +1,135 @@
+"""Run the benchmark suite, save the results as JSON and compare them with a baseline.
+
+Example::
+
+    python -m benchmarks.run --save-baseline        # on main, once
+    python -m benchmarks.run --fail-on-regression   # on a branch
+
+Each result records the median, p95 and minimum of several timed batches,
+in microseconds per operation. A benchmark regresses when the compared
+statistic exceeds the baseline's by more than ``--threshold`` (a ratio).
+The minimum is compared by default: it is the least sensitive to other
+load on the machine, so it flags real slowdowns rather than noise.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SUITES = ["render", "combat", "hit", "board", "rerun"]
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(BENCH_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "results", "baseline.json")
+DEFAULT_THRESHOLD = 1.25
+STATISTICS = ("min_us", "median_us", "p95_us")
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "platform": platform.platform(), "commit": commit,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def run_suites(names: List[str], quick: bool) -> Dict[str, Dict]:
+    results = {}
+    for name in names:
+        module = importlib.import_module(f"benchmarks.bench_{name}")
+        start = time.perf_counter()
+        suite = module.run(quick)
+        print(f"{name}: {len(suite)} benchmarks in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        results.update(suite)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float,
+            statistic: str = "min_us") -> List[str]:
+    """Print a comparison table; returns the names that regressed"""
+    regressions = []
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}} {statistic[:-3]:>12} {'baseline':>12} {'ratio':>7}")
+    for name, stats in results.items():
+        value = stats[statistic]
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<{width}} {format_us(value):>12} {'-':>12} {'new':>7}")
+            continue
+        ratio = value / base[statistic] if base[statistic] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{name:<{width}} {format_us(value):>12} {format_us(base[statistic]):>12} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def format_us(us: float) -> str:
+    if us >= 1e6:
+        return f"{us / 1e6:.2f} s"
+    if us >= 1e3:
+        return f"{us / 1e3:.2f} ms"
+    return f"{us:.2f} us"
+
+
+def load_results(path: str) -> Optional[Dict[str, Dict]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)["results"]
+
+
+def write_results(path: str, results: Dict[str, Dict]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"environment": environment(), "results": results}, fh, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark rendering, combat, hit-testing and app reruns")
+    parser.add_argument("suites", nargs="*", help=f"subset of {', '.join(SUITES)} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and rounds, for a fast check")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="where to write this run's JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="ratio over baseline that counts as a regression")
+    parser.add_argument("--statistic", choices=[s[:-3] for s in STATISTICS], default="min",
+                        help="which statistic to compare")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on any regression")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.suites) - set(SUITES))
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    results = run_suites(args.suites or SUITES, args.quick)
+    write_results(args.out, results)
+    baseline = load_results(args.baseline)
+    regressions = compare(results, baseline or {}, args.threshold, f"{args.statistic}_us")
+    if args.save_baseline:
+        write_results(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.2f}x", file=sys.stderr)
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
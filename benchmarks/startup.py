@@ -0,0 +1,113 @@
+"""Cold-start report: how long a fresh worker takes to serve its first rerun.
+
+Each sample is a new interpreter that imports Streamlit (an autoscaled
+worker pays this too), then runs streamlit_app.py twice through AppTest.
+The first run includes importing the app's modules and loading its assets.
+The second run is a warm rerun for comparison. Samples run with the asset
+bundle (built first if needed) and without it::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --samples 5 --out startup.json
+
+The report lists the first run's per-stage times from the app's own rerun
+timings, and the heavy optional modules that the first run imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_app.py")
+SAMPLES = 3
+DB_ENV = "REALM_GAMES_DB"  # realm.storage.DB_ENV; the probe must not import realm before it starts timing
+# Modules that only some sessions need; a cold start that imports them pays for it up front
+HEAVY_MODULES = ("pandas", "pyarrow", "matplotlib", "PIL", "multiprocessing", "streamlit_image_coordinates",
+                 "realm.ai_mcts", "realm.map_generator")
+
+
+def probe() -> Dict:
+    """One cold start in this (fresh) process; returns its timings"""
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+    imported = time.perf_counter()
+    at = AppTest.from_file(APP, default_timeout=120)
+    loaded = set(sys.modules)
+    at.run()
+    first = time.perf_counter()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules and name not in loaded]
+    stages = {s.name: s.last_ms for s in at.session_state.timings.summary()}
+    at.run()
+    second = time.perf_counter()
+    return {"import_streamlit_ms": (imported - start) * 1e3, "first_run_ms": (first - imported) * 1e3,
+            "second_run_ms": (second - first) * 1e3, "stages": stages, "heavy_modules": heavy}
+
+
+def sample(bundle: bool) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="startup-") as scratch:
+        # Journals and saved games land in the scratch directory, not the real saves database
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        env[DB_ENV] = os.path.join(scratch, "games.db")
+        if not bundle:
+            env["REALM_ASSET_BUNDLE"] = "off"
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--probe"], cwd=scratch, env=env,
+                              capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize_samples(samples: List[Dict]) -> Dict:
+    keys = ("import_streamlit_ms", "first_run_ms", "second_run_ms")
+    summary = {key: {"min": min(s[key] for s in samples), "median": statistics.median(s[key] for s in samples)}
+               for key in keys}
+    stage_names = list(samples[0]["stages"])
+    summary["stages"] = {name: statistics.median(s["stages"].get(name, 0.0) for s in samples)
+                         for name in stage_names}
+    summary["heavy_modules"] = samples[-1]["heavy_modules"]
+    return summary
+
+
+def report(results: Dict[str, Dict]):
+    for mode, summary in results.items():
+        print(f"\n{mode}")
+        for key in ("import_streamlit_ms", "first_run_ms", "second_run_ms"):
+            print(f"  {key[:-3]:<18} min {summary[key]['min']:8.1f} ms   median {summary[key]['median']:8.1f} ms")
+        print("  first run by stage (median):")
+        for name, ms in summary["stages"].items():
+            print(f"    {name:<18} {ms:8.1f} ms")
+        print(f"  heavy modules loaded: {', '.join(summary['heavy_modules']) or 'none'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the Streamlit app")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="cold starts per mode")
+    parser.add_argument("--out", help="also write the results as JSON here")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.probe:
+        print(json.dumps(probe()))
+        return
+
+    from realm import asset_bundle
+    asset_bundle.install()  # built once, as a deploy step would
+    modes = (("with asset bundle", True), ("without asset bundle", False))
+    samples: Dict[str, List[Dict]] = {mode: [] for mode, _ in modes}
+    for _ in range(args.samples):  # interleaved, so disk and CPU warm-up do not favour one mode
+        for mode, bundle in modes:
+            samples[mode].append(sample(bundle))
+    results = {mode: summarize_samples(runs) for mode, runs in samples.items()}
+    report(results)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
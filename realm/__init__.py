@@ -0,0 +1 @@
+"""Support modules for Conquest of the Realm"""
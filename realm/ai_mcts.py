@@ -0,0 +1,246 @@
+"""Monte Carlo Tree Search opponent.
+
+The search plans the acting player's movement phase one action at a time:
+an action is a move of some share of a stack to an adjacent territory (see
+``engine.legal_moves``) or ending movement. Dice make outcomes random, so
+the tree is open-loop: every iteration replays its action sequence on a
+fresh copy of the root with new dice, skipping actions that are no longer
+legal. Leaves are scored by finishing the turn and a few more with a cheap
+rollout policy, then evaluating the board.
+
+Search is root-parallel: each worker process grows its own tree under the
+same deadline and the root visit counts are summed, so more cores means
+more simulations in the same time budget.
+"""
+import math
+import os
+import random
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from realm import engine, policies
+from realm.dice import DiceStream
+from realm.state import GameState
+
+Action = Tuple  # ("move", source, target, units) or END
+END = ("end",)
+
+
+@dataclass
+class MCTSConfig:
+    turn_budget: float = 2.0  # seconds of thinking per turn, across all decisions
+    workers: Optional[int] = None  # processes; None uses every core, 0 or 1 searches in-process
+    exploration: float = 1.4
+    rollout_turns: int = 2  # full turns played by the rollout policy after the planned turn
+    rollout_policy: str = "greedy"
+    unit_shares: Tuple[float, ...] = (1.0, 0.5)  # stack fractions offered per move
+    max_actions: int = 8  # planned actions per turn before only END is offered
+
+
+class Decision(NamedTuple):
+    action: Action
+    simulations: int
+    workers: int  # searches that contributed; fewer than requested means the pool degraded
+
+
+class _Node:
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children: Dict[Action, "_Node"] = {}
+        self.visits = 0
+        self.value = 0.0
+
+
+def candidate_actions(game: GameState, depth: int, config: MCTSConfig) -> List[Action]:
+    """Actions offered at a decision, END always included"""
+    if depth >= config.max_actions:
+        return [END]
+    actions = [END]
+    for source, target, max_units in engine.legal_moves(game):
+        counts = {max(1, int(round(max_units * share))) for share in config.unit_shares}
+        actions.extend(("move", source, target, n) for n in sorted(counts))
+    return actions
+
+
+def _apply(game: GameState, action: Action):
+    if action == END:
+        engine.end_movement(game)
+    else:
+        engine.apply_move(game, *action[1:])
+
+
+def evaluate(game: GameState, player: int) -> float:
+    """Board value for player in [0, 1]: holding the enemy HQ wins outright"""
+    enemy = engine.other_player(player)
+    if game.territories[game.players[enemy].hq_territory].owner == player:
+        return 1.0
+    if game.territories[game.players[player].hq_territory].owner == enemy:
+        return 0.0
+    mine, theirs = game.player_stats(player), game.player_stats(enemy)
+    territories = max(mine.territories + theirs.territories, 1)
+    units = max(mine.units + theirs.units, 1)
+    edge = (0.6 * (mine.territories - theirs.territories) / territories
+            + 0.4 * (mine.units - theirs.units) / units)
+    return 0.5 + 0.5 * edge
+
+
+def _rollout(game: GameState, player: int, config: MCTSConfig, rng: random.Random) -> float:
+    policy = policies.POLICIES[config.rollout_policy]
+    if game.phase == 'movement':
+        # The tree stopped mid-turn: finish it with the rollout policy
+        policies.play_movement(game, policy, rng)
+        engine.end_movement(game)
+    if game.phase == 'reinforcement':
+        engine.reinforce(game)
+    for _ in range(config.rollout_turns):
+        value = evaluate(game, player)
+        if value in (0.0, 1.0):
+            return value
+        policies.play_turn(game, policy, rng)
+    return evaluate(game, player)
+
+
+def search(root: GameState, deadline: float, config: MCTSConfig, seed: int) -> Tuple[Dict[Action, List[float]], int]:
+    """Grow one tree until the wall-clock deadline; returns root stats and iteration count"""
+    player = root.current_player
+    dice = DiceStream(seed)
+    rng = random.Random(seed)
+    tree = _Node()
+    iterations = 0
+    while time.time() < deadline or iterations == 0:
+        game = root.clone(rng=dice)
+        node, path, depth = tree, [tree], 0
+        while True:
+            actions = candidate_actions(game, depth, config)
+            untried = [a for a in actions if a not in node.children]
+            if untried:
+                action = rng.choice(untried)
+                node.children[action] = _Node()
+            else:
+                log_n = math.log(node.visits)
+                action = max(actions, key=lambda a: node.children[a].value / node.children[a].visits
+                             + config.exploration * math.sqrt(log_n / node.children[a].visits))
+            node = node.children[action]
+            path.append(node)
+            _apply(game, action)
+            depth += 1
+            if untried or action == END:
+                break
+        value = _rollout(game, player, config, rng)
+        for visited in path:
+            visited.visits += 1
+            visited.value += value
+        iterations += 1
+    return {action: [child.visits, child.value] for action, child in tree.children.items()}, iterations
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def warm_up(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Start the worker pool ahead of time so process start-up never eats a turn's budget"""
+    global _pool, _pool_size
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if _pool is None or _pool_size != workers:
+        shutdown_pool()
+        # spawn, not fork: the host process (Streamlit) runs threads
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        _pool_size = workers
+        wait([_pool.submit(_ready) for _ in range(workers)])
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def choose_action(game: GameState, budget: float, config: Optional[MCTSConfig] = None) -> Decision:
+    """Best action for the current player within budget seconds, with the simulations and searches behind it.
+
+    Only a broken worker pool falls back to searching in this process (with
+    a warning); any other error raised in a worker is raised here.
+    """
+    config = config or MCTSConfig()
+    workers = config.workers if config.workers is not None else (os.cpu_count() or 1)
+    pool = None
+    if workers > 1:
+        try:
+            pool = warm_up(workers)
+        except (BrokenProcessPool, OSError) as exc:
+            shutdown_pool()
+            warnings.warn(f"MCTS worker pool unavailable, searching in-process: {exc!r}", RuntimeWarning)
+    deadline = time.time() + budget
+    root = game.clone()
+    seeds = [random.getrandbits(63) for _ in range(max(workers, 1))]
+    results = []
+    if pool is not None:
+        try:
+            futures = [pool.submit(search, root, deadline, config, seed) for seed in seeds]
+            # Allow a little slack for pickling results back; late trees are dropped
+            done, late = wait(futures, timeout=max(deadline - time.time(), 0) + min(0.25, budget / 4))
+            for future in late:
+                future.cancel()
+            results = [f.result() for f in done]
+        except BrokenProcessPool as exc:
+            shutdown_pool()
+            results = []
+            warnings.warn(f"MCTS worker pool broke, searching in-process: {exc!r}", RuntimeWarning)
+    if not results:
+        # Single worker requested, the pool failed, or every tree came back late: search in this process
+        results = [search(root, deadline, config, seeds[0])]
+    totals: Dict[Action, List[float]] = {}
+    simulations = 0
+    for stats, iterations in results:
+        simulations += iterations
+        for action, (visits, value) in stats.items():
+            entry = totals.setdefault(action, [0, 0.0])
+            entry[0] += visits
+            entry[1] += value
+    legal = set(candidate_actions(game, 0, config))
+    ranked = [a for a in sorted(totals, key=lambda a: totals[a][0], reverse=True) if a in legal]
+    return Decision(ranked[0] if ranked else END, simulations, len(results))
+
+
+def decision_budget(remaining: float, depth: int, config: MCTSConfig) -> float:
+    """Seconds to spend on a turn's depth-th decision when remaining seconds of its budget are left"""
+    # Spend a third of what is left on each decision; later ones matter less
+    return remaining / 3 if depth + 1 < config.max_actions else remaining
+
+
+def play_turn(game: GameState, config: Optional[MCTSConfig] = None) -> int:
+    """Plan and play the current player's whole turn through the engine; returns simulations run"""
+    config = config or MCTSConfig()
+    workers = config.workers if config.workers is not None else (os.cpu_count() or 1)
+    if workers > 1:
+        try:
+            warm_up(workers)
+        except (BrokenProcessPool, OSError):
+            pass  # choose_action warns and searches in-process
+    started = time.time()
+    simulations = 0
+    for depth in range(config.max_actions):
+        remaining = config.turn_budget - (time.time() - started)
+        if remaining <= 0 or not engine.legal_moves(game):
+            break
+        action, sims, _ = choose_action(game, decision_budget(remaining, depth, config), config)
+        simulations += sims
+        if action == END:
+            break
+        engine.apply_move(game, *action[1:])
+    engine.end_movement(game)
+    engine.reinforce(game)
+    return simulations
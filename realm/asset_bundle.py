@@ -0,0 +1,227 @@
+"""One-file bundle of the assets a fresh worker needs for its first render.
+
+A cold process otherwise parses the map definition, searches the system for
+fonts and decodes the base map image before the first map appears. The
+bundle holds all three already resolved: the default map's columns, the
+contents of the font file ``render_cache`` would find, and the base map at
+the sizes the app draws, as raw pixels. It is read with a single
+``read()``, and its arrays are views into that buffer.
+
+Layout: a fixed header (magic, format version, JSON length), the JSON
+metadata, then each section's raw bytes, aligned to ALIGN. The metadata
+records the mtime of every source file, so a bundle built from older
+files is ignored (and rebuilt by ``install``).
+
+Build one ahead of time, e.g. in a container image::
+
+    python -m realm.asset_bundle
+
+The app never builds it on a request: a worker that finds no usable bundle
+loads its assets the usual way and builds one in a background thread for
+the workers that start after it.
+
+Set REALM_ASSET_BUNDLE to another path to move it, or to ``off`` to skip it.
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from realm import maps, render_cache
+from realm.maps import DEFAULT_MAP, GameMap, load_map
+from realm.store import TerritoryStore
+
+BUNDLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "assets.bundle")
+BUNDLE_ENV = "REALM_ASSET_BUNDLE"
+FORMAT_VERSION = 1
+ALIGN = 64
+MAP_SIZES = ((720, 360),)  # base map sizes the app draws
+
+_HEADER = struct.Struct("<4sII")
+_MAGIC = b"RLMB"
+_COLUMNS = ("x", "y", "radius", "owner", "units", "is_hq", "indptr", "indices")
+
+
+class Bundle:
+    """Assets read from a bundle file; arrays are read-only views into one buffer"""
+
+    def __init__(self, path: str, meta: Dict[str, Any], sections: Dict[str, np.ndarray]):
+        self.path = path
+        self.meta = meta
+        self.sections = sections
+
+    def game_map(self) -> GameMap:
+        """Template of the bundled map, as load_map would build it"""
+        info = self.meta["map"]
+        columns = [self.sections[f"map/{name}"] for name in _COLUMNS]
+        store = TerritoryStore(info["ids"], info["names"], *columns)
+        return GameMap(info["name"], info["width"], info["height"], info["hqs"], store, info["image"],
+                       info["source"])
+
+    def fonts(self) -> Dict[str, bytes]:
+        return {name: self.sections[f"font/{name}"].tobytes() for name in self.meta["fonts"]}
+
+    def base_maps(self) -> List[np.ndarray]:
+        return [self.sections[f"image/{w}x{h}"] for w, h in self.meta["image"]["sizes"]]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.sections.values())
+
+
+def bundle_path() -> Optional[str]:
+    """Where the bundle lives, or None when REALM_ASSET_BUNDLE turns it off"""
+    path = os.environ.get(BUNDLE_ENV, BUNDLE_PATH)
+    return None if path.lower() in ("", "0", "off", "false") else path
+
+
+def _mtime(path: Optional[str]) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def build_bundle(path: str = BUNDLE_PATH, map_path: str = DEFAULT_MAP,
+                 sizes: Sequence[Tuple[int, int]] = MAP_SIZES) -> str:
+    """Resolve the map, fonts and base map images and write them to path (atomically)"""
+    game_map = load_map(map_path)
+    store = game_map.store
+    sections: Dict[str, np.ndarray] = {f"map/{name}": getattr(store, name) for name in _COLUMNS}
+    meta: Dict[str, Any] = {
+        "map": {"source": game_map.source, "mtime_ns": _mtime(game_map.source), "name": game_map.name,
+                "width": game_map.width, "height": game_map.height, "hqs": game_map.hqs,
+                "image": game_map.image, "ids": store.ids, "names": store.names},
+        "fonts": [],
+        "image": {"path": game_map.image, "mtime_ns": _mtime(game_map.image), "sizes": []},
+    }
+    font_path = render_cache.resolve_font_file()
+    if font_path:
+        name = os.path.basename(font_path)
+        with open(font_path, "rb") as fh:
+            sections[f"font/{name}"] = np.frombuffer(fh.read(), dtype=np.uint8)
+        meta["fonts"].append(name)
+    if meta["image"]["mtime_ns"] is not None:
+        from realm import map_pyramid
+        pyramid = map_pyramid.get_pyramid(game_map.image)
+        for width, height in sizes:
+            sections[f"image/{width}x{height}"] = np.asarray(pyramid.image(width, height))
+            meta["image"]["sizes"].append([width, height])
+
+    layout, offset = {}, 0
+    for name, array in sections.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += array.nbytes
+    meta["sections"] = layout
+    header = json.dumps(meta, separators=(",", ":")).encode()
+    start = -(-(_HEADER.size + len(header)) // ALIGN) * ALIGN
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, len(header)) + header)
+        for name, array in sections.items():
+            fh.seek(start + layout[name][2])
+            fh.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def load_bundle(path: str) -> Optional[Bundle]:
+    """The bundle at path, or None when it is missing, from another format or built from older files"""
+    try:
+        with open(path, "rb") as fh:
+            raw = fh.read()
+    except OSError:
+        return None
+    if len(raw) < _HEADER.size:
+        return None
+    magic, version, size = _HEADER.unpack_from(raw)
+    if magic != _MAGIC or version != FORMAT_VERSION:
+        return None
+    try:
+        meta = json.loads(raw[_HEADER.size:_HEADER.size + size])
+        if (_mtime(meta["map"]["source"]) != meta["map"]["mtime_ns"]
+                or _mtime(meta["image"]["path"]) != meta["image"]["mtime_ns"]):
+            return None
+        start = -(-(_HEADER.size + size) // ALIGN) * ALIGN
+        sections = {}
+        for name, (dtype, shape, offset) in meta.pop("sections").items():
+            count = int(np.prod(shape)) if shape else 1
+            sections[name] = np.frombuffer(raw, dtype, count, start + offset).reshape(shape)
+    except (ValueError, KeyError):
+        return None  # truncated or hand-edited; install() rebuilds it
+    return Bundle(path, meta, sections)
+
+
+def install(path: Optional[str] = None, build: bool = True) -> Optional[Bundle]:
+    """Load the bundle (building it first if missing or stale) and hand its assets to the caches.
+
+    Returns None when bundles are turned off or the bundle cannot be read or
+    written; everything then loads the usual way on first use.
+    """
+    path = path or bundle_path()
+    if path is None:
+        return None
+    bundle = load_bundle(path)
+    if bundle is None and build:
+        try:
+            build_bundle(path)
+        except OSError:
+            return None
+        bundle = load_bundle(path)
+    if bundle is None:
+        return None
+    info = bundle.meta["map"]
+    maps.preload_map(bundle.game_map(), info["source"], info["mtime_ns"])
+    render_cache.preload_fonts(bundle.fonts())
+    image = bundle.meta["image"]
+    for pixels in bundle.base_maps():
+        render_cache.preload_base_map(image["path"], image["mtime_ns"], pixels)
+    return bundle
+
+
+def build_in_background(path: Optional[str] = None) -> Optional[threading.Thread]:
+    """Start building the bundle in a daemon thread, for the next process; None when bundles are off"""
+    path = path or bundle_path()
+    if path is None:
+        return None
+
+    def build():
+        try:
+            build_bundle(path)
+        except OSError:
+            pass  # read-only or full disk: workers keep loading assets the usual way
+
+    thread = threading.Thread(target=build, name="asset-bundle-build", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the asset bundle read by new app workers")
+    parser.add_argument("--out", default=None, help=f"bundle file (default: ${BUNDLE_ENV} or {BUNDLE_PATH})")
+    parser.add_argument("--map", default=DEFAULT_MAP, help="map definition to bundle")
+    args = parser.parse_args(argv)
+
+    path = args.out or bundle_path() or BUNDLE_PATH
+    start = time.perf_counter()
+    build_bundle(path, args.map)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    bundle = load_bundle(path)
+    loaded = time.perf_counter() - start
+    print(f"{path}: {len(bundle.sections)} sections, {bundle.nbytes / 1e6:.1f} MB "
+          f"(fonts: {', '.join(bundle.meta['fonts']) or 'none'}; "
+          f"images: {', '.join(f'{w}x{h}' for w, h in bundle.meta['image']['sizes']) or 'none'}); "
+          f"built in {built:.2f}s, loads in {loaded * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Bare array board for bots and analytics that look at many positions at once.
+
+A ``Board`` is just the owner and units columns plus adjacency as edge
+arrays. It has no ids, log, history or incremental counters, so a clone
+copies two small arrays. Everything here is computed in bulk with NumPy:
+frontier masks, every legal move of a player, and territory-control
+scores, including for a whole batch of positions stacked as ``(B, T)``
+arrays.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from realm.store import NUM_OWNERS, TerritoryStore
+
+# Control score weights: holding ground matters most, then the HQs, then troops
+TERRITORY_WEIGHT = 1.0
+UNIT_WEIGHT = 0.25
+HQ_WEIGHT = 5.0
+
+
+class Edges:
+    """Directed edge arrays of a CSR adjacency; shared by every board of one map"""
+    __slots__ = ("indptr", "src", "dst", "is_hq")
+
+    def __init__(self, indptr, indices, is_hq, src=None):
+        self.indptr = np.asarray(indptr, dtype=np.int32)
+        self.dst = np.asarray(indices, dtype=np.int32)
+        if src is None:
+            src = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        self.src = np.asarray(src, dtype=np.int32)
+        self.is_hq = np.asarray(is_hq, dtype=bool)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+
+class Board:
+    """Owner and units of every territory, indexed like the TerritoryStore it came from"""
+    __slots__ = ("edges", "owner", "units")
+
+    def __init__(self, edges: Edges, owner, units):
+        self.edges = edges
+        self.owner = np.array(owner, dtype=np.int8)
+        self.units = np.array(units, dtype=np.int32)
+
+    @classmethod
+    def from_store(cls, store: TerritoryStore) -> "Board":
+        return cls(store_edges(store), store.owner, store.units)
+
+    def clone(self) -> "Board":
+        board = object.__new__(Board)
+        board.edges = self.edges
+        board.owner = self.owner.copy()
+        board.units = self.units.copy()
+        return board
+
+    def frontier(self, player: Optional[int] = None) -> np.ndarray:
+        """Mask of territories bordering one held by someone else, optionally only the player's"""
+        edges = self.edges
+        border = self.owner[edges.src] != self.owner[edges.dst]
+        mask = np.bincount(edges.src[border], minlength=len(edges)) > 0
+        if player is not None:
+            mask &= self.owner == player
+        return mask
+
+    def legal_moves(self, player: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every move open to the player as parallel (source, target, max_units) arrays.
+
+        Same rule as ``engine.legal_moves``: a territory with at least 2 units
+        may send all but one to any neighbor, friendly or not.
+        """
+        edges = self.edges
+        ready = (self.owner == player) & (self.units > 1)
+        keep = ready[edges.src]
+        src = edges.src[keep]
+        return src, edges.dst[keep], self.units[src] - 1
+
+    def attacks(self, player: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Legal moves whose target the player does not own"""
+        src, dst, max_units = self.legal_moves(player)
+        hostile = self.owner[dst] != player
+        return src[hostile], dst[hostile], max_units[hostile]
+
+    def control_scores(self) -> np.ndarray:
+        """Weighted territories, units and HQs per owner (index 0 is neutral)"""
+        return control_scores(self.owner, self.units, self.edges.is_hq)
+
+    def evaluate(self, player: int) -> float:
+        """Player's share of the control held by both players, from -1 (lost) to 1 (won)"""
+        return float(evaluate(self.owner, self.units, self.edges.is_hq, player))
+
+
+def store_edges(store: TerritoryStore) -> Edges:
+    """Edge arrays over a store's layout columns, without copying them"""
+    return Edges(store.indptr, store.indices, store.is_hq, store.edge_src)
+
+
+def stack(boards) -> Tuple[np.ndarray, np.ndarray]:
+    """Owner and units of boards on one map as (B, T) arrays for the batch routines"""
+    boards = list(boards)
+    return (np.stack([b.owner for b in boards]), np.stack([b.units for b in boards]))
+
+
+def _per_owner(owner: np.ndarray, weights: Optional[np.ndarray]) -> np.ndarray:
+    """bincount over owners, done row by row for a (B, T) batch in a single call"""
+    owner = np.asarray(owner)
+    if owner.ndim == 1:
+        return np.bincount(owner, weights=weights, minlength=NUM_OWNERS).astype(np.float64)
+    batch = owner.shape[0]
+    keys = owner.astype(np.int64) + NUM_OWNERS * np.arange(batch)[:, None]
+    flat = None if weights is None else np.broadcast_to(weights, owner.shape).ravel()
+    counts = np.bincount(keys.ravel(), weights=flat, minlength=batch * NUM_OWNERS)
+    return counts.reshape(batch, NUM_OWNERS).astype(np.float64)
+
+
+def control_scores(owner, units, is_hq) -> np.ndarray:
+    """Control score per owner for one board (T,) or a batch (B, T); shape (..., NUM_OWNERS)"""
+    owner = np.asarray(owner)
+    territories = _per_owner(owner, None)
+    troops = _per_owner(owner, np.asarray(units, dtype=np.float64))
+    hqs = _per_owner(owner, np.asarray(is_hq, dtype=np.float64))
+    return TERRITORY_WEIGHT * territories + UNIT_WEIGHT * troops + HQ_WEIGHT * hqs
+
+
+def evaluate(owner, units, is_hq, player: int):
+    """Vectorized ``Board.evaluate``: a float for one board, an array of B for a batch"""
+    scores = control_scores(owner, units, is_hq)
+    mine = scores[..., player]
+    theirs = scores[..., 1 if player == 2 else 2]
+    total = mine + theirs
+    return np.divide(mine - theirs, total, out=np.zeros_like(total), where=total > 0)
+
+
+def frontier_batch(edges: Edges, owner) -> np.ndarray:
+    """Frontier masks for a (B, T) batch of owner columns"""
+    owner = np.asarray(owner)
+    batch, count = owner.shape
+    border = owner[:, edges.src] != owner[:, edges.dst]
+    rows, cols = np.nonzero(border)
+    keys = rows.astype(np.int64) * count + edges.src[cols]
+    return (np.bincount(keys, minlength=batch * count) > 0).reshape(batch, count)
@@ -0,0 +1,116 @@
+"""Resolve many independent battles at once with NumPy.
+
+Outcomes follow the same rules as ``engine.resolve_neutral_combat`` and
+``engine.resolve_pvp_combat``, including how survivors and losses are
+counted, so per-battle distributions match the scalar resolvers.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# Upper bound on dice drawn per neutral chunk, keeps memory flat for huge batches
+MAX_CHUNK_DICE = 1 << 22
+# Above this many dice per army PvP sums are drawn as multinomial face counts
+MAX_DICE_PER_ARMY = 64
+_FACES = np.arange(1, 7, dtype=np.int64)
+_FACE_P = np.full(6, 1 / 6)
+
+
+@dataclass
+class BatchResult:
+    success: np.ndarray  # bool, one entry per battle
+    surviving_attackers: np.ndarray
+    units_lost: np.ndarray
+
+    def __len__(self):
+        return len(self.success)
+
+
+def _as_armies(attacking_units, defending_units, size: Optional[int]):
+    attackers = np.asarray(attacking_units, dtype=np.int64)
+    defenders = np.asarray(defending_units, dtype=np.int64)
+    shape = np.broadcast_shapes(attackers.shape, defenders.shape, (size,) if size is not None else ())
+    attackers = np.broadcast_to(attackers, shape).ravel()
+    defenders = np.broadcast_to(defenders, shape).ravel()
+    if attackers.size and attackers.min() < 1:
+        raise ValueError("every battle needs at least one attacking unit")
+    return attackers, defenders
+
+
+def resolve_neutral_batch(attacking_units, defending_units, rng: Optional[np.random.Generator] = None,
+                          size: Optional[int] = None) -> BatchResult:
+    """Resolve N battles against neutral territories.
+
+    ``attacking_units`` and ``defending_units`` are scalars or arrays that
+    broadcast together (and with ``size`` when given). Each attacker rolls
+    one die in order; a 3+ kills a defender and the battle ends as soon as
+    the garrison is cleared.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    attackers, defenders = _as_armies(attacking_units, defending_units, size)
+    n = attackers.size
+    success = np.zeros(n, dtype=bool)
+    surviving = np.zeros(n, dtype=np.int64)
+    lost = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return BatchResult(success, surviving, lost)
+
+    # An empty garrison still needs one successful roll, as in the scalar loop
+    needed = np.maximum(defenders, 1)
+    max_a = int(attackers.max())
+    rows = max(1, MAX_CHUNK_DICE // max_a)
+    columns = np.arange(max_a)
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        a = attackers[start:stop]
+        width = int(a.max())
+        dice = rng.integers(1, 7, size=(stop - start, width), dtype=np.int8)
+        hits = (dice >= 3) & (columns[:width] < a[:, None])
+        cumulative = np.cumsum(hits, axis=1, dtype=np.int32)
+        reached = cumulative >= needed[start:stop, None]
+        won = reached[:, -1]
+        # Index of the roll that cleared the garrison; earlier rolls count as lost
+        decisive = reached.argmax(axis=1)
+        success[start:stop] = won
+        surviving[start:stop] = np.where(won, a - decisive, 0)
+        lost[start:stop] = np.where(won, decisive, a - cumulative[:, -1])
+    return BatchResult(success, surviving, lost)
+
+
+def roll_sums(units, rng: np.random.Generator) -> np.ndarray:
+    """Sum of ``units`` d6 for every entry of ``units``"""
+    units = np.asarray(units, dtype=np.int64)
+    if units.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    max_units = int(units.max())
+    if max_units > MAX_DICE_PER_ARMY:
+        # Big armies: draw face counts instead, cost no longer grows with army size
+        return rng.multinomial(units, _FACE_P) @ _FACES
+    sums = np.empty(units.size, dtype=np.int64)
+    rows = max(1, MAX_CHUNK_DICE // max(max_units, 1))
+    columns = np.arange(max_units)
+    for start in range(0, units.size, rows):
+        stop = min(start + rows, units.size)
+        u = units[start:stop]
+        width = int(u.max())
+        if width == 0:
+            sums[start:stop] = 0
+            continue
+        dice = rng.integers(1, 7, size=(stop - start, width), dtype=np.int8)
+        dice[columns[:width] >= u[:, None]] = 0
+        sums[start:stop] = dice.sum(axis=1, dtype=np.int64)
+    return sums
+
+
+def resolve_pvp_batch(attacking_units, defending_units, rng: Optional[np.random.Generator] = None,
+                      size: Optional[int] = None) -> BatchResult:
+    """Resolve N player-vs-player battles: the higher dice total wins, ties go to the defender"""
+    rng = rng if rng is not None else np.random.default_rng()
+    attackers, defenders = _as_armies(attacking_units, defending_units, size)
+    attack_roll = roll_sums(attackers, rng)
+    defense_roll = roll_sums(defenders, rng)
+    success = attack_roll > defense_roll
+    surviving = np.where(success, attackers - defenders, 0)
+    lost = np.where(success, defenders, attackers)
+    return BatchResult(success, surviving, lost)
@@ -0,0 +1,138 @@
+"""Exact combat odds for both combat rules, computed once and persisted.
+
+Tables are indexed ``[attackers, defenders]`` and hold the probability of
+conquering, the expected number of surviving attackers and the expected
+number of attackers lost, counted the same way as ``units_lost`` in the
+engine's combat resolvers.
+"""
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+DEFAULT_CAP = 60
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache"
+# Bump when the rules or the table layout change so stale files are ignored
+TABLE_VERSION = 1
+HIT_CHANCE = 4 / 6  # a neutral attacker needs a 3+
+
+
+class Odds(NamedTuple):
+    p_conquer: float
+    expected_survivors: float
+    expected_losses: float
+
+
+class OddsTable:
+    def __init__(self, cap: int, arrays):
+        self.cap = cap
+        self.arrays = arrays
+
+    def lookup(self, rule: str, attackers: int, defenders: int) -> Odds:
+        """Constant-time lookup; ``rule`` is 'neutral' or 'pvp'"""
+        return Odds(float(self.arrays[f"{rule}_p"][attackers, defenders]),
+                    float(self.arrays[f"{rule}_survivors"][attackers, defenders]),
+                    float(self.arrays[f"{rule}_losses"][attackers, defenders]))
+
+
+def _neutral_tables(cap: int):
+    p, q = HIT_CHANCE, 1 - HIT_CHANCE
+    # binom[i, s]: chance of exactly s hits in the first i rolls
+    binom = np.zeros((cap + 1, cap + 1))
+    binom[0, 0] = 1.0
+    for i in range(cap):
+        binom[i + 1] = binom[i] * q
+        binom[i + 1, 1:] += binom[i, :-1] * p
+
+    rolls = np.arange(cap + 1)
+    # need[d]: hits required against d defenders (an empty garrison still needs one)
+    need = np.maximum(np.arange(cap + 1), 1)
+    # decisive[i, d]: roll i (0-based) is the hit that clears the garrison
+    decisive = binom[:, need - 1] * p
+    # Attacker A wins if the decisive roll is one of rolls 0..A-1
+    p_win = np.zeros((cap + 1, cap + 1))
+    p_win[1:] = np.cumsum(decisive, axis=0)[:-1]
+    win_lost = np.zeros((cap + 1, cap + 1))
+    win_lost[1:] = np.cumsum(decisive * rolls[:, None], axis=0)[:-1]
+
+    # On a failed attack every roll was made and the misses are lost
+    miss_weighted = binom * (rolls[:, None] - rolls[None, :])
+    cumulative = np.cumsum(miss_weighted, axis=1)
+    fail_lost = np.concatenate([np.zeros((cap + 1, 1)), cumulative[:, :-1]], axis=1)[:, need]
+
+    survivors = rolls[:, None] * p_win - win_lost
+    return p_win, survivors, win_lost + fail_lost
+
+
+def dice_sum_distributions(max_dice: int) -> np.ndarray:
+    """dist[n, s]: probability that n d6 sum to s"""
+    dist = np.zeros((max_dice + 1, 6 * max_dice + 1))
+    dist[0, 0] = 1.0
+    for n in range(1, max_dice + 1):
+        for face in range(1, 7):
+            dist[n, face:] += dist[n - 1, :-face] / 6
+    return dist
+
+
+def _pvp_tables(cap: int):
+    dist = dice_sum_distributions(cap)
+    # below[d, s]: chance the defenders roll strictly less than s
+    below = np.zeros_like(dist)
+    below[:, 1:] = np.cumsum(dist, axis=1)[:, :-1]
+    p_win = dist @ below.T
+    attackers = np.arange(cap + 1)[:, None]
+    defenders = np.arange(cap + 1)[None, :]
+    survivors = p_win * (attackers - defenders)
+    losses = p_win * defenders + (1 - p_win) * attackers
+    return p_win, survivors, losses
+
+
+def build_table(cap: int) -> OddsTable:
+    """Compute both rule tables for every pair up to ``cap`` units a side"""
+    arrays = {}
+    for rule, tables in (("neutral", _neutral_tables(cap)), ("pvp", _pvp_tables(cap))):
+        p_win, survivors, losses = tables
+        np.clip(p_win, 0.0, 1.0, out=p_win)
+        # Attacks need at least one unit, keep the zero row out of any lookup result
+        for name, values in (("p", p_win), ("survivors", survivors), ("losses", losses)):
+            values[0] = 0.0
+            arrays[f"{rule}_{name}"] = values
+    return OddsTable(cap, arrays)
+
+
+def _table_path(cap: int) -> Path:
+    return CACHE_DIR / f"combat_odds_v{TABLE_VERSION}_{cap}.npz"
+
+
+@lru_cache(maxsize=4)
+def odds_table(cap: int = DEFAULT_CAP) -> OddsTable:
+    """Load the table for ``cap`` from disk, building and saving it on first use"""
+    path = _table_path(cap)
+    try:
+        with np.load(path) as data:
+            return OddsTable(cap, {name: data[name] for name in data.files})
+    except (OSError, ValueError, KeyError):
+        pass
+    table = build_table(cap)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so concurrent workers never read a partial table
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".npz")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez_compressed(fh, **table.arrays)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return table
+
+
+def combat_odds(rule: str, attackers: int, defenders: int, cap: int = DEFAULT_CAP) -> Odds:
+    """Odds for one battle, growing the table when a side exceeds ``cap``"""
+    largest = max(attackers, defenders)
+    if largest > cap:
+        # Round up so a slowly growing army does not rebuild the table every turn
+        cap = -(-largest // DEFAULT_CAP) * DEFAULT_CAP
+    return odds_table(cap).lookup(rule, attackers, defenders)
@@ -0,0 +1,245 @@
+"""Copy-on-write game versions for undo, redo, branching and what-if previews.
+
+A ``Version`` is the board and turn fields at one point in a game. Versions
+share a materialized base (owner and units arrays) and each keeps only the
+territories that differ from that base, as sorted index, owner and units
+arrays, so thousands of branches from one position share a single copy of
+the board. Recording a command costs O(changed) Python work plus copying
+the parent's delta arrays, O(|delta|) but vectorized. Once a delta's bytes
+outgrow MATERIALIZE_FRACTION of the base columns, that version gets a base
+of its own instead, so no delta is more than that share of a plain copy.
+Lookups are a binary search over the delta.
+
+A ``Timeline`` drives a live ``GameState`` through versions. Commands run
+on the game through the engine as usual while the store records which
+territories they touch, and undo, redo and checkout write back only those.
+Dice are not part of a version: going back does not rewind the stream, so
+a battle cannot be undone and rolled again with the same outcome.
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from realm.board import Board, store_edges
+from realm.dice import DiceStream
+from realm.game_log import GameLog
+from realm.state import GameState
+from realm.store import TerritoryStore
+
+# Give a version its own base once its delta takes this share of the base columns' bytes
+MATERIALIZE_FRACTION = 0.125
+_NO_INDEX = np.empty(0, dtype=np.int32)
+
+
+class TurnFields(NamedTuple):
+    current_player: int
+    phase: str
+    turn_count: int
+    selected_territory: Optional[str]
+
+
+class Version:
+    """Immutable board and turn fields; unchanged territories are shared with related versions"""
+    __slots__ = ("owner_base", "units_base", "index", "owner", "units", "changed", "fields")
+
+    def __init__(self, owner_base: np.ndarray, units_base: np.ndarray, index: np.ndarray, owner: np.ndarray,
+                 units: np.ndarray, changed: np.ndarray, fields: TurnFields):
+        self.owner_base = owner_base
+        self.units_base = units_base
+        # Sorted territories where this version differs from its base, and their values here
+        self.index = index
+        self.owner = owner
+        self.units = units
+        self.changed = changed  # indices that differ from the version it was derived from
+        self.fields = fields
+
+    @classmethod
+    def capture(cls, game: GameState) -> "Version":
+        """Root version holding a copy of the game's board"""
+        return cls.materialized(game.store, _NO_INDEX, _turn_fields(game))
+
+    @classmethod
+    def materialized(cls, store: TerritoryStore, changed: np.ndarray, fields: TurnFields) -> "Version":
+        """Version with its own copy of the store's columns as base"""
+        owner, units = store.owner.copy(), store.units.copy()
+        return cls(owner, units, _NO_INDEX, owner[:0], units[:0], changed, fields)
+
+    @property
+    def delta_nbytes(self) -> int:
+        return self.index.nbytes + self.owner.nbytes + self.units.nbytes
+
+    def values(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Owner and units of the given territories in this version"""
+        owner, units = self.owner_base[indices], self.units_base[indices]
+        if len(self.index):
+            pos = np.minimum(np.searchsorted(self.index, indices), len(self.index) - 1)
+            hit = self.index[pos] == indices
+            owner[hit] = self.owner[pos[hit]]
+            units[hit] = self.units[pos[hit]]
+        return owner, units
+
+    def territory(self, i: int) -> Tuple[int, int]:
+        """(owner, units) of territory i"""
+        owner, units = self.values(np.array([i], dtype=np.int32))
+        return int(owner[0]), int(units[0])
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Fresh owner and units columns for this version"""
+        owner, units = self.owner_base.copy(), self.units_base.copy()
+        owner[self.index] = self.owner
+        units[self.index] = self.units
+        return owner, units
+
+    def board(self, game: GameState) -> Board:
+        """Array board of this version, for scoring with realm.board"""
+        owner, units = self.arrays()
+        return Board(store_edges(game.store), owner, units)
+
+    def derive(self, game: GameState, touched: Set[int]) -> "Version":
+        """Version of the game after a command that touched these territories"""
+        store = game.store
+        fields = _turn_fields(game)
+        touched_index = np.fromiter(touched, dtype=np.int32, count=len(touched))
+        before_owner, before_units = self.values(touched_index)
+        now_owner, now_units = store.owner[touched_index], store.units[touched_index]
+        moved = (before_owner != now_owner) | (before_units != now_units)
+        changed = np.sort(touched_index[moved])
+        if not len(changed):
+            return Version(self.owner_base, self.units_base, self.index, self.owner, self.units, changed, fields)
+        now_owner, now_units = store.owner[changed], store.units[changed]
+        # Entries for changed territories are replaced; those back at their base value are dropped
+        keep = np.ones(len(self.index), dtype=bool)
+        pos = np.searchsorted(self.index, changed)
+        pos = pos[pos < len(self.index)]
+        keep[pos[self.index[pos] == changed[:len(pos)]]] = False
+        off_base = (now_owner != self.owner_base[changed]) | (now_units != self.units_base[changed])
+        index = np.concatenate((self.index[keep], changed[off_base]))
+        order = np.argsort(index, kind="stable")
+        delta = Version(self.owner_base, self.units_base, index[order],
+                        np.concatenate((self.owner[keep], now_owner[off_base]))[order],
+                        np.concatenate((self.units[keep], now_units[off_base]))[order], changed, fields)
+        limit = MATERIALIZE_FRACTION * (self.owner_base.nbytes + self.units_base.nbytes)
+        if delta.delta_nbytes > limit:
+            return Version.materialized(store, changed, fields)
+        return delta
+
+
+def _turn_fields(game: GameState) -> TurnFields:
+    return TurnFields(game.current_player, game.phase, game.turn_count, game.selected_territory)
+
+
+class Timeline:
+    """Undo, redo and branching over one GameState, in O(territories changed)"""
+
+    def __init__(self, game: GameState):
+        self.game = game
+        self.version = Version.capture(game)
+        self._undo: List[Version] = []
+        self._redo: List[Version] = []
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @contextmanager
+    def _recording(self) -> Iterator[Set[int]]:
+        store = self.game.store
+        if store.touched is not None:
+            raise RuntimeError("a timeline is already recording this game")
+        store.touched = touched = set()
+        try:
+            yield touched
+        finally:
+            store.touched = None
+
+    def apply(self, command: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run command(game, *args) and make its outcome the current version; clears redo.
+
+        The version is recorded even if the command raises, so the timeline
+        always matches the game.
+        """
+        with self._recording() as touched:
+            try:
+                return command(self.game, *args, **kwargs)
+            finally:
+                child = self.version.derive(self.game, touched)
+                self._undo.append(self.version)
+                self._redo.clear()
+                self.version = child
+
+    def undo(self) -> bool:
+        """Step back one command; False when there is nothing to undo"""
+        if not self._undo:
+            return False
+        parent = self._undo.pop()
+        self._write(parent, self.version.changed)
+        self._redo.append(self.version)
+        self.version = parent
+        return True
+
+    def redo(self) -> bool:
+        """Replay the last undone command's outcome without running it again"""
+        if not self._redo:
+            return False
+        child = self._redo.pop()
+        self._write(child, child.changed)
+        self._undo.append(self.version)
+        self.version = child
+        return True
+
+    def checkout(self, version: Version):
+        """Switch the game to any version, e.g. another branch; starts a fresh undo history"""
+        current = self.version
+        if version.owner_base is current.owner_base:
+            self._write(version, np.union1d(current.index, version.index))
+        else:
+            owner, units = version.arrays()
+            self.game.store.load_columns(owner, units)
+            self._write(version, _NO_INDEX)
+        self._undo.clear()
+        self._redo.clear()
+        self.version = version
+
+    def _write(self, version: Version, indices: np.ndarray):
+        owner, units = version.values(indices)
+        self.game.store.write(indices.tolist(), owner.tolist(), units.tolist())
+        fields = version.fields
+        game = self.game
+        game.current_player = fields.current_player
+        game.phase = fields.phase
+        game.turn_count = fields.turn_count
+        game.selected_territory = fields.selected_territory
+
+    def preview(self, command: Callable[..., Any], *args, rng: Optional[DiceStream] = None,
+                **kwargs) -> Tuple[Version, Any]:
+        """Outcome of command on the current version, leaving the game exactly as it was.
+
+        Runs with a throwaway dice stream (rng, or a freshly seeded one) and
+        without the game's log and history, so nothing about the preview
+        leaks into the real game.
+        """
+        game = self.game
+        saved = game.rng, game.game_log, game.history
+        game.rng = rng if rng is not None else DiceStream()
+        game.game_log, game.history = GameLog(0), None
+        try:
+            try:
+                result = self.apply(command, *args, **kwargs)
+            finally:
+                outcome = self.version
+                self.undo()
+                self._redo.pop()
+        finally:
+            game.rng, game.game_log, game.history = saved
+        return outcome, result
+
+
+def preview(game: GameState, command: Callable[..., Any], *args, rng: Optional[DiceStream] = None,
+            **kwargs) -> Tuple[Version, Any]:
+    """One-off ``Timeline.preview`` on a game; costs one board copy for the root version"""
+    return Timeline(game).preview(command, *args, rng=rng, **kwargs)
@@ -0,0 +1,73 @@
+"""Per-game dice backed by a seeded NumPy generator.
+
+Dice are drawn in blocks and handed out one at a time, so the per-roll
+cost is a list index instead of a call into the global ``random`` module.
+Each game owns its stream; ``spawn`` derives independent child streams
+for workers from one seed.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BLOCK_SIZE = 4096
+
+
+class DiceStream:
+    def __init__(self, seed=None, block_size: int = BLOCK_SIZE):
+        seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seed_seq = seed_seq
+        self.generator = np.random.Generator(np.random.PCG64(seed_seq))
+        self.block_size = block_size
+        self._block: List[int] = []
+        self._pos = 0
+        # Generator state right before the current block was drawn; with _pos it
+        # pins the stream position without storing the block itself
+        self._block_state: Optional[Dict[str, Any]] = None
+
+    def _refill(self):
+        self._block_state = self.generator.bit_generator.state
+        self._block = self.generator.integers(1, 7, size=self.block_size, dtype=np.int8).tolist()
+        self._pos = 0
+
+    def roll(self) -> int:
+        """One d6"""
+        if self._pos >= len(self._block):
+            self._refill()
+        value = self._block[self._pos]
+        self._pos += 1
+        return value
+
+    def rolls(self, n: int) -> List[int]:
+        """n d6 in stream order"""
+        out: List[int] = []
+        while n > 0:
+            if self._pos >= len(self._block):
+                self._refill()
+            take = min(n, len(self._block) - self._pos)
+            out.extend(self._block[self._pos:self._pos + take])
+            self._pos += take
+            n -= take
+        return out
+
+    def sum(self, n: int) -> int:
+        """Total of n d6"""
+        return sum(self.rolls(n))
+
+    def spawn(self, n: int) -> List["DiceStream"]:
+        """n statistically independent child streams"""
+        return [DiceStream(child, self.block_size) for child in self.seed_seq.spawn(n)]
+
+    def getstate(self) -> Dict[str, Any]:
+        """JSON-safe stream position"""
+        return {"block_state": self._block_state, "pos": self._pos, "block_size": self.block_size}
+
+    def setstate(self, state: Dict[str, Any]):
+        self.block_size = state["block_size"]
+        if state["block_state"] is None:
+            # Nothing drawn yet; the generator must be at its initial state
+            self.generator = np.random.Generator(np.random.PCG64(self.seed_seq))
+            self._block, self._pos, self._block_state = [], 0, None
+            return
+        self.generator.bit_generator.state = state["block_state"]
+        self._refill()
+        self._pos = state["pos"]
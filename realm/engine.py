@@ -0,0 +1,334 @@
+"""Game rules that run without Streamlit.
+
+Every function here works on a plain ``GameState`` and reports through
+``GameState.log``; the Streamlit app is a thin layer that calls into
+this module and decides what to show and when to rerun.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from realm.board import Board
+from realm.dice import DiceStream
+from realm.state import GameState
+
+LogFn = Optional[Callable[..., None]]  # called as log(kind, **fields)
+Order = Tuple[str, str, str, int]  # (kind, source, target, units); kind is 'move' or 'march'
+
+# Only used when a resolver is called without a game's own stream
+_default_dice = DiceStream()
+
+
+@dataclass
+class MoveResult:
+    kind: str  # 'move', 'neutral', 'pvp' or 'skipped' (an order from apply_orders)
+    success: bool
+    surviving_attackers: int = 0
+    units_lost: int = 0
+    can_continue: bool = False  # the acting stack may keep moving this turn
+
+
+def other_player(player: int) -> int:
+    return 1 if player == 2 else 2
+
+
+def start_game(game: GameState, p1_name: str, p2_name: str, first_player: int):
+    """Start the game with chosen player order"""
+    game.players[1].name = p1_name
+    game.players[2].name = p2_name
+    game.current_player = first_player
+    game.phase = 'movement'
+    game.log("bonus", player=game.players[first_player].name)
+    game.log("game_begins")
+    if game.history is not None:
+        game.history.append(game, ("start", p1_name, p2_name, first_player))
+
+
+def legal_moves(game: GameState) -> List[Tuple[str, str, int]]:
+    """Every (source, target, max_units) the current player may act on this phase.
+
+    Any territory of theirs holding at least 2 units may move into or attack
+    any adjacent territory, keeping one unit behind.
+    """
+    if game.phase != 'movement':
+        return []
+    store = game.store
+    src, dst, max_units = Board.from_store(store).legal_moves(game.current_player)
+    ids = store.ids
+    return [(ids[s], ids[d], m) for s, d, m in zip(src.tolist(), dst.tolist(), max_units.tolist())]
+
+
+def check_move(game: GameState, from_id: str, to_id: str, num_units: int):
+    """Raise ValueError unless the current player may send num_units from from_id to to_id"""
+    if game.phase != 'movement':
+        raise ValueError(f"cannot move during the {game.phase} phase")
+    source = game.territories[from_id]
+    if source.owner != game.current_player:
+        raise ValueError(f"{from_id} is not owned by player {game.current_player}")
+    if to_id not in game.adjacency.get(from_id, []):
+        raise ValueError(f"{to_id} is not adjacent to {from_id}")
+    if not 1 <= num_units <= source.units - 1:
+        raise ValueError(f"cannot move {num_units} units out of {source.units} from {from_id}")
+
+
+def apply_move(game: GameState, from_id: str, to_id: str, num_units: int) -> MoveResult:
+    """Move units between territories, resolving combat when the target is not friendly"""
+    check_move(game, from_id, to_id, num_units)
+    result = _resolve_move(game, from_id, to_id, num_units)
+    if game.history is not None:
+        game.history.append(game, ("move", from_id, to_id, num_units))
+    return result
+
+
+def march_path(game: GameState, from_id: str, to_id: str) -> Optional[List[str]]:
+    """Shortest route from from_id to to_id through the owner's own territory, or None"""
+    store = game.store
+    path = store.friendly.path(store.index[from_id], store.index[to_id])
+    return [store.ids[i] for i in path] if path else None
+
+
+def march_destinations(game: GameState, from_id: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """(territory, hops) reachable from from_id through friendly territory beyond its neighbors, nearest first"""
+    store = game.store
+    hops = store.friendly.distances(store.index[from_id])
+    far = np.flatnonzero(hops >= 2)
+    far = far[np.argsort(hops[far], kind="stable")][:limit]
+    return [(store.ids[i], int(hops[i])) for i in far.tolist()]
+
+
+def check_march(game: GameState, from_id: str, to_id: str, num_units: int) -> List[str]:
+    """Raise ValueError unless the current player may march num_units; returns the route"""
+    if game.phase != 'movement':
+        raise ValueError(f"cannot move during the {game.phase} phase")
+    source = game.territories[from_id]
+    if source.owner != game.current_player:
+        raise ValueError(f"{from_id} is not owned by player {game.current_player}")
+    path = march_path(game, from_id, to_id) if from_id != to_id else None
+    if path is None:
+        raise ValueError(f"{to_id} is not reachable through player {game.current_player}'s territory")
+    if not 1 <= num_units <= source.units - 1:
+        raise ValueError(f"cannot move {num_units} units out of {source.units} from {from_id}")
+    return path
+
+
+def march(game: GameState, from_id: str, to_id: str, num_units: int) -> MoveResult:
+    """Move units any distance through friendly territory in one command.
+
+    Same as a chain of friendly moves along the shortest route: the
+    territories passed through end up unchanged.
+    """
+    path = check_march(game, from_id, to_id, num_units)
+    source = game.territories[from_id]
+    destination = game.territories[to_id]
+    destination.units += num_units
+    source.units -= num_units
+    game.log("marched", units=num_units, source=source.name, target=destination.name, hops=len(path) - 1)
+    game.selected_territory = to_id
+    if game.history is not None:
+        game.history.append(game, ("march", from_id, to_id, num_units))
+    return MoveResult('move', True, num_units, 0, True)
+
+
+ORDER_KINDS = {'move': apply_move, 'march': march}
+
+
+def apply_orders(game: GameState, orders: Sequence[Order]) -> List[MoveResult]:
+    """Resolve a batch of staged (kind, source, target, units) orders in one pass.
+
+    Orders run in sequence, each checked against the board the earlier ones
+    left, and are recorded in the history one by one like single moves. An
+    order that an earlier battle made impossible (its source was not taken,
+    or lost units) is skipped and logged instead of failing the rest.
+    Malformed orders raise ValueError before anything is applied.
+    """
+    if game.phase != 'movement':
+        raise ValueError(f"cannot move during the {game.phase} phase")
+    for kind, from_id, to_id, num_units in orders:
+        if kind not in ORDER_KINDS:
+            raise ValueError(f"unknown order {kind!r}")
+        for tid in (from_id, to_id):
+            if tid not in game.territories:
+                raise ValueError(f"unknown territory {tid!r}")
+        if num_units < 1:
+            raise ValueError(f"cannot order {num_units} units")
+    results = []
+    for kind, from_id, to_id, num_units in orders:
+        try:
+            results.append(ORDER_KINDS[kind](game, from_id, to_id, num_units))
+        except ValueError as exc:
+            game.log("order_skipped", source=game.territories[from_id].name,
+                     target=game.territories[to_id].name, reason=str(exc))
+            results.append(MoveResult('skipped', False))
+    return results
+
+
+def _resolve_move(game: GameState, from_id: str, to_id: str, num_units: int) -> MoveResult:
+    source = game.territories[from_id]
+    destination = game.territories[to_id]
+    player_name = game.players[game.current_player].name
+
+    if destination.owner == 0:
+        # Moving to neutral territory = attack
+        game.log("attack", player=player_name, target=destination.name, units=num_units)
+        combat_result = resolve_neutral_combat(num_units, destination.units, game.log, game.rng)
+
+        if combat_result['success']:
+            # Conquer territory
+            destination.owner = game.current_player
+            destination.units = combat_result['surviving_attackers']
+            source.units -= num_units
+            game.log("neutral_conquered", target=destination.name, units=destination.units)
+            # Continue from new territory
+            game.selected_territory = destination.id
+            can_continue = True
+        else:
+            # Attack failed
+            source.units -= combat_result['units_lost']
+            game.log("attack_failed", target=destination.name, lost=combat_result['units_lost'])
+            # If still movable, stay on same source
+            can_continue = source.units > 1
+        return MoveResult('neutral', combat_result['success'], combat_result['surviving_attackers'],
+                          combat_result['units_lost'], can_continue)
+
+    if destination.owner == game.current_player:
+        # Moving to own territory = reinforcement
+        destination.units += num_units
+        source.units -= num_units
+        game.log("moved", units=num_units, source=source.name, target=destination.name)
+        # Update selection to the destination for QoL and highlight
+        game.selected_territory = destination.id
+        return MoveResult('move', True, num_units, 0, True)
+
+    # Attack enemy territory
+    game.log("attack", player=player_name, target=destination.name, units=num_units)
+    combat_result = resolve_pvp_combat(num_units, destination.units, game.log, game.rng)
+
+    if combat_result['success']:
+        # Victory! Move surviving units to conquer territory
+        surviving_units = combat_result['surviving_attackers']
+        destination.units = surviving_units
+        destination.owner = game.current_player
+        source.units -= num_units
+        game.log("pvp_conquered", target=destination.name, units=surviving_units)
+        # If any units left, allow continued movement
+        can_continue = surviving_units > 1
+        if can_continue:
+            game.selected_territory = destination.id
+    else:
+        # Defeat, units are lost
+        source.units -= combat_result['units_lost']
+        game.log("attack_failed", target=destination.name, lost=combat_result['units_lost'])
+        # If still movable, stay on same source
+        can_continue = source.units > 1
+    return MoveResult('pvp', combat_result['success'], combat_result['surviving_attackers'],
+                      combat_result['units_lost'], can_continue)
+
+
+def resolve_neutral_combat(attacking_units: int, defending_units: int, log: LogFn = None,
+                           rng: Optional[DiceStream] = None) -> Dict:
+    """Resolve combat against neutral territory"""
+    rng = rng if rng is not None else _default_dice
+    defeated_defenders = 0
+    units_lost = 0
+
+    for i in range(attacking_units):
+        roll = rng.roll()
+        if log:
+            log("die_roll", unit=i+1, roll=roll)
+
+        if roll >= 3:  # Success
+            defeated_defenders += 1
+            if log:
+                log("die_hit")
+
+            if defeated_defenders >= defending_units:
+                # Territory conquered!
+                return {
+                    'success': True,
+                    'surviving_attackers': attacking_units - i,
+                    'units_lost': i
+                }
+        else:
+            # Unit dies
+            units_lost += 1
+            if log:
+                log("die_miss")
+
+    # Attack failed
+    return {
+        'success': False,
+        'surviving_attackers': 0,
+        'units_lost': units_lost
+    }
+
+
+def resolve_pvp_combat(attacking_units: int, defending_units: int, log: LogFn = None,
+                       rng: Optional[DiceStream] = None) -> Dict:
+    """Resolve player vs player combat"""
+    rng = rng if rng is not None else _default_dice
+    # Simplified combat resolution: higher total wins
+    attack_roll = rng.sum(attacking_units)
+    defense_roll = rng.sum(defending_units)
+    if log:
+        log("pvp_rolls", attackers=attacking_units, defenders=defending_units,
+            attack_roll=attack_roll, defense_roll=defense_roll)
+
+    if attack_roll > defense_roll:
+        # Attackers win
+        units_lost = defending_units  # All defenders are lost
+        surviving_attackers = attacking_units - units_lost  # Assume equal loss
+        if log:
+            log("pvp_won", lost=units_lost)
+        return {
+            'success': True,
+            'surviving_attackers': surviving_attackers,
+            'units_lost': units_lost
+        }
+    # Defenders win or tie
+    units_lost = attacking_units  # All attackers are lost
+    if log:
+        log("pvp_lost", lost=units_lost)
+    return {
+        'success': False,
+        'surviving_attackers': 0,
+        'units_lost': units_lost
+    }
+
+
+def end_movement(game: GameState):
+    """End movement phase and move to reinforcement"""
+    if game.phase != 'movement':
+        raise ValueError(f"cannot end movement during the {game.phase} phase")
+    game.phase = 'reinforcement'
+    game.log("end_movement", player=game.players[game.current_player].name)
+    game.log("reinforce_prompt")
+    if game.history is not None:
+        game.history.append(game, ("end",))
+
+
+def reinforce(game: GameState, roll: Optional[int] = None) -> int:
+    """Roll for reinforcements, then hand the turn to the other player; returns the roll"""
+    if game.phase != 'reinforcement':
+        raise ValueError(f"cannot reinforce during the {game.phase} phase")
+    # A roll passed in is part of the event; a drawn one is reproduced from the seed
+    event = ("reinforce",) if roll is None else ("reinforce", roll)
+    if roll is None:
+        roll = game.rng.roll()
+    game.log("reinforce_roll", roll=roll)
+
+    if roll == 6:
+        hq_id = game.players[game.current_player].hq_territory
+        game.territories[hq_id].units += 2
+        game.log("reinforce_six", target=game.territories[hq_id].name)
+    else:
+        game.log("reinforce_none")
+
+    # End turn
+    game.current_player = other_player(game.current_player)
+    game.phase = 'movement'
+    game.turn_count += 1
+    game.log("turn_begins", player=game.players[game.current_player].name)
+    if game.history is not None:
+        game.history.append(game, event)
+    return roll
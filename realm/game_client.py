@@ -0,0 +1,126 @@
+"""Blocking client for the game-room server, used from Streamlit sessions.
+
+A ``RoomClient`` keeps a local mirror ``GameState`` that the app renders
+exactly like a local game; every request returns a diff that is folded into
+the mirror, so a rerun only pays for what changed since its last version.
+"""
+import json
+import socket
+from typing import Any, Dict, Optional
+
+from realm.game_log import GameLog
+from realm.maps import load_map
+from realm.state import GameState
+
+# Same as realm.game_server.DEFAULT_PORT; importing the server would load asyncio and SQLite into every client
+DEFAULT_PORT = 8765
+TIMEOUT = 10.0
+
+
+class RoomError(RuntimeError):
+    pass
+
+
+class RoomClient:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, timeout: float = TIMEOUT):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.room: Optional[str] = None
+        self.seat = 0
+        self.token: Optional[str] = None
+        self.version = -1
+        self.game: Optional[GameState] = None
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._next_id = 0
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def request(self, op: str, **fields) -> Dict[str, Any]:
+        """Send one request and wait for its response, reconnecting once if the socket dropped"""
+        self._next_id += 1
+        line = json.dumps(dict(fields, op=op, id=self._next_id)).encode() + b"\n"
+        for attempt in (0, 1):
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._file.write(line)
+                self._file.flush()
+                while True:
+                    reply = self._file.readline()
+                    if not reply:
+                        raise ConnectionError("server closed the connection")
+                    message = json.loads(reply)
+                    if message.get("id") == self._next_id:
+                        return message
+            except (ConnectionError, socket.timeout, OSError):
+                self.close()
+                if attempt:
+                    raise
+        raise ConnectionError("unreachable")
+
+    def create(self, map_path: Optional[str] = None) -> GameState:
+        return self._enter(self.request("create", map=map_path))
+
+    def join(self, room: str) -> GameState:
+        return self._enter(self.request("join", room=room))
+
+    def _enter(self, response: Dict[str, Any]) -> GameState:
+        if "error" in response:
+            raise RoomError(response["error"])
+        state = response["state"]
+        self.room, self.seat, self.token = state["room"], response["seat"], response["token"]
+        self.game = GameState(load_map(state["map"]))
+        self.version = -1
+        self._merge(state)
+        return self.game
+
+    def sync(self) -> bool:
+        """Pull changes since the mirror's version; True if anything changed"""
+        response = self.request("state", room=self.room, since=self.version)
+        if "error" in response:
+            raise RoomError(response["error"])
+        return self._merge(response["state"])
+
+    def act(self, *action) -> Dict[str, Any]:
+        """Apply an action on the server, then fold its changes into the mirror"""
+        response = self.request("act", room=self.room, token=self.token, version=self.version,
+                                action=list(action))
+        if "state" in response:
+            self._merge(response["state"])
+        if "error" in response:
+            raise RoomError(response["error"])
+        return response["result"]
+
+    def _merge(self, state: Dict[str, Any]) -> bool:
+        game = self.game
+        if state["version"] == self.version:
+            return False
+        if state.get("full"):
+            game.game_log = GameLog()
+        store = game.store
+        for tid, (owner, units) in state["territories"].items():
+            i = store.index[tid]
+            store.set_owner(i, owner)
+            store.set_units(i, units)
+        game.current_player = state["current_player"]
+        game.phase = state["phase"]
+        game.turn_count = state["turn"]
+        game.players[1].name, game.players[2].name = state["names"]
+        for line in state["log"]:
+            game.add_log(line)
+        self.version = state["version"]
+        return True
+
+    def is_my_turn(self) -> bool:
+        if self.game.phase == "setup":
+            return self.seat == 1
+        return self.seat == self.game.current_player
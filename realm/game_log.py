@@ -0,0 +1,103 @@
+"""Bounded, structured game log with an optional append-only journal.
+
+Events are stored as small records and only turned into display text when
+shown. The in-memory buffer keeps the most recent events; the journal, a
+gzip file of JSON lines, keeps the full history.
+"""
+import gzip
+import json
+from collections import deque
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+DEFAULT_CAPACITY = 200
+FLUSH_EVERY = 64
+
+TEMPLATES = {
+    "text": "{text}",
+    "welcome": "🏰 Welcome to Conquest of the Realm!",
+    "bonus": "🎯 {player} wins the Commissioner's Bonus!",
+    "game_begins": "⚔️ Game begins! Movement phase started.",
+    "attack": "⚔️ {player} attacks {target} with {units} units!",
+    "die_roll": "🎲 Unit {unit} rolls {roll}",
+    "die_hit": "✅ Unit succeeds!",
+    "die_miss": "💀 Unit dies in combat!",
+    "neutral_conquered": "🏰 {target} conquered! {units} units garrison.",
+    "attack_failed": "💔 Attack on {target} failed! Lost {lost} units.",
+    "moved": "🚶 Moved {units} units from {source} to {target}",
+    "marched": "🥾 Marched {units} units from {source} to {target} ({hops} hops)",
+    "order_skipped": "⏭️ Skipped order {source} → {target}: {reason}",
+    "pvp_rolls": "⚔️ Combat: {attackers}v{defenders} - Rolls: {attack_roll} vs {defense_roll}",
+    "pvp_won": "✅ Attack successful! Defenders lose all {lost} units.",
+    "pvp_lost": "💔 Attack failed! {lost} attackers lost.",
+    "pvp_conquered": "🏰 Conquered {target} with {units} units!",
+    "end_movement": "🔄 {player} ends movement phase",
+    "reinforce_prompt": "🎲 Time to roll for reinforcements!",
+    "reinforce_roll": "🎲 Reinforcement roll: {roll}",
+    "reinforce_six": "🎉 Rolled a 6! +2 units added to {target}",
+    "reinforce_none": "😐 No reinforcements this turn",
+    "turn_begins": "🆕 {player}'s turn begins!",
+}
+
+
+class LogEvent(NamedTuple):
+    seq: int
+    turn: int
+    kind: str
+    fields: Dict[str, Any]
+
+    def render(self) -> str:
+        return TEMPLATES[self.kind].format(**self.fields)
+
+
+class GameLog:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, journal_path: Optional[str] = None,
+                 flush_every: int = FLUSH_EVERY):
+        self._events: "deque[LogEvent]" = deque(maxlen=capacity)
+        self._pending: List[str] = []
+        self.journal_path = journal_path
+        self.flush_every = flush_every
+        self.total = 0  # events ever logged, including those dropped from the buffer
+
+    def add(self, kind: str, turn: int = 0, **fields):
+        if kind not in TEMPLATES:
+            raise KeyError(f"unknown log event {kind!r}")
+        event = LogEvent(self.total, turn, kind, fields)
+        self.total += 1
+        self._events.append(event)
+        if self.journal_path:
+            self._pending.append(json.dumps([event.seq, turn, kind, fields], ensure_ascii=False))
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        """Append pending events to the journal as one gzip member"""
+        if not self._pending:
+            return
+        with gzip.open(self.journal_path, "at", encoding="utf-8") as fh:
+            fh.write("\n".join(self._pending) + "\n")
+        self._pending.clear()
+
+    def tail(self, n: int) -> List[str]:
+        """Display text of the last n buffered events, oldest first"""
+        count = len(self._events)
+        return [self._events[i].render() for i in range(max(0, count - n), count)]
+
+    def __iter__(self) -> Iterator[LogEvent]:
+        return iter(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+    def __getstate__(self):
+        # Do not lose buffered journal lines when the state is copied or pickled
+        self.flush()
+        return self.__dict__
+
+
+def read_journal(path: str) -> Iterator[LogEvent]:
+    """Yield every event stored in a journal file"""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                seq, turn, kind, fields = json.loads(line)
+                yield LogEvent(seq, turn, kind, fields)
@@ -0,0 +1,292 @@
+"""Game-room server: many games in one asyncio process.
+
+Clients speak JSON lines over TCP. Each request carries an ``id`` that is
+echoed in its response::
+
+    {"id": 1, "op": "create"}                      -> room, seat 1 token, full state
+    {"id": 2, "op": "join", "room": "ab12"}         -> seat 2 token (or a spectator seat)
+    {"id": 3, "op": "state", "room": "ab12", "since": 7}
+    {"id": 4, "op": "act", "room": "ab12", "token": "...", "version": 7,
+     "action": ["move", "hq1", "t1", 3]}
+    {"id": 5, "op": "subscribe", "room": "ab12", "since": 7}
+
+Actions are ``["start", p1_name, p2_name, first]``, ``["move", src, dst, n]``,
+``["march", src, dst, n]``, ``["orders", [[kind, src, dst, n], ...]]`` (a batch resolved as one
+version), ``["end"]`` and ``["reinforce"]``, applied through the engine under a per-room lock. ``version`` is optional optimistic concurrency: an action
+sent against a stale version is refused with ``"conflict"`` and the client
+catches up first. State goes out as diffs (changed territories, turn
+fields and new log lines) against the version the client last saw, and
+subscribers get each diff pushed as ``{"event": "diff", ...}``.
+
+Rooms are persisted after every action through a ``RoomStore``; idle rooms
+are dropped from memory and reloaded from the store when next used. Pass
+``--db`` to keep them in SQLite (``realm.storage.GameStore``) instead of
+memory. Run with ``python -m realm.game_server --port 8765``.
+"""
+import argparse
+import asyncio
+import json
+import secrets
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from realm import engine
+from realm.maps import DEFAULT_MAP, load_map
+from realm.state import GameState
+from realm.storage import GameStore
+
+DEFAULT_PORT = 8765
+DIFF_HISTORY = 256  # versions a client may lag behind before it gets a full state
+LOG_LINES = 12  # log lines included in a full state
+IDLE_TTL = 3600.0
+MAX_LINE = 1 << 24
+
+
+class RoomStore:
+    """Persistence stand-in: keeps saved rooms in a dict"""
+
+    def __init__(self):
+        self._rooms: Dict[str, Dict[str, Any]] = {}
+
+    def save(self, room_id: str, record: Dict[str, Any]):
+        self._rooms[room_id] = record
+
+    def load(self, room_id: str) -> Optional[Dict[str, Any]]:
+        return self._rooms.get(room_id)
+
+
+class Room:
+    def __init__(self, room_id: str, game: GameState):
+        self.room_id = room_id
+        self.game = game
+        self.version = 0
+        self.seats: Dict[int, str] = {}  # player -> token
+        self.lock = asyncio.Lock()
+        self.changes: "deque[Dict[str, Any]]" = deque(maxlen=DIFF_HISTORY)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_used = time.monotonic()
+
+    def _header(self) -> Dict[str, Any]:
+        game = self.game
+        return {"room": self.room_id, "version": self.version, "current_player": game.current_player,
+                "phase": game.phase, "turn": game.turn_count,
+                "names": [game.players[1].name, game.players[2].name]}
+
+    def full_state(self) -> Dict[str, Any]:
+        store = self.game.store
+        state = self._header()
+        state["full"] = True
+        state["map"] = self.game.game_map.source
+        state["territories"] = {tid: [int(o), int(u)] for tid, o, u in zip(store.ids, store.owner, store.units)}
+        state["log"] = self.game.game_log.tail(LOG_LINES)
+        return state
+
+    def diff_since(self, version: int) -> Dict[str, Any]:
+        """Everything that changed after version, or the full state if that is too old"""
+        if version == self.version:
+            return dict(self._header(), territories={}, log=[])
+        if version > self.version or not self.changes or self.changes[0]["version"] > version + 1:
+            return self.full_state()
+        territories: Dict[str, List[int]] = {}
+        log: List[str] = []
+        for change in self.changes:
+            if change["version"] > version:
+                territories.update(change["territories"])
+                log.extend(change["log"])
+        return dict(self._header(), territories=territories, log=log)
+
+    def apply(self, action: List[Any]) -> Dict[str, Any]:
+        """Run one action through the engine and record what it changed"""
+        game = self.game
+        owner, units = game.store.owner.copy(), game.store.units.copy()
+        logged = game.game_log.total
+        kind = action[0]
+        result: Dict[str, Any] = {}
+        if kind == "start":
+            engine.start_game(game, str(action[1]), str(action[2]), int(action[3]))
+        elif kind in ("move", "march"):
+            command = engine.apply_move if kind == "move" else engine.march
+            outcome = command(game, str(action[1]), str(action[2]), int(action[3]))
+            result = {"success": outcome.success, "can_continue": outcome.can_continue,
+                      "selected": game.selected_territory}
+        elif kind == "orders":
+            staged = [(str(o[0]), str(o[1]), str(o[2]), int(o[3])) for o in action[1]]
+            outcomes = engine.apply_orders(game, staged)
+            result = {"success": [o.success for o in outcomes], "selected": game.selected_territory}
+        elif kind == "end":
+            engine.end_movement(game)
+        elif kind == "reinforce":
+            result = {"roll": engine.reinforce(game)}
+        else:
+            raise ValueError(f"unknown action {kind!r}")
+        self.version += 1
+        store = game.store
+        changed = np.flatnonzero((store.owner != owner) | (store.units != units))
+        new_lines = min(game.game_log.total - logged, len(game.game_log))
+        change = {
+            "version": self.version,
+            "territories": {store.ids[i]: [int(store.owner[i]), int(store.units[i])] for i in changed.tolist()},
+            "log": game.game_log.tail(new_lines) if new_lines else [],
+        }
+        self.changes.append(change)
+        diff = dict(self._header(), **change)
+        for queue in list(self.subscribers):
+            queue.put_nowait(diff)
+        return result
+
+    def to_record(self) -> Dict[str, Any]:
+        return {"map": self.game.game_map.source, "version": self.version, "seats": self.seats,
+                "seed": self.game.seed, "snapshot": self.game.snapshot()}
+
+    @classmethod
+    def from_record(cls, room_id: str, record: Dict[str, Any]) -> "Room":
+        game = GameState(load_map(record["map"]), seed=record["seed"])
+        game.restore(record["snapshot"])
+        room = cls(room_id, game)
+        room.version = record["version"]
+        room.seats = {int(k): v for k, v in record["seats"].items()}
+        return room
+
+
+class GameServer:
+    def __init__(self, store: Optional[RoomStore] = None, idle_ttl: float = IDLE_TTL):
+        self.store = store if store is not None else RoomStore()
+        self.rooms: Dict[str, Room] = {}
+        self.idle_ttl = idle_ttl
+
+    async def room(self, room_id: str) -> Room:
+        room = self.rooms.get(room_id)
+        if room is None:
+            # Store reads and writes may block (SQLite); they run in a thread, off the event loop
+            record = await asyncio.to_thread(self.store.load, room_id)
+            if record is None:
+                raise KeyError(f"no room {room_id}")
+            # Another request may have loaded the room while this one waited
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = Room.from_record(room_id, record)
+        room.last_used = time.monotonic()
+        return room
+
+    async def create(self, map_path: Optional[str] = None) -> Room:
+        room_id = secrets.token_hex(4)
+        while room_id in self.rooms or await asyncio.to_thread(self.store.load, room_id) is not None:
+            room_id = secrets.token_hex(4)
+        game = GameState(load_map(map_path or DEFAULT_MAP))
+        game.log("welcome")
+        room = self.rooms[room_id] = Room(room_id, game)
+        room.seats[1] = secrets.token_hex(16)
+        await asyncio.to_thread(self.store.save, room_id, room.to_record())
+        return room
+
+    async def handle(self, request: Dict[str, Any], queue: asyncio.Queue) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "create":
+            room = await self.create(request.get("map"))
+            return {"room": room.room_id, "seat": 1, "token": room.seats[1], "state": room.full_state()}
+        room = await self.room(request["room"])
+        if op == "join":
+            async with room.lock:
+                if 2 not in room.seats:
+                    room.seats[2] = secrets.token_hex(16)
+                    await asyncio.to_thread(self.store.save, room.room_id, room.to_record())
+                    return {"seat": 2, "token": room.seats[2], "state": room.full_state()}
+            return {"seat": 0, "token": None, "state": room.full_state()}  # spectator
+        if op == "state":
+            return {"state": room.diff_since(int(request.get("since", -1)))}
+        if op == "subscribe":
+            room.subscribers.add(queue)
+            return {"state": room.diff_since(int(request.get("since", -1)))}
+        if op == "act":
+            async with room.lock:
+                expected = request.get("version")
+                if expected is not None and int(expected) != room.version:
+                    return {"error": "conflict", "state": room.diff_since(int(expected))}
+                action = request["action"]
+                seat = next((p for p, token in room.seats.items() if token == request.get("token")), None)
+                acting = 1 if action[0] == "start" else room.game.current_player
+                if seat != acting:
+                    return {"error": "not your turn", "state": room.diff_since(room.version)}
+                since = room.version
+                result = room.apply(action)
+                await asyncio.to_thread(self.store.save, room.room_id, room.to_record())
+                return {"result": result, "state": room.diff_since(since)}
+        raise ValueError(f"unknown op {op!r}")
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        queue: asyncio.Queue = asyncio.Queue()
+        write_lock = asyncio.Lock()
+
+        async def send(message: Dict[str, Any]):
+            async with write_lock:
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+
+        async def push():
+            while True:
+                diff = await queue.get()
+                await send({"event": "diff", "state": diff})
+
+        pusher = asyncio.create_task(push())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request: Dict[str, Any] = {}
+                try:
+                    request = json.loads(line)
+                    response = await self.handle(request, queue)
+                except (KeyError, ValueError, TypeError, IndexError) as exc:
+                    response = {"error": str(exc)}
+                response["id"] = request.get("id")
+                await send(response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            pusher.cancel()
+            for room in self.rooms.values():
+                room.subscribers.discard(queue)
+            writer.close()
+
+    async def evict_idle(self, interval: float = 60.0):
+        """Drop rooms nobody touched for idle_ttl seconds; they reload from the store on demand"""
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_ttl
+            for room_id, room in list(self.rooms.items()):
+                if room.last_used < cutoff and not room.subscribers and not room.lock.locked():
+                    del self.rooms[room_id]
+
+
+async def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, store: Optional[RoomStore] = None):
+    game_server = GameServer(store)
+    server = await asyncio.start_server(game_server.serve_client, host, port, limit=MAX_LINE)
+    evictor = asyncio.create_task(game_server.evict_idle())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        evictor.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Conquest of the Realm game-room server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", help="SQLite file for rooms (default: keep them in memory)")
+    args = parser.parse_args(argv)
+    store = GameStore(args.db) if args.db else None
+    print(f"Serving game rooms on {args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port, store))
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
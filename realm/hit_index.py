@@ -0,0 +1,44 @@
+"""Uniform-grid index over rendered territory circles for click hit-testing"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+
+class HitIndex:
+    """Maps a click to the territory whose rendered circle contains it.
+
+    Every circle is registered in each grid cell its bounding box touches,
+    so a query only inspects the circles of a single cell.
+    """
+
+    def __init__(self, positions: Dict[str, Dict[str, int]], cell_size: Optional[float] = None):
+        self.positions = positions
+        radii = sorted(p["r"] for p in positions.values())
+        if cell_size is None:
+            # About one typical circle per cell keeps buckets short
+            cell_size = 2 * radii[len(radii) // 2] if radii else 1
+        self.cell_size = max(float(cell_size), 1.0)
+        self._cells: Dict[Tuple[int, int], List[Tuple[str, int, int, int]]] = {}
+        for tid, p in positions.items():
+            cx, cy, r = p["cx"], p["cy"], p["r"]
+            entry = (tid, cx, cy, r)
+            for gx in range(self._cell(cx - r), self._cell(cx + r) + 1):
+                for gy in range(self._cell(cy - r), self._cell(cy + r) + 1):
+                    self._cells.setdefault((gx, gy), []).append(entry)
+
+    def _cell(self, v: float) -> int:
+        return math.floor(v / self.cell_size)
+
+    def find(self, x: float, y: float) -> Optional[str]:
+        """Territory id whose circle contains (x, y), nearest center first; None on a miss"""
+        best = None
+        best_d2 = None
+        for tid, cx, cy, r in self._cells.get((self._cell(x), self._cell(y)), ()):
+            dx = x - cx
+            dy = y - cy
+            d2 = dx*dx + dy*dy
+            if d2 <= r*r and (best_d2 is None or d2 < best_d2):
+                best, best_d2 = tid, d2
+        return best
+
+    def __len__(self):
+        return len(self.positions)
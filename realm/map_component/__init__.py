@@ -0,0 +1,62 @@
+"""Map component that draws territory overlays in the browser.
+
+The base map is published once into the component's static directory under
+a content hash, so the browser downloads and caches it a single time. Each
+rerun sends only a small JSON overlay (one row per territory plus the
+selection), which ``frontend/index.html`` draws as SVG over the cached
+image. Clicks come back as ``{"x", "y", "time"}`` in overlay coordinates,
+the same shape ``streamlit_image_coordinates`` returns, so the app resolves
+them with its existing hit index.
+"""
+import hashlib
+import os
+import shutil
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+ASSETS_DIR = os.path.join(FRONTEND_DIR, "assets")
+
+_component = components.declare_component("realm_map", path=FRONTEND_DIR)
+_publish_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def _published(path: str, mtime_ns: int) -> str:
+    with open(path, "rb") as fh:
+        digest = hashlib.blake2b(fh.read(), digest_size=12).hexdigest()
+    name = digest + os.path.splitext(path)[1].lower()
+    target = os.path.join(ASSETS_DIR, name)
+    with _publish_lock:
+        if not os.path.exists(target):
+            os.makedirs(ASSETS_DIR, exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+    return f"assets/{name}"
+
+
+def publish_base_map(path: Optional[str]) -> Optional[str]:
+    """URL of the base map relative to the component, or None when there is no image file"""
+    if not path:
+        return None
+    full_path = os.path.abspath(path)
+    try:
+        mtime = os.stat(full_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _published(full_path, mtime)
+
+
+def realm_map(image: Optional[str], width: int, height: int, territories: List[List[Any]],
+              selected: Optional[str], key: str = "realm_map") -> Optional[Dict[str, Any]]:
+    """Render the map and return the last click, or None.
+
+    territories rows are ``[id, cx, cy, r, fill, units, text_color]`` in
+    overlay coordinates; selected is the id to draw the halo around.
+    """
+    return _component(image=image, width=width, height=height, territories=territories,
+                      selected=selected, key=key, default=None)
@@ -0,0 +1,363 @@
+"""Procedural maps with any number of territories.
+
+``generate_map`` places territories by Poisson-disk sampling and links
+them with the Gabriel graph of the points. It puts the two HQs far apart
+on a balanced split of the board, sets neutral garrisons by distance from
+the nearest HQ and paints a matching terrain background. ``new_game``
+writes the map and image into a cache keyed by size and seed, then loads
+it like any other map file, so replays and saved games can find it again::
+
+    python -m realm.map_generator 10000 --seed 7 --out maps/big.npz
+
+All steps are vectorized with NumPy; a 10,000-territory game is ready in
+well under a second.
+"""
+import argparse
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from realm.maps import GameMap, load_map, save_binary
+from realm.pathing import UNREACHABLE, bfs
+from realm.state import GameState
+from realm.store import TerritoryStore
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "maps")
+SPACING = 100  # minimum distance between territory centres, in map units
+ASPECT = 2.0  # width / height, like the bundled map
+PACKING = 0.62  # territories per SPACING**2 of area that DART_ROUNDS of dart throwing reach
+DART_ROUNDS = 6
+NEIGHBORS = 12  # nearest neighbours checked for Gabriel edges
+HQ_UNITS = 30
+IMAGE_WIDTH = 1600
+
+SYLLABLES = ["ash", "bel", "cor", "dun", "el", "fen", "gar", "hol", "ith", "kel", "lor", "mar",
+             "nor", "os", "pen", "quel", "ros", "sil", "tor", "ul", "vor", "wyn", "yar", "zan"]
+SUFFIXES = ["ford", "mere", "holt", "wick", "moor", "vale", "crag", "fell", "haven", "reach", "stead", "watch"]
+
+
+def poisson_disk(width: float, height: float, spacing: float, rng: np.random.Generator,
+                 rounds: int = DART_ROUNDS) -> np.ndarray:
+    """Points at least spacing apart, by phased dart throwing on a background grid.
+
+    Cells are spacing/sqrt(2) wide, so each holds at most one point. Cells
+    three apart in both directions cannot conflict, so each of the nine
+    phases throws one dart into every open cell of its class at once and
+    checks it against the 5x5 neighbourhood in one vectorized pass.
+    """
+    cell = spacing / np.sqrt(2)
+    cols, rows = int(np.ceil(width / cell)), int(np.ceil(height / cell))
+    # Padded by two cells on every side so neighbourhood lookups never go out of range
+    grid = np.full((rows + 4, cols + 4, 2), np.nan)
+    offsets = np.array([(dr, dc) for dr in range(-2, 3) for dc in range(-2, 3) if (dr, dc) != (0, 0)])
+    spacing2 = spacing * spacing
+    open_cells = np.ones((rows, cols), dtype=bool)
+    for _ in range(rounds):
+        for pr in range(3):
+            for pc in range(3):
+                phase = open_cells[pr::3, pc::3]
+                r, c = np.nonzero(phase)
+                r, c = r * 3 + pr, c * 3 + pc
+                if not len(r):
+                    continue
+                px = (c + rng.random(len(c))) * cell
+                py = (r + rng.random(len(r))) * cell
+                inside = (px < width) & (py < height)
+                r, c, px, py = r[inside], c[inside], px[inside], py[inside]
+                near = grid[r[:, None] + 2 + offsets[:, 0], c[:, None] + 2 + offsets[:, 1]]
+                d2 = (near[..., 0] - px[:, None]) ** 2 + (near[..., 1] - py[:, None]) ** 2
+                ok = ~(d2 < spacing2).any(axis=1)  # NaN neighbours compare False
+                grid[r[ok] + 2, c[ok] + 2, 0] = px[ok]
+                grid[r[ok] + 2, c[ok] + 2, 1] = py[ok]
+                open_cells[r[ok], c[ok]] = False
+    points = grid[2:-2, 2:-2].reshape(-1, 2)
+    return points[~np.isnan(points[:, 0])]
+
+
+def nearest_neighbors(points: np.ndarray, spacing: float, k: int = NEIGHBORS) -> np.ndarray:
+    """Indices of each point's k nearest others (closest first), via a bucket grid"""
+    cell = spacing / np.sqrt(2)
+    cx = (points[:, 0] // cell).astype(np.int64)
+    cy = (points[:, 1] // cell).astype(np.int64)
+    reach = 4  # 9x9 cells reach about 2.8 spacings, enough for a dozen neighbours
+    lookup = np.full((cy.max() + 1 + 2 * reach, cx.max() + 1 + 2 * reach), -1, dtype=np.int64)
+    lookup[cy + reach, cx + reach] = np.arange(len(points))
+    offsets = np.array([(dr, dc) for dr in range(-reach, reach + 1) for dc in range(-reach, reach + 1)
+                        if (dr, dc) != (0, 0)])
+    candidates = lookup[cy[:, None] + reach + offsets[:, 0], cx[:, None] + reach + offsets[:, 1]]
+    d2 = ((points[np.maximum(candidates, 0)] - points[:, None, :]) ** 2).sum(axis=2)
+    d2[candidates < 0] = np.inf
+    k = min(k, candidates.shape[1])
+    nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(d2, nearest, axis=1).argsort(axis=1)
+    nearest = np.take_along_axis(nearest, order, axis=1)
+    result = np.take_along_axis(candidates, nearest, axis=1)
+    result[np.take_along_axis(d2, nearest, axis=1) == np.inf] = -1
+    return result
+
+
+def gabriel_edges(points: np.ndarray, knn: np.ndarray) -> np.ndarray:
+    """Gabriel-graph edges (i < j) among the k-nearest-neighbour pairs.
+
+    Edge i-j is kept when no other point lies inside the circle with i-j as
+    its diameter. Any such point is closer to i than j is, so it is among
+    i's neighbours listed before j, and the test needs only knn. The
+    Gabriel graph is a planar, connected subgraph of the Delaunay
+    triangulation that keeps its short, well-shaped edges.
+    """
+    n, k = knn.shape
+    i = np.repeat(np.arange(n), k)
+    j = knn.ravel()
+    valid = j >= 0
+    i, j = i[valid], j[valid]
+    # Test each pair once: from the smaller index, unless only the larger one lists the other
+    mutual = (knn[j] == i[:, None]).any(axis=1)
+    once = (i < j) | ~mutual
+    i, j = i[once], j[once]
+    mid = (points[i] + points[j]) / 2
+    radius2 = ((points[i] - points[j]) ** 2).sum(axis=1) / 4
+    witnesses = knn[i]
+    wpos = points[np.maximum(witnesses, 0)]
+    inside = ((wpos - mid[:, None, :]) ** 2).sum(axis=2) < radius2[:, None] * (1 - 1e-9)
+    inside &= (witnesses >= 0) & (witnesses != j[:, None])
+    keep = ~inside.any(axis=1)
+    edges = np.sort(np.stack([i[keep], j[keep]], axis=1), axis=1)
+    return np.unique(edges, axis=0)
+
+
+def to_csr(n: int, edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    both = np.concatenate([edges, edges[:, ::-1]])
+    both = both[np.lexsort((both[:, 1], both[:, 0]))]
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(both[:, 0], minlength=n), out=indptr[1:])
+    return indptr, both[:, 1].astype(np.int32)
+
+
+def connect_components(points: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Add the shortest bridge from every stray component to the largest one"""
+    n = len(points)
+    while True:
+        indptr, indices = to_csr(n, edges)
+        dist, _ = bfs(indptr, indices, 0)
+        stray = np.flatnonzero(dist == UNREACHABLE)
+        if not len(stray):
+            return edges
+        reached = np.flatnonzero(dist != UNREACHABLE)
+        if len(reached) < len(stray):
+            reached, stray = stray, reached
+        # The nearest reached point to each stray point, then the closest such pair overall
+        d2 = ((points[stray][:, None, :] - points[reached][None, :, :]) ** 2).sum(axis=2) \
+            if len(stray) * len(reached) < 4_000_000 else None
+        if d2 is None:
+            a = stray[0]
+            b = reached[((points[reached] - points[a]) ** 2).sum(axis=1).argmin()]
+        else:
+            s, r = np.unravel_index(d2.argmin(), d2.shape)
+            a, b = stray[s], reached[r]
+        edges = np.concatenate([edges, [[min(a, b), max(a, b)]]])
+
+
+def place_hqs(indptr: np.ndarray, indices: np.ndarray, rng: np.random.Generator,
+              candidates: int = 8) -> Tuple[int, int, np.ndarray, np.ndarray]:
+    """Two HQs far apart whose hop-distance Voronoi split of the board is as even as possible.
+
+    A double BFS sweep finds one end of a long shortest path; the other HQ is
+    picked among the territories nearly as far away by how evenly the board
+    divides between the two. Returns both HQs and their distance rows.
+    """
+    n = len(indptr) - 1
+    start = int(rng.integers(n))
+    d0, _ = bfs(indptr, indices, start)
+    a = int(d0.argmax())
+    da, _ = bfs(indptr, indices, a)
+    far = np.flatnonzero(da >= 0.9 * da.max())
+    far = far[np.argsort(-da[far])][:candidates]
+    best = None
+    for b in far.tolist():
+        db, _ = bfs(indptr, indices, b)
+        imbalance = abs(int(np.count_nonzero(da < db)) - int(np.count_nonzero(db < da)))
+        if best is None or imbalance < best[0]:
+            best = (imbalance, b, db)
+    return a, best[1], da, best[2]
+
+
+def garrisons(da: np.ndarray, db: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Neutral units: 1 next to an HQ rising to 3 at the middle of the board, sometimes one more"""
+    nearest = np.minimum(da, db)
+    scale = max(1, int(nearest.max()))
+    return 1 + np.round(2 * nearest / scale).astype(np.int32) + (rng.random(len(da)) < 0.25)
+
+
+def territory_names(n: int, rng: np.random.Generator) -> List[str]:
+    first = rng.integers(len(SYLLABLES), size=(n, 2))
+    last = rng.integers(len(SUFFIXES), size=n)
+    return [(SYLLABLES[a] + SYLLABLES[b]).capitalize() + SUFFIXES[c]
+            for a, b, c in zip(first[:, 0].tolist(), first[:, 1].tolist(), last.tolist())]
+
+
+def value_noise(shape: Tuple[int, int], rng: np.random.Generator, octaves: int = 5) -> np.ndarray:
+    """Fractal value noise in [0, 1] from bilinearly upsampled random grids"""
+    h, w = shape
+    total = np.zeros(shape)
+    amplitude, weight = 1.0, 0.0
+    for octave in range(octaves):
+        cells = 4 * 2 ** octave
+        gh, gw = max(2, int(cells * h / w) + 2), cells + 2
+        grid = rng.random((gh, gw))
+        ys = np.linspace(0, gh - 1.001, h)
+        xs = np.linspace(0, gw - 1.001, w)
+        y0, x0 = ys.astype(int), xs.astype(int)
+        fy, fx = (ys - y0)[:, None], (xs - x0)[None, :]
+        top = grid[y0][:, x0] * (1 - fx) + grid[y0][:, x0 + 1] * fx
+        bottom = grid[y0 + 1][:, x0] * (1 - fx) + grid[y0 + 1][:, x0 + 1] * fx
+        total += amplitude * (top * (1 - fy) + bottom * fy)
+        weight += amplitude
+        amplitude *= 0.5
+    return total / weight
+
+
+def box_blur(a: np.ndarray, radius: int) -> np.ndarray:
+    """Mean over a (2r+1)^2 window using summed-area tables"""
+    padded = np.pad(a, radius + 1, mode="edge")
+    s = padded.cumsum(0).cumsum(1)
+    size = 2 * radius + 1
+    window = s[size:, size:] - s[:-size, size:] - s[size:, :-size] + s[:-size, :-size]
+    return window[:a.shape[0], :a.shape[1]] / (size * size)
+
+
+TERRAIN = [  # (height threshold, RGB)
+    (0.30, (46, 84, 138)),  # deep water
+    (0.40, (72, 124, 176)),  # shallows
+    (0.44, (214, 199, 150)),  # beach
+    (0.62, (120, 163, 88)),  # grassland
+    (0.76, (78, 124, 64)),  # forest
+    (0.88, (132, 120, 104)),  # hills
+    (1.01, (222, 222, 226)),  # peaks
+]
+
+
+def terrain_image(points: np.ndarray, width: float, height: float, rng: np.random.Generator,
+                  image_width: int = IMAGE_WIDTH) -> Image.Image:
+    """Noise terrain whose land follows the territories, so every territory sits on solid ground.
+
+    Heights are computed at a quarter of the image size and scaled up
+    bilinearly before colouring; the terrain is smooth enough not to show it.
+    """
+    image_height = max(1, int(round(image_width * height / width)))
+    field_width, field_height = max(4, image_width // 4), max(2, image_height // 4)
+    shape = (field_height, field_width)
+    density = np.zeros(shape)
+    px = np.clip((points[:, 0] / width * field_width).astype(int), 0, field_width - 1)
+    py = np.clip((points[:, 1] / height * field_height).astype(int), 0, field_height - 1)
+    np.add.at(density, (py, px), 1.0)
+    spread = max(1, int(field_width / np.sqrt(len(points) * width / height)))
+    land = box_blur(box_blur(density, spread), spread)
+    land = np.clip(land / max(land.max() * 0.35, 1e-9), 0, 1)
+    heights = 0.55 * land + 0.45 * value_noise(shape, rng)
+    heights = np.asarray(Image.fromarray(heights.astype(np.float32), "F").resize(
+        (image_width, image_height), Image.BILINEAR))
+    palette = np.array([rgb for _, rgb in TERRAIN], dtype=np.uint8)
+    band = np.searchsorted(np.array([t for t, _ in TERRAIN]), heights, side="right")
+    return Image.fromarray(palette[np.minimum(band, len(TERRAIN) - 1)], "RGB")
+
+
+def generate_map(territories: int, seed: Optional[int] = None, spacing: float = SPACING, aspect: float = ASPECT,
+                 hq_units: int = HQ_UNITS, image_path: Optional[str] = None) -> GameMap:
+    """A fresh map with the given number of territories; writes its background to image_path if given"""
+    if territories < 2:
+        raise ValueError("a map needs at least two territories for the HQs")
+    rng = np.random.default_rng(seed)
+    # Size the board for a little more than needed, then drop the surplus at random
+    area = territories * 1.05 * spacing ** 2 / PACKING
+    height = np.sqrt(area / aspect)
+    width = height * aspect
+    points = poisson_disk(width, height, spacing, rng)
+    while len(points) < territories:
+        width, height = width * 1.05, height * 1.05
+        points = poisson_disk(width, height, spacing, rng)
+    points = points[np.sort(rng.choice(len(points), territories, replace=False))]
+
+    knn = nearest_neighbors(points, spacing)
+    edges = connect_components(points, gabriel_edges(points, knn))
+    indptr, indices = to_csr(territories, edges)
+    hq1, hq2, da, db = place_hqs(indptr, indices, rng)
+
+    owner = np.zeros(territories, dtype=np.int8)
+    units = garrisons(da, db, rng)
+    is_hq = np.zeros(territories, dtype=bool)
+    for player, hq in ((1, hq1), (2, hq2)):
+        owner[hq], units[hq], is_hq[hq] = player, hq_units, True
+    ids = [f"t{i}" for i in range(territories)]
+    names = territory_names(territories, rng)
+    ids[hq1], ids[hq2] = "hq1", "hq2"
+    names[hq1], names[hq2] = "Red HQ", "Blue HQ"
+    # Renumber the other territories t1, t2, ... in reading order
+    others = [i for i in range(territories) if i not in (hq1, hq2)]
+    for number, i in enumerate(others, start=1):
+        ids[i] = f"t{number}"
+
+    radius = np.full(territories, int(spacing * 0.4))
+    store = TerritoryStore(ids, names, points[:, 0].round(), points[:, 1].round(), radius, owner, units, is_hq,
+                           indptr, indices)
+    if image_path:
+        terrain_image(points, width, height, rng).save(image_path, compress_level=1)
+    return GameMap(f"Generated {territories} ({seed})", int(np.ceil(width)), int(np.ceil(height)),
+                   ["hq1", "hq2"], store, image_path)
+
+
+def generated_map_path(territories: int, seed: int, cache_dir: str = CACHE_DIR, **options) -> str:
+    """Cache file of a generated map; generate_map options are part of the name, so each variant has its own"""
+    suffix = "".join(f"-{name}={value}" for name, value in sorted(options.items()))
+    return os.path.join(cache_dir, f"generated-{territories}-{seed}{suffix}.npz")
+
+
+def new_game(territories: int, seed: Optional[int] = None, cache_dir: str = CACHE_DIR, **options) -> GameState:
+    """A GameState on a generated map, reusing the cached map file for a seed and options seen before"""
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    path = generated_map_path(territories, seed, cache_dir, **options)
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        stem = os.path.splitext(path)[0]
+        image_path = stem + ".png"
+        # Both files go to temporary names first; the image lands before the map that points at it
+        game_map = generate_map(territories, seed, image_path=stem + ".tmp.png", **options)
+        os.replace(game_map.image, image_path)
+        game_map.image = image_path
+        save_binary(game_map, stem + ".tmp.npz")
+        os.replace(stem + ".tmp.npz", path)
+    return GameState(load_map(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a map with any number of territories")
+    parser.add_argument("territories", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--spacing", type=float, default=SPACING, help="minimum distance between territories")
+    parser.add_argument("--hq-units", type=int, default=HQ_UNITS)
+    parser.add_argument("--out", help="write the map here (.npz or .json, image alongside as .png)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.out:
+        image_path = os.path.splitext(args.out)[0] + ".png"
+        game_map = generate_map(args.territories, args.seed, args.spacing, hq_units=args.hq_units,
+                                image_path=image_path)
+        if args.out.endswith(".json"):
+            from realm.maps import save_json
+            save_json(game_map, args.out)
+        else:
+            save_binary(game_map, args.out)
+    else:
+        game_map = generate_map(args.territories, args.seed, args.spacing, hq_units=args.hq_units)
+    store = game_map.store
+    print(f"{game_map.name}: {len(store)} territories, {len(store.indices) // 2} borders, "
+          f"{game_map.width}x{game_map.height} in {time.perf_counter() - start:.2f}s"
+          + (f" -> {args.out}" if args.out else ""))
+
+
+if __name__ == "__main__":
+    main()
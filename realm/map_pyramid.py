@@ -0,0 +1,221 @@
+"""Pre-scaled copies of a base map image, stored raw on disk and memory-mapped.
+
+Decoding a large PNG and resampling it from full resolution is the most
+expensive part of drawing a new map size. A pyramid holds the image at full
+size, at each halving down to MIN_LEVEL_WIDTH, and at any exact sizes asked
+for up front, as uncompressed ``.npy`` arrays. Any size is then served by a
+cheap resize from the smallest level that still covers it. The level files
+are opened with ``mmap_mode='r'``, so every worker process reads the same
+page-cache pages instead of holding its own decoded copy.
+
+Build pyramids ahead of time with::
+
+    python -m realm.map_pyramid GameMapV3.png --size 720x360
+
+or let ``get_pyramid`` build one on first use.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from realm.maps import load_map
+
+PYRAMID_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "pyramid")
+MIN_LEVEL_WIDTH = 128
+# Sizes the app draws by default, built as exact levels so they need no resize at all
+DEFAULT_SIZES = ((720, 360),)
+MANIFEST = "manifest.json"
+
+Size = Tuple[int, int]
+
+_lock = threading.Lock()
+_pyramids: Dict[Tuple[str, int], "Pyramid"] = {}
+
+
+class Pyramid:
+    """Levels of one source image, largest first; level arrays are memory-mapped on first use"""
+
+    def __init__(self, directory: str, sizes: Sequence[Size]):
+        self.directory = directory
+        self.sizes: List[Size] = sorted((tuple(s) for s in sizes), key=lambda s: s[0] * s[1], reverse=True)
+        self._arrays: Dict[Size, np.ndarray] = {}
+
+    @classmethod
+    def open(cls, directory: str) -> "Pyramid":
+        with open(os.path.join(directory, MANIFEST)) as fh:
+            return cls(directory, json.load(fh)["sizes"])
+
+    def level_for(self, width: int, height: int) -> Size:
+        """Smallest level at least as large as (width, height), or the full image when none is"""
+        best = self.sizes[0]
+        for w, h in self.sizes:
+            if w >= width and h >= height and w * h < best[0] * best[1]:
+                best = (w, h)
+        return best
+
+    def level(self, size: Size) -> np.ndarray:
+        """Read-only (height, width, 3) uint8 view of one level"""
+        array = self._arrays.get(size)
+        if array is None:
+            array = np.load(os.path.join(self.directory, level_name(size)), mmap_mode="r")
+            self._arrays[size] = array
+        return array
+
+    def image(self, width: int, height: int) -> Image.Image:
+        """The image at exactly (width, height), resized from the nearest level when not stored"""
+        size = self.level_for(width, height)
+        img = Image.fromarray(np.asarray(self.level(size)), "RGB")
+        if size != (width, height):
+            img = img.resize((width, height), Image.BICUBIC)
+        return img
+
+
+def level_name(size: Size) -> str:
+    return f"level-{size[0]}x{size[1]}.npy"
+
+
+def pyramid_dir(path: str, root: str = PYRAMID_DIR) -> str:
+    """Directory for the pyramid of one version of an image file"""
+    full_path = os.path.abspath(path)
+    stat = os.stat(full_path)
+    digest = hashlib.blake2b(f"{full_path}\0{stat.st_mtime_ns}\0{stat.st_size}".encode(), digest_size=12)
+    return os.path.join(root, digest.hexdigest())
+
+
+def level_sizes(width: int, height: int, extra: Sequence[Size] = (), min_width: int = MIN_LEVEL_WIDTH) -> List[Size]:
+    """Full size, each halving down to min_width, and the extra sizes that fit inside the image"""
+    sizes = [(width, height)]
+    while sizes[-1][0] // 2 >= min_width and sizes[-1][1] >= 2:
+        sizes.append((sizes[-1][0] // 2, sizes[-1][1] // 2))
+    for w, h in extra:
+        if w <= width and h <= height and (w, h) not in sizes:
+            sizes.append((w, h))
+    return sizes
+
+
+def build_pyramid(path: str, sizes: Sequence[Size] = DEFAULT_SIZES, root: str = PYRAMID_DIR) -> Pyramid:
+    """Decode path once and write its levels; an existing pyramid only gets the requested levels it lacks.
+
+    Levels are written to a temporary directory that is renamed into place, so
+    concurrent builders never see a partial pyramid; the loser of a race
+    discards its copy.
+    """
+    directory = pyramid_dir(path, root)
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        return extend_pyramid(Pyramid.open(directory), sizes)
+    os.makedirs(root, exist_ok=True)
+    with Image.open(path) as src:
+        full = src.convert("RGB")
+    tmp = tempfile.mkdtemp(prefix=".build-", dir=root)
+    try:
+        levels = level_sizes(full.width, full.height, sizes)
+        built: List[Image.Image] = []
+        for size in levels:
+            # Resample from the smallest level already built that covers this one
+            source = min((img for img in built if img.width >= size[0] and img.height >= size[1]),
+                         key=lambda img: img.width * img.height, default=full)
+            img = source if source.size == size else source.resize(size, Image.LANCZOS)
+            np.save(os.path.join(tmp, level_name(size)), np.asarray(img))
+            built.append(img)
+        with open(os.path.join(tmp, MANIFEST), "w") as fh:
+            json.dump({"source": os.path.abspath(path), "sizes": levels}, fh)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            if not os.path.exists(os.path.join(directory, MANIFEST)):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return Pyramid.open(directory)
+
+
+def extend_pyramid(pyramid: Pyramid, sizes: Sequence[Size]) -> Pyramid:
+    """Add the exact levels among sizes that pyramid lacks, resampled from the levels it has.
+
+    Each new level file and then the manifest are written to a temporary
+    name and renamed into place, so readers see either the old level set or
+    the new one, never a partial file.
+    """
+    width, height = pyramid.sizes[0]
+    missing = [size for size in level_sizes(width, height, sizes) if size not in pyramid.sizes]
+    if not missing:
+        return pyramid
+    directory = pyramid.directory
+    for size in missing:
+        source = Image.fromarray(np.asarray(pyramid.level(pyramid.level_for(*size))), "RGB")
+        tmp = os.path.join(directory, f".{level_name(size)}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.save(fh, np.asarray(source.resize(size, Image.LANCZOS)))
+        os.replace(tmp, os.path.join(directory, level_name(size)))
+    # Re-read the manifest so levels another process added meanwhile are kept
+    levels = [tuple(s) for s in Pyramid.open(directory).sizes]
+    levels += [size for size in missing if size not in levels]
+    with open(os.path.join(directory, MANIFEST)) as fh:
+        manifest = json.load(fh)
+    manifest["sizes"] = levels
+    tmp = os.path.join(directory, f".{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+    return Pyramid.open(directory)
+
+
+def get_pyramid(path: str, root: str = PYRAMID_DIR) -> Pyramid:
+    """Pyramid for the current version of path, built on first use and reused within the process"""
+    full_path = os.path.abspath(path)
+    key = (full_path, os.stat(full_path).st_mtime_ns)
+    with _lock:
+        pyramid = _pyramids.get(key)
+    if pyramid is None:
+        pyramid = build_pyramid(full_path, root=root)
+        with _lock:
+            for stale in [k for k in _pyramids if k[0] == full_path]:
+                del _pyramids[stale]
+            _pyramids[key] = pyramid
+    return pyramid
+
+
+def clear():
+    """Forget the open pyramids (the files on disk stay)"""
+    with _lock:
+        _pyramids.clear()
+
+
+def parse_size(text: str) -> Size:
+    width, _, height = text.lower().partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build pre-scaled pyramids for base map images")
+    parser.add_argument("images", nargs="*", help="image files (default: the bundled map's image)")
+    parser.add_argument("--size", type=parse_size, action="append", default=[],
+                        help="extra exact level as WIDTHxHEIGHT, added to an existing pyramid too; "
+                             "repeatable (default: 720x360)")
+    parser.add_argument("--root", default=PYRAMID_DIR)
+    args = parser.parse_args(argv)
+
+    images = args.images
+    if not images:
+        images = [load_map().image]
+    for path in images:
+        start = time.perf_counter()
+        pyramid = build_pyramid(path, args.size or DEFAULT_SIZES, args.root)
+        levels = ", ".join(f"{w}x{h}" for w, h in pyramid.sizes)
+        print(f"{path}: {levels} in {pyramid.directory} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Map definitions: JSON for authoring, a compact .npz form for fast loading.
+
+JSON layout::
+
+    {"name": ..., "image": "../GameMapV3.png", "width": 800, "height": 400,
+     "hqs": ["hq1", "hq2"],
+     "territories": [{"id": "hq1", "name": "Red HQ", "x": 60, "y": 300,
+                      "radius": 30, "owner": 1, "units": 30, "hq": true}, ...],
+     "adjacency": {"hq1": ["t1", "t5"], ...}}
+
+``image`` is relative to the map file. Compile a map with
+``python -m realm.maps compile maps/realm.json``.
+"""
+import argparse
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from realm.store import TerritoryStore
+
+MAPS_DIR = Path(__file__).resolve().parent.parent / "maps"
+DEFAULT_MAP = str(MAPS_DIR / "realm.json")
+
+# Templates handed over already built (by the asset bundle), keyed like _load_template
+_preloaded: Dict[Tuple[str, int], "GameMap"] = {}
+
+
+@dataclass
+class GameMap:
+    name: str
+    width: int  # coordinate space of x, y and radius
+    height: int
+    hqs: List[str]  # HQ territory of player 1, player 2
+    store: TerritoryStore = field(repr=False)
+    image: Optional[str] = None  # absolute path of the background image
+    source: Optional[str] = None  # file the map was loaded from, if any
+
+    def copy(self) -> "GameMap":
+        """Same map with fresh owner and unit columns"""
+        return GameMap(self.name, self.width, self.height, list(self.hqs), self.store.copy(), self.image,
+                       self.source)
+
+
+def parse_map(data: dict, base_dir: str = ".") -> GameMap:
+    """Build a GameMap from the JSON structure described in the module docstring"""
+    rows = data["territories"]
+    ids = [t["id"] for t in rows]
+    index = {tid: i for i, tid in enumerate(ids)}
+    if len(index) != len(ids):
+        raise ValueError("duplicate territory ids in map")
+    adjacency = data.get("adjacency", {})
+    indptr = [0]
+    indices: List[int] = []
+    for tid in ids:
+        for other in adjacency.get(tid, []):
+            if other not in index:
+                raise ValueError(f"{tid} is adjacent to unknown territory {other}")
+            indices.append(index[other])
+        indptr.append(len(indices))
+    hqs = list(data["hqs"])
+    for hq in hqs:
+        if hq not in index:
+            raise ValueError(f"unknown HQ territory {hq}")
+    store = TerritoryStore(
+        ids, [t.get("name", t["id"]) for t in rows],
+        [t["x"] for t in rows], [t["y"] for t in rows], [t["radius"] for t in rows],
+        [t.get("owner", 0) for t in rows], [t.get("units", 0) for t in rows],
+        [t.get("hq", False) for t in rows], indptr, indices,
+    )
+    image = data.get("image")
+    if image:
+        image = os.path.normpath(os.path.join(base_dir, image))
+    return GameMap(data.get("name", "Untitled"), int(data["width"]), int(data["height"]), hqs, store, image)
+
+
+def map_to_dict(game_map: GameMap, base_dir: str = ".") -> dict:
+    """Inverse of parse_map, with the image path made relative to base_dir"""
+    store = game_map.store
+    territories = []
+    for i, tid in enumerate(store.ids):
+        row = {"id": tid, "name": store.names[i], "x": int(store.x[i]), "y": int(store.y[i]),
+               "radius": int(store.radius[i]), "owner": int(store.owner[i]), "units": int(store.units[i])}
+        if store.is_hq[i]:
+            row["hq"] = True
+        territories.append(row)
+    return {
+        "name": game_map.name,
+        "image": os.path.relpath(game_map.image, base_dir) if game_map.image else None,
+        "width": game_map.width,
+        "height": game_map.height,
+        "hqs": game_map.hqs,
+        "territories": territories,
+        "adjacency": {tid: store.neighbor_ids(tid) for tid in store.ids},
+    }
+
+
+def save_json(game_map: GameMap, path: str):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(map_to_dict(game_map, os.path.dirname(os.path.abspath(path))), fh, indent=2)
+
+
+def save_binary(game_map: GameMap, path: str):
+    """Write the compact form: one array per column plus a small JSON header"""
+    store = game_map.store
+    base_dir = os.path.dirname(os.path.abspath(path))
+    meta = {
+        "name": game_map.name, "width": game_map.width, "height": game_map.height, "hqs": game_map.hqs,
+        "image": os.path.relpath(game_map.image, base_dir) if game_map.image else None,
+    }
+    np.savez(
+        path, meta=np.array(json.dumps(meta)), ids=np.array(store.ids), names=np.array(store.names),
+        x=store.x, y=store.y, radius=store.radius, owner=store.owner, units=store.units,
+        is_hq=store.is_hq, indptr=store.indptr, indices=store.indices,
+    )
+
+
+def _load_binary(path: str) -> GameMap:
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        store = TerritoryStore(
+            data["ids"].tolist(), data["names"].tolist(), data["x"], data["y"], data["radius"],
+            data["owner"], data["units"], data["is_hq"], data["indptr"], data["indices"],
+        )
+    image = meta.get("image")
+    if image:
+        image = os.path.normpath(os.path.join(os.path.dirname(path), image))
+    return GameMap(meta["name"], meta["width"], meta["height"], meta["hqs"], store, image)
+
+
+@lru_cache(maxsize=16)
+def _load_template(path: str, mtime_ns: int) -> GameMap:
+    if path.endswith(".npz"):
+        game_map = _load_binary(path)
+    else:
+        with open(path, encoding="utf-8") as fh:
+            game_map = parse_map(json.load(fh), os.path.dirname(path))
+    game_map.source = path
+    return game_map
+
+
+def preload_map(game_map: GameMap, path: str, mtime_ns: int):
+    """Serve load_map(path) from game_map while the file still has this mtime"""
+    full_path = os.path.abspath(path)
+    game_map.source = full_path
+    _preloaded[(full_path, mtime_ns)] = game_map
+
+
+def load_map(path: str = DEFAULT_MAP) -> GameMap:
+    """Load a .json or .npz map; files are parsed once per process and copied per game"""
+    full_path = os.path.abspath(path)
+    key = (full_path, os.stat(full_path).st_mtime_ns)
+    template = _preloaded.get(key)
+    if template is None:
+        template = _load_template(*key)
+    return template.copy()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Map file tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = sub.add_parser("compile", help="convert a JSON map to the compact .npz form")
+    compile_cmd.add_argument("source")
+    compile_cmd.add_argument("output", nargs="?")
+    args = parser.parse_args(argv)
+
+    game_map = load_map(args.source)
+    output = args.output or str(Path(args.source).with_suffix(".npz"))
+    save_binary(game_map, output)
+    print(f"{game_map.name}: {len(game_map.store)} territories, "
+          f"{game_map.store.nbytes} bytes of arrays -> {output}")
+
+
+if __name__ == "__main__":
+    main()
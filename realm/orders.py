@@ -0,0 +1,96 @@
+"""Turn orders staged in the UI and the board they are expected to produce.
+
+The movement panel collects ``engine.Order`` tuples without touching the
+game, shows the projected board, and hands the whole list to
+``engine.apply_orders`` once. The projection uses the exact odds table: an
+attack is shown as won when it is more likely than not, with the survivors
+expected from a win, and as lost otherwise, taking every committed unit.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from realm.board import Board
+from realm.combat_odds import combat_odds
+from realm.engine import ORDER_KINDS, Order
+from realm.pathing import UNREACHABLE, bfs
+from realm.state import GameState
+
+
+def check_order(game: GameState, board: Board, order: Order):
+    """Raise ValueError unless the current player could give order on board"""
+    kind, from_id, to_id, num_units = order
+    if kind not in ORDER_KINDS:
+        raise ValueError(f"unknown order {kind!r}")
+    store = game.store
+    for tid in (from_id, to_id):
+        if tid not in store.index:
+            raise ValueError(f"unknown territory {tid!r}")
+    src, dst = store.index[from_id], store.index[to_id]
+    player = game.current_player
+    if board.owner[src] != player:
+        raise ValueError(f"{from_id} would not be held by player {player}")
+    available = int(board.units[src]) - 1
+    if not 1 <= num_units <= available:
+        raise ValueError(f"cannot order {num_units} units out of {available + 1} from {from_id}")
+    if kind == 'move':
+        if dst not in store.neighbors(src):
+            raise ValueError(f"{to_id} is not adjacent to {from_id}")
+    else:
+        dist, _ = bfs(store.indptr, store.indices, src, allowed=board.owner == player)
+        if src == dst or dist[dst] == UNREACHABLE:
+            raise ValueError(f"{to_id} would not be reachable through player {player}'s territory")
+
+
+def project_order(game: GameState, board: Board, order: Order):
+    """Apply one order to board in place, resolving any battle as its likelier outcome"""
+    check_order(game, board, order)
+    _, from_id, to_id, num_units = order
+    src, dst = game.store.index[from_id], game.store.index[to_id]
+    board.units[src] -= num_units
+    player = game.current_player
+    defender = int(board.owner[dst])
+    if defender == player:
+        board.units[dst] += num_units
+        return
+    odds = combat_odds('neutral' if defender == 0 else 'pvp', num_units, int(board.units[dst]))
+    if odds.p_conquer >= 0.5:
+        board.owner[dst] = player
+        board.units[dst] = max(1, round(odds.expected_survivors / odds.p_conquer))
+
+
+def project(game: GameState, orders: Sequence[Order]) -> Board:
+    """The board expected after orders; ValueError names the first order that could not be given"""
+    board = Board.from_store(game.store)
+    for number, order in enumerate(orders, 1):
+        try:
+            project_order(game, board, order)
+        except ValueError as exc:
+            raise ValueError(f"order {number}: {exc}") from None
+    return board
+
+
+def ready_sources(game: GameState, board: Board) -> List[str]:
+    """Territories the current player could still order units out of on board"""
+    ready = np.flatnonzero((board.owner == game.current_player) & (board.units > 1))
+    return [game.store.ids[i] for i in ready.tolist()]
+
+
+def order_targets(game: GameState, board: Board, from_id: str,
+                  march_limit: Optional[int] = None) -> List[Tuple[str, str, int]]:
+    """(kind, target, hops) open from from_id on board: neighbors first, then marches, nearest first"""
+    store = game.store
+    src = store.index[from_id]
+    targets = [('move', store.ids[j], 1) for j in store.neighbors(src).tolist()]
+    dist, _ = bfs(store.indptr, store.indices, src, allowed=board.owner == game.current_player)
+    far = np.flatnonzero(dist >= 2)
+    far = far[np.argsort(dist[far], kind="stable")][:march_limit]
+    targets.extend(('march', store.ids[i], int(dist[i])) for i in far.tolist())
+    return targets
+
+
+def changed_territories(game: GameState, board: Board) -> List[str]:
+    """Ids whose owner or units differ between the game and a projected board"""
+    store = game.store
+    changed = np.flatnonzero((store.owner != board.owner) | (store.units != board.units))
+    return [store.ids[i] for i in changed.tolist()]
@@ -0,0 +1,144 @@
+"""Shortest paths and friendly reachability over a store's CSR adjacency.
+
+``bfs`` runs one vectorized breadth-first search from a source, level by
+level over the whole frontier at once.
+
+``FriendlyComponents`` labels the connected components of same-owner
+territories. ``TerritoryStore.set_owner`` reports each change of hands, and
+only the two components it touches are relabeled: the loser's, which may
+split, and the winner's, which may merge. Every relabeled component gets
+fresh labels, so cached friendly paths keyed by label expire by themselves.
+"""
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+MAX_ROWS = 512  # cached BFS rows per component index
+UNREACHABLE = -1
+
+
+def bfs(indptr: np.ndarray, indices: np.ndarray, source: int,
+        allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Hop distance and BFS parent of every node from source.
+
+    Only nodes where allowed is True are entered; unreached nodes get
+    UNREACHABLE in both arrays.
+    """
+    n = len(indptr) - 1
+    dist = np.full(n, UNREACHABLE, dtype=np.int32)
+    parent = np.full(n, UNREACHABLE, dtype=np.int32)
+    dist[source] = 0
+    frontier = np.array([source], dtype=np.int32)
+    level = 0
+    while len(frontier):
+        level += 1
+        starts, ends = indptr[frontier], indptr[frontier + 1]
+        counts = ends - starts
+        # Concatenated neighbor lists of the whole frontier, and who they came from
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        nbrs = indices[np.arange(counts.sum()) + offsets]
+        froms = np.repeat(frontier, counts)
+        fresh = dist[nbrs] == UNREACHABLE
+        if allowed is not None:
+            fresh &= allowed[nbrs]
+        nbrs, first = np.unique(nbrs[fresh], return_index=True)
+        dist[nbrs] = level
+        parent[nbrs] = froms[fresh][first]
+        frontier = nbrs
+    return dist, parent
+
+
+def walk_back(parent: np.ndarray, source: int, target: int) -> List[int]:
+    path = [target]
+    while path[-1] != source:
+        path.append(int(parent[path[-1]]))
+    path.reverse()
+    return path
+
+
+class FriendlyComponents:
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, owner: np.ndarray, max_rows: int = MAX_ROWS):
+        self.indptr = indptr
+        self.indices = indices
+        self.owner = owner  # the store's live column
+        self.max_rows = max_rows
+        self._rows: "OrderedDict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self.rebuild()
+
+    def rebuild(self):
+        """Label every component from scratch (min-label propagation with pointer jumping)"""
+        n = len(self.owner)
+        rows = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.indptr))
+        same = self.owner[rows] == self.owner[self.indices]
+        a, b = rows[same], self.indices[same]
+        labels = np.arange(n, dtype=np.int32)
+        while True:
+            lowest = labels.copy()
+            np.minimum.at(lowest, a, labels[b])
+            lowest = lowest[lowest]
+            if np.array_equal(lowest, labels):
+                break
+            labels = lowest
+        self.labels = labels
+        self._next_label = n
+        self._rows.clear()
+
+    def _fresh(self) -> int:
+        self._next_label += 1
+        return self._next_label - 1
+
+    def owner_changed(self, i: int, old: int):
+        """Relabel the components touched by territory i leaving owner old (store.owner already updated)"""
+        labels = self.labels
+        nbrs = self.indices[self.indptr[i]:self.indptr[i + 1]]
+        # The old component loses i and may fall apart
+        members = np.flatnonzero(labels == labels[i])
+        members = members[members != i]
+        if np.count_nonzero(self.owner[nbrs] == old) <= 1:
+            # i was a leaf of its component (or alone), so the rest stays connected
+            if len(members):
+                labels[members] = self._fresh()
+        else:
+            allowed = np.zeros(len(labels), dtype=bool)
+            allowed[members] = True
+            while len(members):
+                dist, _ = bfs(self.indptr, self.indices, int(members[0]), allowed)
+                piece = np.flatnonzero(dist != UNREACHABLE)
+                labels[piece] = self._fresh()
+                allowed[piece] = False
+                members = members[allowed[members]]
+        # i joins, and possibly bridges, the new owner's neighboring components
+        joined = np.unique(labels[nbrs[self.owner[nbrs] == self.owner[i]]])
+        label = self._fresh()
+        if len(joined):
+            labels[np.isin(labels, joined)] = label
+        labels[i] = label
+
+    def connected(self, a: int, b: int) -> bool:
+        """Same owner and linked through that owner's territory"""
+        return bool(self.labels[a] == self.labels[b])
+
+    def component(self, i: int) -> np.ndarray:
+        return np.flatnonzero(self.labels == self.labels[i])
+
+    def _row(self, a: int) -> Tuple[np.ndarray, np.ndarray]:
+        key = (a, int(self.labels[a]))
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = bfs(self.indptr, self.indices, a, self.labels == self.labels[a])
+            if len(self._rows) > self.max_rows:
+                self._rows.popitem(last=False)
+        else:
+            self._rows.move_to_end(key)
+        return row
+
+    def distances(self, a: int) -> np.ndarray:
+        """Hops from a to every territory of its component through it, UNREACHABLE elsewhere"""
+        return self._row(a)[0]
+
+    def path(self, a: int, b: int) -> Optional[List[int]]:
+        """Shortest path from a to b through their owner's territory, or None"""
+        if not self.connected(a, b):
+            return None
+        return walk_back(self._row(a)[1], a, b)
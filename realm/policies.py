@@ -0,0 +1,79 @@
+"""Scripted players for rollouts, tournaments and tests.
+
+A policy looks at the game during its movement phase and returns the next
+move as ``(source, target, units)``, or ``None`` to end movement.
+"""
+import random
+from typing import Callable, Dict, Optional, Tuple
+
+from realm import engine
+from realm.combat_odds import combat_odds
+from realm.state import GameState
+
+Move = Tuple[str, str, int]
+Policy = Callable[[GameState, random.Random], Optional[Move]]
+
+# Hard stop so a policy that shuffles units back and forth still ends its turn
+MAX_ACTIONS_PER_TURN = 12
+RANDOM_END_CHANCE = 0.2
+GREEDY_MIN_ODDS = 0.6
+
+
+def passive_policy(game: GameState, rng: random.Random) -> Optional[Move]:
+    """Never moves"""
+    return None
+
+
+def random_policy(game: GameState, rng: random.Random) -> Optional[Move]:
+    """Uniformly random legal move with a random stack size"""
+    moves = engine.legal_moves(game)
+    if not moves or rng.random() < RANDOM_END_CHANCE:
+        return None
+    source, target, max_units = rng.choice(moves)
+    return source, target, rng.randint(1, max_units)
+
+
+def greedy_policy(game: GameState, rng: random.Random) -> Optional[Move]:
+    """Attack wherever the exact odds are good, HQs first; an HQ keeps half its stack home"""
+    best = None
+    for source, target_id, max_units in engine.legal_moves(game):
+        target = game.territories[target_id]
+        if target.owner == game.current_player:
+            continue
+        if game.territories[source].is_hq:
+            max_units = (max_units + 1) // 2
+        odds = combat_odds('neutral' if target.owner == 0 else 'pvp', max_units, target.units)
+        if odds.p_conquer < GREEDY_MIN_ODDS:
+            continue
+        score = odds.p_conquer + (1.0 if target.is_hq else 0.0) + 0.01 * odds.expected_survivors
+        if best is None or score > best[0]:
+            best = (score, (source, target_id, max_units))
+    return best[1] if best else None
+
+
+POLICIES: Dict[str, Policy] = {
+    "passive": passive_policy,
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+
+def play_movement(game: GameState, policy: Policy, rng: random.Random,
+                  max_actions: int = MAX_ACTIONS_PER_TURN) -> int:
+    """Let policy act until it passes or hits the action cap; returns moves made"""
+    made = 0
+    while made < max_actions:
+        move = policy(game, rng)
+        if move is None:
+            break
+        engine.apply_move(game, *move)
+        made += 1
+    return made
+
+
+def play_turn(game: GameState, policy: Policy, rng: random.Random,
+              max_actions: int = MAX_ACTIONS_PER_TURN):
+    """A full turn: movement by policy, then the reinforcement roll"""
+    play_movement(game, policy, rng, max_actions)
+    engine.end_movement(game)
+    engine.reinforce(game)
@@ -0,0 +1,211 @@
+"""In-process cache for the decoded base map, fonts and encoded map images used by the map renderer"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from realm.hit_index import HitIndex
+
+if TYPE_CHECKING:  # PIL is imported on first use; the browser-drawn map never needs it
+    from PIL import Image
+
+# How many resized copies of the base map to keep around (one per requested size)
+MAX_BASE_SIZES = 4
+# Rendered layouts (centers, radii and their hit index) kept per map size and map
+MAX_LAYOUTS = 8
+FONT_CANDIDATES = ("arial.ttf", "DejaVuSans.ttf")
+# Encoded map images kept per state fingerprint and encoding
+MAX_ENCODED = 32
+# Output encodings for rendered maps: name -> MIME type
+ENCODINGS = {
+    "png": "image/png",  # lossless, fast zlib level
+    "png8": "image/png",  # quantized to a 256-colour palette
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+DEFAULT_QUALITY = 80  # for webp and jpeg
+
+_lock = threading.Lock()
+_base_maps: "OrderedDict[Tuple[str, int, int, int], Image.Image]" = OrderedDict()
+_layouts: "OrderedDict[Hashable, HitIndex]" = OrderedDict()
+_encoded: "OrderedDict[Hashable, EncodedImage]" = OrderedDict()
+# Pixels and font files handed over by the asset bundle, used before anything is decoded or searched
+_preloaded_maps: Dict[Tuple[str, int, int, int], np.ndarray] = {}
+_font_files: Dict[str, bytes] = {}
+
+
+class EncodedImage:
+    """Already-encoded image bytes; save() writes them out as-is, for APIs that expect a PIL image"""
+    __slots__ = ("data", "encoding")
+
+    def __init__(self, data: bytes, encoding: str):
+        self.data = data
+        self.encoding = encoding
+
+    @property
+    def mime(self) -> str:
+        return ENCODINGS[self.encoding]
+
+    def save(self, fp, format=None, **params):
+        fp.write(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+def file_stamp(path: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None when there is no such file; changes whenever it is rewritten"""
+    try:
+        info = os.stat(path) if path else None
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size) if info else None
+
+
+def preload_base_map(path: str, mtime_ns: int, pixels: np.ndarray):
+    """Serve get_base_map(path) at the size of pixels (an (h, w, 3) array) without decoding"""
+    height, width = pixels.shape[:2]
+    _preloaded_maps[(os.path.abspath(path), mtime_ns, width, height)] = pixels
+
+
+def preload_fonts(files: Dict[str, bytes]):
+    """Use these font files (name -> contents) instead of searching the system for FONT_CANDIDATES"""
+    _font_files.update(files)
+    get_fonts.cache_clear()
+
+
+def get_base_map(path: str, width: int, height: int) -> "Image.Image":
+    """Return the base map resized to (width, height), reading it only when the file or size changes.
+
+    Sizes come from the image's pre-scaled pyramid (built on first use), so a
+    new size costs a resize from the nearest level rather than a full decode.
+
+    The returned image is shared between reruns and must not be drawn on; callers
+    composite their overlays onto a ``copy()``. Raises FileNotFoundError like
+    ``Image.open`` when the file is missing.
+    """
+    full_path = os.path.abspath(path)
+    mtime = os.stat(full_path).st_mtime_ns
+    key = (full_path, mtime, width, height)
+    with _lock:
+        img = _base_maps.get(key)
+        if img is not None:
+            _base_maps.move_to_end(key)
+            return img
+
+    pixels = _preloaded_maps.get(key)
+    if pixels is not None:
+        from PIL import Image
+        img = Image.fromarray(pixels, "RGB")
+    else:
+        from realm import map_pyramid
+        img = map_pyramid.get_pyramid(full_path).image(width, height)
+
+    with _lock:
+        # A newer file on disk invalidates every size decoded from the old one
+        for stale in [k for k in _base_maps if k[0] == full_path and k[1] != mtime]:
+            del _base_maps[stale]
+        _base_maps[key] = img
+        while len(_base_maps) > MAX_BASE_SIZES:
+            _base_maps.popitem(last=False)
+    return img
+
+
+@lru_cache(maxsize=8)
+def get_fonts(units_size: int = 18, label_size: int = 12):
+    """Resolve the unit-count and label fonts once per process"""
+    from PIL import ImageFont
+    if _font_files:
+        data = next(iter(_font_files.values()))
+        return ImageFont.truetype(BytesIO(data), units_size), ImageFont.truetype(BytesIO(data), label_size)
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, units_size), ImageFont.truetype(name, label_size)
+        except Exception:
+            continue
+    return ImageFont.load_default(), ImageFont.load_default()
+
+
+def resolve_font_file() -> Optional[str]:
+    """Path of the first FONT_CANDIDATES font PIL can find, or None when only the default font is left"""
+    from PIL import ImageFont
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, 12).path
+        except Exception:
+            continue
+    return None
+
+
+def get_layout(key: Hashable, build: Callable[[], dict]) -> HitIndex:
+    """Return the hit index for a layout, calling build() for its positions only on a miss"""
+    with _lock:
+        index = _layouts.get(key)
+        if index is not None:
+            _layouts.move_to_end(key)
+            return index
+    index = HitIndex(build())
+    with _lock:
+        _layouts[key] = index
+        while len(_layouts) > MAX_LAYOUTS:
+            _layouts.popitem(last=False)
+    return index
+
+
+def fingerprint(*parts) -> str:
+    """Cheap digest of everything a rendered image depends on (arrays are hashed by their bytes)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.tobytes() if isinstance(part, np.ndarray) else repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def encode_image(img: "Image.Image", encoding: str = "png", quality: int = DEFAULT_QUALITY) -> EncodedImage:
+    """Encode img in one of ENCODINGS"""
+    from PIL import Image
+    buffer = BytesIO()
+    if encoding == "png":
+        img.save(buffer, format="PNG", compress_level=1)
+    elif encoding == "png8":
+        img.convert("RGB").quantize(256, method=Image.Quantize.FASTOCTREE).save(buffer, format="PNG", compress_level=6)
+    elif encoding == "webp":
+        img.save(buffer, format="WEBP", quality=quality, method=4)
+    elif encoding == "jpeg":
+        img.convert("RGB").save(buffer, format="JPEG", quality=quality)
+    else:
+        raise ValueError(f"unknown encoding {encoding!r}; expected one of {sorted(ENCODINGS)}")
+    return EncodedImage(buffer.getvalue(), encoding)
+
+
+def get_encoded(key: Hashable, render: Callable[[], "Image.Image"], encoding: str = "png",
+                quality: int = DEFAULT_QUALITY) -> EncodedImage:
+    """Return the encoded image for a state fingerprint, rendering and encoding only on a miss"""
+    full_key = (key, encoding, quality if encoding in ("webp", "jpeg") else None)
+    with _lock:
+        encoded = _encoded.get(full_key)
+        if encoded is not None:
+            _encoded.move_to_end(full_key)
+            return encoded
+    encoded = encode_image(render(), encoding, quality)
+    with _lock:
+        _encoded[full_key] = encoded
+        while len(_encoded) > MAX_ENCODED:
+            _encoded.popitem(last=False)
+    return encoded
+
+
+def clear():
+    """Drop all cached base maps, layouts, encoded images and fonts (preloaded assets stay)"""
+    from realm import map_pyramid
+    map_pyramid.clear()
+    with _lock:
+        _base_maps.clear()
+        _layouts.clear()
+        _encoded.clear()
+    get_fonts.cache_clear()
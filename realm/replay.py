@@ -0,0 +1,197 @@
+"""Event-sourced game records with periodic snapshots.
+
+A ``GameRecord`` holds the dice seed and every command applied through the
+engine (start, move, march, end of movement, reinforcement). Re-applying the
+commands to a fresh ``GameState`` with the same seed reproduces the game
+exactly. Snapshots taken every ``snapshot_every`` events bound the work
+needed to reach any point: seeking restores the nearest earlier snapshot
+and replays only the events after it.
+
+Records can stream to an append-only gzip file of JSON lines::
+
+    ["header", {"seed": ..., "map": ..., "snapshot_every": ...}]
+    ["event", ["move", "hq1", "t1", 3]]
+    ["snapshot", 50, {...}]
+"""
+import base64
+import bisect
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from realm import engine
+from realm.maps import GameMap, load_map
+from realm.state import GameState
+
+SNAPSHOT_EVERY = 50
+
+Event = Tuple[Any, ...]
+
+
+class GameRecord:
+    def __init__(self, seed: int, map_source: Optional[str], snapshot_every: int = SNAPSHOT_EVERY,
+                 path: Optional[str] = None):
+        self.seed = seed
+        self.map_source = map_source
+        self.snapshot_every = snapshot_every
+        self.events: List[Event] = []
+        self.snapshots: Dict[int, Dict[str, Any]] = {}
+        self._snapshot_at: List[int] = []  # sorted snapshot positions, for bisect
+        self.turn_starts: Dict[int, int] = {1: 0}  # turn -> index of its first event
+        self.path = path
+        self._pending: List[str] = []
+
+    @classmethod
+    def attach(cls, game: GameState, snapshot_every: int = SNAPSHOT_EVERY,
+               path: Optional[str] = None) -> "GameRecord":
+        """Start recording game from its current state"""
+        record = cls(game.seed, game.game_map.source, snapshot_every, path)
+        if path:
+            record._pending.append(json.dumps(["header", record._header()]))
+        record._add_snapshot(0, game.snapshot())
+        record.turn_starts = {game.turn_count: 0}
+        game.history = record
+        return record
+
+    def _header(self) -> Dict[str, Any]:
+        return {"seed": self.seed, "map": self.map_source, "snapshot_every": self.snapshot_every}
+
+    def _add_snapshot(self, position: int, snapshot: Dict[str, Any]):
+        self.snapshots[position] = snapshot
+        self._snapshot_at.append(position)
+        if self.path:
+            self._pending.append(json.dumps(["snapshot", position, encode_snapshot(snapshot)]))
+
+    def append(self, game: GameState, event: Event):
+        """Called by the engine after it applies a command"""
+        self.events.append(event)
+        position = len(self.events)
+        if self.path:
+            self._pending.append(json.dumps(["event", list(event)]))
+        if event[0] == "reinforce":
+            self.turn_starts[game.turn_count] = position
+        if position % self.snapshot_every == 0:
+            self._add_snapshot(position, game.snapshot())
+
+    def flush(self):
+        """Append buffered lines to the record file as one gzip member"""
+        if not self._pending or not self.path:
+            return
+        with gzip.open(self.path, "at", encoding="utf-8") as fh:
+            fh.write("\n".join(self._pending) + "\n")
+        self._pending.clear()
+
+    def save(self, path: str):
+        """Write the whole record, snapshots included, to a new file"""
+        lines = [json.dumps(["header", self._header()])]
+        lines += [json.dumps(["snapshot", position, encode_snapshot(self.snapshots[position])])
+                  for position in self._snapshot_at if position == 0]
+        for i, event in enumerate(self.events, start=1):
+            lines.append(json.dumps(["event", list(event)]))
+            if i in self.snapshots:
+                lines.append(json.dumps(["snapshot", i, encode_snapshot(self.snapshots[i])]))
+        with gzip.open(path, "wt", encoding="utf-8") as fh:
+            fh.write("\n".join(lines) + "\n")
+
+    def nearest_snapshot(self, position: int) -> int:
+        return self._snapshot_at[bisect.bisect_right(self._snapshot_at, position) - 1]
+
+    def __len__(self):
+        return len(self.events)
+
+
+def load_record(path: str) -> GameRecord:
+    """Read a record file without replaying it"""
+    record = None
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item[0] == "header":
+                header = item[1]
+                record = GameRecord(header["seed"], header["map"], header["snapshot_every"])
+            elif item[0] == "event":
+                event = tuple(item[1])
+                record.events.append(event)
+                if event[0] == "reinforce":
+                    # Every reinforcement starts the next turn
+                    turn = max(record.turn_starts) + 1
+                    record.turn_starts[turn] = len(record.events)
+            elif item[0] == "snapshot":
+                snapshot = decode_snapshot(item[2])
+                record.snapshots[item[1]] = snapshot
+                record._snapshot_at.append(item[1])
+                if item[1] == 0:
+                    record.turn_starts = {snapshot["turn_count"]: 0}
+    if record is None:
+        raise ValueError(f"{path} has no record header")
+    record._snapshot_at.sort()
+    return record
+
+
+def encode_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe form of GameState.snapshot()"""
+    encoded = dict(snapshot)
+    for column in ("owner", "units"):
+        array = snapshot[column]
+        encoded[column] = [array.dtype.str, base64.b64encode(array.tobytes()).decode("ascii")]
+    return encoded
+
+
+def decode_snapshot(encoded: Dict[str, Any]) -> Dict[str, Any]:
+    snapshot = dict(encoded)
+    for column in ("owner", "units"):
+        dtype, data = encoded[column]
+        snapshot[column] = np.frombuffer(base64.b64decode(data), dtype=np.dtype(dtype)).copy()
+    return snapshot
+
+
+def apply_event(game: GameState, event: Event):
+    """Re-apply one recorded command through the engine"""
+    kind = event[0]
+    if kind == "start":
+        engine.start_game(game, *event[1:])
+    elif kind == "move":
+        engine.apply_move(game, *event[1:])
+    elif kind == "march":
+        engine.march(game, *event[1:])
+    elif kind == "end":
+        engine.end_movement(game)
+    elif kind == "reinforce":
+        engine.reinforce(game, *event[1:])
+    else:
+        raise ValueError(f"unknown event {kind!r}")
+
+
+def state_at(record: GameRecord, position: Optional[int] = None, game_map: Optional[GameMap] = None,
+             log_capacity: int = 0) -> GameState:
+    """Rebuild the game after the first ``position`` events (all of them by default).
+
+    ``game_map`` is required for maps that were not loaded from a file.
+    """
+    if position is None:
+        position = len(record.events)
+    if not 0 <= position <= len(record.events):
+        raise IndexError(f"position {position} outside 0..{len(record.events)}")
+    if game_map is None:
+        if not record.map_source:
+            raise ValueError("record has no map file; pass game_map")
+        game_map = load_map(record.map_source)
+    else:
+        game_map = game_map.copy()
+    game = GameState(game_map, log_capacity=log_capacity, seed=record.seed)
+    start = record.nearest_snapshot(position)
+    game.restore(record.snapshots[start])
+    for event in record.events[start:position]:
+        apply_event(game, event)
+    return game
+
+
+def seek_turn(record: GameRecord, turn: int, game_map: Optional[GameMap] = None) -> GameState:
+    """Game state at the start of ``turn``"""
+    if turn not in record.turn_starts:
+        raise KeyError(f"turn {turn} was not reached")
+    return state_at(record, record.turn_starts[turn], game_map)
@@ -0,0 +1,119 @@
+"""Game data: territories, players and the overall game state"""
+import secrets
+import uuid
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+from realm.dice import DiceStream
+from realm.game_log import DEFAULT_CAPACITY, GameLog
+from realm.maps import GameMap, load_map
+from realm.store import AdjacencyMap, OwnerStats, Territory, TerritoryMap
+
+__all__ = ["GameState", "Player", "Territory"]
+
+
+@dataclass
+class Player:
+    name: str
+    nobles: int
+    color: str
+    hq_territory: str
+
+
+class GameState:
+    def __init__(self, game_map: Optional[GameMap] = None, log_capacity: int = DEFAULT_CAPACITY,
+                 journal_path: Optional[str] = None, seed: Optional[int] = None):
+        self.game_id = uuid.uuid4().hex
+        # All dice come from this generator, so a seed plus the move list replays the game
+        self.seed = seed if seed is not None else secrets.randbits(63)
+        self.rng = DiceStream(self.seed)
+        self.history = None  # replay.GameRecord when the game is being recorded
+        self.current_player = 1
+        self.phase = 'setup'  # setup, movement, reinforcement
+        self.selected_territory: Optional[str] = None
+        self.turn_count = 1
+        # Recent events in memory; the journal file, when given, keeps everything
+        self.game_log = GameLog(log_capacity, journal_path)
+
+        # Territories, adjacency and HQs come from the map file
+        self.game_map = game_map if game_map is not None else load_map()
+        self.store = self.game_map.store
+        hq1, hq2 = self.game_map.hqs
+
+        # Initialize players
+        self.players: Dict[int, Player] = {
+            1: Player("Red Kingdom", 10, "#FF6B6B", hq1),
+            2: Player("Blue Kingdom", 10, "#4ECDC4", hq2)
+        }
+        self.territories = TerritoryMap(self.store)
+        self.adjacency = AdjacencyMap(self.store)
+
+    def clone(self, rng: Optional[DiceStream] = None) -> "GameState":
+        """Cheap copy for lookahead: same board and turn, no log, journal or history.
+
+        The copy draws from ``rng`` when given (e.g. a search worker's stream),
+        otherwise from a freshly seeded stream of its own.
+        """
+        game = object.__new__(GameState)
+        game.game_id = self.game_id
+        game.seed = secrets.randbits(63) if rng is None else self.seed
+        game.rng = rng if rng is not None else DiceStream(game.seed)
+        game.history = None
+        game.current_player = self.current_player
+        game.phase = self.phase
+        game.selected_territory = self.selected_territory
+        game.turn_count = self.turn_count
+        game.game_log = GameLog(0)
+        game.game_map = self.game_map.copy()
+        game.store = game.game_map.store
+        game.players = {pid: replace(player) for pid, player in self.players.items()}
+        game.territories = TerritoryMap(game.store)
+        game.adjacency = AdjacencyMap(game.store)
+        return game
+
+    def player_stats(self, player_id: int) -> OwnerStats:
+        """Units, territories and frontier size, kept up to date as the board changes"""
+        return self.store.stats(player_id)
+
+    def check_stats(self):
+        """Debug check: raise AssertionError if the counters disagree with a full recount"""
+        problems = self.store.stats_mismatches()
+        if problems:
+            raise AssertionError("; ".join(problems))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything needed to restore the board, turn and dice state later"""
+        return {
+            "owner": self.store.owner.copy(),
+            "units": self.store.units.copy(),
+            "current_player": self.current_player,
+            "phase": self.phase,
+            "selected_territory": self.selected_territory,
+            "turn_count": self.turn_count,
+            "names": [self.players[1].name, self.players[2].name],
+            "rng": self.rng.getstate(),
+        }
+
+    def restore(self, snapshot: Dict[str, Any]):
+        """Return to a state captured by snapshot()"""
+        self.store.load_columns(snapshot["owner"], snapshot["units"])
+        self.current_player = snapshot["current_player"]
+        self.phase = snapshot["phase"]
+        self.selected_territory = snapshot["selected_territory"]
+        self.turn_count = snapshot["turn_count"]
+        self.players[1].name, self.players[2].name = snapshot["names"]
+        self.rng.setstate(snapshot["rng"])
+
+    def flush(self):
+        """Write buffered journal and replay records to disk"""
+        self.game_log.flush()
+        if self.history is not None:
+            self.history.flush()
+
+    def log(self, kind: str, **fields):
+        """Record a structured game event"""
+        self.game_log.add(kind, self.turn_count, **fields)
+
+    def add_log(self, message: str):
+        """Add a free-text message to game log"""
+        self.game_log.add("text", self.turn_count, text=message)
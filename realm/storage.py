@@ -0,0 +1,259 @@
+"""SQLite persistence for saved games.
+
+The database runs in WAL mode with ``synchronous=NORMAL``, so readers never
+wait on the writer and commits do not fsync the main file. All writes go
+through one background thread: ``save`` and ``append_moves`` only enqueue,
+and the writer drains the queue in group commits of up to ``batch_size``
+operations, keeping just the newest state of a game that was saved several
+times in one batch. Reads borrow a connection from a small pool.
+
+A game's state is one row in ``games``: indexed columns for listing plus a
+zlib-compressed snapshot blob (a JSON header followed by the raw owner and
+unit columns). Commands applied through the engine go to ``moves`` keyed by
+``(game_id, seq)``. ``GameStore`` has the same ``save``/``load`` interface as
+the game server's ``RoomStore`` and can back it directly. Set
+REALM_GAMES_DB to keep the default database somewhere else.
+"""
+import json
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from realm.maps import load_map
+from realm.state import GameState
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "saves", "games.db")
+DB_ENV = "REALM_GAMES_DB"  # overrides DEFAULT_DB, e.g. for benchmarks that must not touch real saves
+POOL_SIZE = 4
+BATCH_SIZE = 512
+COMMIT_INTERVAL = 0.02  # seconds the writer waits to gather more work into one commit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    map TEXT,
+    seed INTEGER,
+    version INTEGER NOT NULL,
+    turn INTEGER NOT NULL,
+    phase TEXT NOT NULL,
+    updated REAL NOT NULL,
+    state BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS games_updated ON games (updated);
+CREATE TABLE IF NOT EXISTS moves (
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+"""
+
+_HEADER = struct.Struct("<I")
+
+
+def pack_snapshot(snapshot: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> bytes:
+    """Serialize a GameState snapshot into a compact blob"""
+    owner, units = snapshot["owner"], snapshot["units"]
+    meta = {k: v for k, v in snapshot.items() if k not in ("owner", "units")}
+    meta["columns"] = [owner.dtype.str, units.dtype.str, len(owner)]
+    if extra:
+        meta["extra"] = extra
+    header = json.dumps(meta, separators=(",", ":")).encode()
+    return zlib.compress(_HEADER.pack(len(header)) + header + owner.tobytes() + units.tobytes(), 1)
+
+
+def unpack_snapshot(blob: bytes) -> Dict[str, Any]:
+    raw = zlib.decompress(blob)
+    (size,) = _HEADER.unpack_from(raw)
+    meta = json.loads(raw[_HEADER.size:_HEADER.size + size])
+    owner_dtype, units_dtype, count = meta.pop("columns")
+    offset = _HEADER.size + size
+    owner = np.frombuffer(raw, owner_dtype, count, offset)
+    units = np.frombuffer(raw, units_dtype, count, offset + owner.nbytes)
+    meta["owner"], meta["units"] = owner.copy(), units.copy()
+    return meta
+
+
+def game_record(game: GameState) -> Dict[str, Any]:
+    """What GameStore.save needs to bring game back later"""
+    return {"map": game.game_map.source, "seed": game.seed,
+            "version": len(game.history) if game.history is not None else 0, "snapshot": game.snapshot()}
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class GameStore:
+    def __init__(self, path: Optional[str] = None, pool_size: int = POOL_SIZE, batch_size: int = BATCH_SIZE,
+                 commit_interval: float = COMMIT_INTERVAL):
+        path = path or os.environ.get(DB_ENV, DEFAULT_DB)
+        if path == ":memory:":
+            # Every pooled connection would open its own, separate database
+            raise ValueError(f"GameStore needs a database file, got {path!r}")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self._writer_conn = _connect(path)
+        self._writer_conn.executescript(SCHEMA)
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(_connect(path))
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._write_loop, name="game-store-writer", daemon=True)
+        self._writer.start()
+
+    # -- writes (asynchronous, group-committed) --
+
+    def save(self, game_id: str, record: Dict[str, Any]):
+        """Queue the latest state of a game; returns without waiting for disk"""
+        snapshot = record["snapshot"]
+        extra = {k: v for k, v in record.items() if k not in ("map", "seed", "version", "snapshot")}
+        row = (game_id, record.get("map"), record.get("seed"), int(record.get("version", 0)),
+               int(snapshot["turn_count"]), snapshot["phase"], time.time(), pack_snapshot(snapshot, extra))
+        self._put(("game", game_id, row))
+
+    def append_moves(self, game_id: str, first_seq: int, events: Sequence[Sequence[Any]]):
+        """Queue engine commands numbered from first_seq"""
+        if events:
+            rows = [(game_id, first_seq + i, json.dumps(list(event))) for i, event in enumerate(events)]
+            self._put(("moves", game_id, rows))
+
+    def save_game(self, game: GameState, saved_moves: int = 0, seq_base: int = 0) -> int:
+        """Queue game's state and the commands in its history after the first saved_moves.
+
+        seq_base is the number of moves already stored before game.history began,
+        for games resumed from this store. Returns the new saved_moves.
+        """
+        record = game_record(game)
+        if game.history is None:
+            self.save(game.game_id, record)
+            return saved_moves
+        record["version"] = seq_base + len(game.history)
+        self.save(game.game_id, record)
+        self.append_moves(game.game_id, seq_base + saved_moves, game.history.events[saved_moves:])
+        return len(game.history)
+
+    def _put(self, item: tuple):
+        if self._error is not None:
+            raise RuntimeError("game store writer failed") from self._error
+        self._queue.put(item)
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)  # stop after committing this batch
+                    self._queue.task_done()
+                    break
+                batch.append(nxt)
+            try:
+                self._commit(batch)
+            except BaseException as exc:
+                self._error = exc
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _commit(self, batch: List[tuple]):
+        games: Dict[str, tuple] = {}
+        moves: List[tuple] = []
+        for kind, game_id, payload in batch:
+            if kind == "game":
+                games[game_id] = payload  # only the newest state of each game is written
+            else:
+                moves.extend(payload)
+        conn = self._writer_conn
+        conn.execute("BEGIN")
+        try:
+            if games:
+                conn.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)", games.values())
+            if moves:
+                conn.executemany("INSERT OR REPLACE INTO moves VALUES (?, ?, ?)", moves)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def flush(self):
+        """Block until everything queued so far is committed"""
+        self._queue.join()
+        if self._error is not None:
+            raise RuntimeError("game store writer failed") from self._error
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._writer_conn.close()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    # -- reads (pooled connections) --
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def load(self, game_id: str) -> Optional[Dict[str, Any]]:
+        """The saved record of a game, or None; one primary-key read"""
+        with self._reader() as conn:
+            row = conn.execute("SELECT map, seed, version, state FROM games WHERE game_id = ?",
+                               (game_id,)).fetchone()
+        if row is None:
+            return None
+        snapshot = unpack_snapshot(row[3])
+        record = snapshot.pop("extra", {})
+        record.update(map=row[0], seed=row[1], version=row[2], snapshot=snapshot)
+        return record
+
+    def moves(self, game_id: str, start: int = 0) -> List[tuple]:
+        with self._reader() as conn:
+            rows = conn.execute("SELECT event FROM moves WHERE game_id = ? AND seq >= ? ORDER BY seq",
+                                (game_id, start)).fetchall()
+        return [tuple(json.loads(event)) for (event,) in rows]
+
+    def list_games(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently saved games first"""
+        with self._reader() as conn:
+            rows = conn.execute("SELECT game_id, turn, phase, updated FROM games ORDER BY updated DESC LIMIT ?",
+                                (limit,)).fetchall()
+        return [{"game_id": g, "turn": t, "phase": p, "updated": u} for g, t, p, u in rows]
+
+    def resume(self, game_id: str) -> Optional[Tuple[GameState, int]]:
+        """Rebuild a saved game and its stored move count, or None if there is no such game"""
+        record = self.load(game_id)
+        if record is None:
+            return None
+        game = GameState(load_map(record["map"]), seed=record["seed"])
+        game.game_id = game_id
+        game.restore(record["snapshot"])
+        return game, record["version"]
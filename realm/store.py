@@ -0,0 +1,285 @@
+"""Struct-of-arrays territory storage with lightweight per-territory views"""
+import hashlib
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+import numpy as np
+
+from realm.pathing import FriendlyComponents
+
+NUM_OWNERS = 3  # neutral, player 1, player 2
+# A full recount costs about as much as one incremental set_owner per this many territories
+RECOUNT_TERRITORIES_PER_WRITE = 200
+
+
+class OwnerStats(NamedTuple):
+    units: int
+    territories: int
+    frontier: int  # owned territories bordering one held by someone else
+
+
+class Territory:
+    """View of one territory in a TerritoryStore; reads and writes go to the arrays"""
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: "TerritoryStore", index: int):
+        self._store = store
+        self._i = index
+
+    @property
+    def index(self) -> int:
+        return self._i
+
+    @property
+    def id(self) -> str:
+        return self._store.ids[self._i]
+
+    @property
+    def name(self) -> str:
+        return self._store.names[self._i]
+
+    @property
+    def x(self) -> int:
+        return int(self._store.x[self._i])
+
+    @property
+    def y(self) -> int:
+        return int(self._store.y[self._i])
+
+    @property
+    def radius(self) -> int:
+        return int(self._store.radius[self._i])
+
+    @property
+    def is_hq(self) -> bool:
+        return bool(self._store.is_hq[self._i])
+
+    @property
+    def owner(self) -> int:  # 0=neutral, 1=player1, 2=player2
+        return int(self._store.owner[self._i])
+
+    @owner.setter
+    def owner(self, value: int):
+        self._store.set_owner(self._i, value)
+
+    @property
+    def units(self) -> int:
+        return int(self._store.units[self._i])
+
+    @units.setter
+    def units(self, value: int):
+        self._store.set_units(self._i, value)
+
+    def __eq__(self, other):
+        return isinstance(other, Territory) and other._store is self._store and other._i == self._i
+
+    def __hash__(self):
+        return hash((id(self._store), self._i))
+
+    def __repr__(self):
+        return (f"Territory(id={self.id!r}, name={self.name!r}, owner={self.owner}, "
+                f"units={self.units}, is_hq={self.is_hq})")
+
+
+class TerritoryStore:
+    """Territory columns as NumPy arrays and adjacency in CSR form.
+
+    Layout columns (ids, names, x, y, radius, is_hq, adjacency) never change
+    after loading and are shared by copies; only owner and units are mutable,
+    and only through set_owner/set_units so the per-owner counters stay exact.
+    """
+
+    def __init__(self, ids: Sequence[str], names: Sequence[str], x, y, radius, owner, units, is_hq,
+                 indptr, indices):
+        self.ids: List[str] = list(ids)
+        self.names: List[str] = list(names)
+        self.index: Dict[str, int] = {tid: i for i, tid in enumerate(self.ids)}
+        self.x = np.asarray(x, dtype=np.int32)
+        self.y = np.asarray(y, dtype=np.int32)
+        self.radius = np.asarray(radius, dtype=np.int32)
+        self.is_hq = np.asarray(is_hq, dtype=bool)
+        self.owner = np.array(owner, dtype=np.int8)
+        self.units = np.array(units, dtype=np.int32)
+        self.indptr = np.asarray(indptr, dtype=np.int32)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        # Source territory of each CSR entry, so edge-wise checks are one fancy index
+        self.edge_src = np.repeat(np.arange(len(self.ids), dtype=np.int32), np.diff(self.indptr))
+        self._neighbor_ids: Dict[str, List[str]] = {}
+        digest = hashlib.blake2b(digest_size=16)
+        for column in (self.x, self.y, self.radius):
+            digest.update(column.tobytes())
+        digest.update("\0".join(self.ids).encode())
+        self.layout_key = digest.hexdigest()
+        self._friendly: Optional[FriendlyComponents] = None
+        # Indices written through set_owner/set_units while a cow_state.Timeline records
+        self.touched: Optional[Set[int]] = None
+        self._recount()
+
+    def _frontier_flags(self) -> np.ndarray:
+        border = self.owner[self.edge_src] != self.owner[self.indices]
+        return np.bincount(self.edge_src[border], minlength=len(self.ids)) > 0
+
+    def _recount(self):
+        """Rebuild every counter from scratch (O(territories + edges))"""
+        self.is_frontier = self._frontier_flags()
+        self.unit_count = np.bincount(self.owner, weights=self.units, minlength=NUM_OWNERS).astype(np.int64)
+        self.territory_count = np.bincount(self.owner, minlength=NUM_OWNERS).astype(np.int64)
+        self.frontier_count = np.bincount(self.owner[self.is_frontier], minlength=NUM_OWNERS).astype(np.int64)
+
+    def stats(self, owner: int) -> OwnerStats:
+        """Units, territories and frontier size of one owner in O(1)"""
+        return OwnerStats(int(self.unit_count[owner]), int(self.territory_count[owner]),
+                          int(self.frontier_count[owner]))
+
+    def stats_mismatches(self) -> List[str]:
+        """Compare the incremental counters with a full recount; empty when they agree"""
+        expected_frontier = self._frontier_flags()
+        expected = {
+            "units": np.bincount(self.owner, weights=self.units, minlength=NUM_OWNERS),
+            "territories": np.bincount(self.owner, minlength=NUM_OWNERS),
+            "frontier": np.bincount(self.owner[expected_frontier], minlength=NUM_OWNERS),
+        }
+        actual = {"units": self.unit_count, "territories": self.territory_count, "frontier": self.frontier_count}
+        problems = []
+        for name, counts in expected.items():
+            for owner, (want, have) in enumerate(zip(counts, actual[name])):
+                if want != have:
+                    problems.append(f"owner {owner} {name}: counter {int(have)}, recount {int(want)}")
+        return problems
+
+    def set_units(self, i: int, value: int):
+        if self.touched is not None:
+            self.touched.add(i)
+        self.unit_count[self.owner[i]] += value - int(self.units[i])
+        self.units[i] = value
+
+    def set_owner(self, i: int, value: int):
+        old = int(self.owner[i])
+        if old == value:
+            return
+        if self.touched is not None:
+            self.touched.add(i)
+        units = int(self.units[i])
+        self.unit_count[old] -= units
+        self.unit_count[value] += units
+        self.territory_count[old] -= 1
+        self.territory_count[value] += 1
+        # Only i and its neighbors can change frontier status
+        affected = [i, *self.neighbors(i).tolist()]
+        owner = self.owner
+        for j in affected:
+            if self.is_frontier[j]:
+                self.frontier_count[owner[j]] -= 1
+        owner[i] = value
+        for j in affected:
+            own = owner[j]
+            flag = bool((owner[self.neighbors(j)] != own).any())
+            self.is_frontier[j] = flag
+            if flag:
+                self.frontier_count[own] += 1
+        if self._friendly is not None:
+            self._friendly.owner_changed(i, old)
+
+    def write(self, indices: Sequence[int], owner: Sequence[int], units: Sequence[int]):
+        """Set owner and units of several territories, recounting once when that is cheaper"""
+        if len(indices) <= 1 + len(self.ids) // RECOUNT_TERRITORIES_PER_WRITE:
+            for i, own, count in zip(indices, owner, units):
+                self.set_owner(i, own)
+                self.set_units(i, count)
+            return
+        index = np.asarray(indices, dtype=np.int64)
+        self.owner[index] = owner
+        self.units[index] = units
+        if self.touched is not None:
+            self.touched.update(indices)
+        self._recount()
+        if self._friendly is not None:
+            self._friendly.rebuild()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.x, self.y, self.radius, self.is_hq, self.owner,
+                                      self.units, self.indptr, self.indices))
+
+    def copy(self) -> "TerritoryStore":
+        """New store sharing the layout, with its own owner and units"""
+        clone = object.__new__(TerritoryStore)
+        clone.__dict__.update(self.__dict__)
+        clone.owner = self.owner.copy()
+        clone.units = self.units.copy()
+        clone.is_frontier = self.is_frontier.copy()
+        clone.unit_count = self.unit_count.copy()
+        clone.territory_count = self.territory_count.copy()
+        clone.frontier_count = self.frontier_count.copy()
+        clone._friendly = None  # built on demand over the clone's own owner column
+        clone.touched = None
+        return clone
+
+    def load_columns(self, owner, units):
+        """Overwrite owner and units wholesale (e.g. from a snapshot) and recount"""
+        self.owner[:] = owner
+        self.units[:] = units
+        if self.touched is not None:
+            self.touched.update(range(len(self.ids)))
+        self._recount()
+        if self._friendly is not None:
+            self._friendly.rebuild()
+
+    @property
+    def friendly(self) -> FriendlyComponents:
+        """Same-owner connected components, kept current by set_owner once built"""
+        if self._friendly is None:
+            self._friendly = FriendlyComponents(self.indptr, self.indices, self.owner)
+        return self._friendly
+
+    def neighbors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbor_ids(self, tid: str) -> List[str]:
+        # Adjacency is static, so the id lists are built once and shared by copies
+        ids = self._neighbor_ids.get(tid)
+        if ids is None:
+            ids = [self.ids[j] for j in self.neighbors(self.index[tid])]
+            self._neighbor_ids[tid] = ids
+        return ids
+
+
+class TerritoryMap(Mapping):
+    """Read-only ``{id: Territory}`` mapping backed by a store"""
+
+    def __init__(self, store: TerritoryStore):
+        self._store = store
+
+    def __getitem__(self, tid: str) -> Territory:
+        return Territory(self._store, self._store.index[tid])
+
+    def __contains__(self, tid) -> bool:
+        return tid in self._store.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.ids)
+
+    def __len__(self):
+        return len(self._store)
+
+
+class AdjacencyMap(Mapping):
+    """Read-only ``{id: [neighbor ids]}`` mapping over the store's CSR adjacency"""
+
+    def __init__(self, store: TerritoryStore):
+        self._store = store
+
+    def __getitem__(self, tid: str) -> List[str]:
+        return self._store.neighbor_ids(tid)
+
+    def __contains__(self, tid) -> bool:
+        return tid in self._store.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.ids)
+
+    def __len__(self):
+        return len(self._store)
@@ -0,0 +1,91 @@
+"""Lightweight timing spans for reruns, with rolling percentiles and Chrome trace export.
+
+Wrap each stage of a rerun in ``timings.span(name)``. Durations go into a
+rolling window per stage, and ``summary()`` reports p50/p95 over it. With
+``tracing`` on, every span is also kept as a Chrome trace event, and
+``export_chrome_trace`` writes them to a JSON file that loads in
+``chrome://tracing`` or Perfetto.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple
+
+import numpy as np
+
+WINDOW = 200  # durations kept per stage
+MAX_TRACE_EVENTS = 20000
+
+
+class StageStats(NamedTuple):
+    name: str
+    count: int
+    last_ms: float
+    p50_ms: float
+    p95_ms: float
+
+
+class Timings:
+    def __init__(self, window: int = WINDOW, tracing: bool = False):
+        self.window = window
+        self.tracing = tracing
+        self._durations: Dict[str, "deque[float]"] = {}
+        self._counts: Dict[str, int] = {}
+        self._events: "deque[dict]" = deque(maxlen=MAX_TRACE_EVENTS)
+        self._origin_ns = time.perf_counter_ns()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the enclosed block, recording it even if it raises (e.g. st.rerun())"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.record(name, start, end)
+
+    def record(self, name: str, start_ns: int, end_ns: int):
+        durations = self._durations.get(name)
+        if durations is None:
+            durations = self._durations[name] = deque(maxlen=self.window)
+            self._counts[name] = 0
+        durations.append((end_ns - start_ns) / 1e6)
+        self._counts[name] += 1
+        if self.tracing:
+            self._events.append({
+                "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                "ts": (start_ns - self._origin_ns) / 1e3, "dur": (end_ns - start_ns) / 1e3,
+            })
+
+    def summary(self) -> List[StageStats]:
+        """Per-stage stats in the order the stages were first seen"""
+        stats = []
+        for name, durations in self._durations.items():
+            values = np.fromiter(durations, dtype=float, count=len(durations))
+            p50, p95 = np.percentile(values, [50, 95])
+            stats.append(StageStats(name, self._counts[name], durations[-1], float(p50), float(p95)))
+        return stats
+
+    @property
+    def trace_events(self) -> int:
+        return len(self._events)
+
+    def chrome_trace(self) -> dict:
+        return {"traceEvents": list(self._events), "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str) -> str:
+        """Write the recorded spans as a Chrome trace JSON file; returns the path"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.chrome_trace(), fh)
+        os.replace(tmp, path)
+        return path
+
+    def clear(self):
+        self._durations.clear()
+        self._counts.clear()
+        self._events.clear()
@@ -0,0 +1,238 @@
+"""Self-play tournaments between scripted policies across all cores.
+
+Example::
+
+    python -m realm.tournament --games 100000 --policy-a greedy --policy-b random \\
+        --hq-units 20 --out runs/hq20
+
+Games run in chunks on a process pool. Each finished chunk is written to
+the output directory as one columnar part file (Parquet when pyarrow is
+installed, .npz otherwise) and recorded in ``checkpoint.json``. Re-running
+the same command resumes from the completed chunks. Aggregate win rates
+are printed with 95% Wilson confidence intervals.
+
+A game is won by taking the enemy HQ or every enemy territory. Games that
+reach ``--max-turns`` go to the player holding more territories, or are
+drawn on a tie.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from realm import engine, policies
+from realm.maps import DEFAULT_MAP, load_map
+from realm.state import GameState
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+COLUMNS = ("game", "seed", "first_player", "winner", "end", "turns",
+           "p1_territories", "p2_territories", "p1_units", "p2_units")
+END_HQ, END_WIPE, END_TURNS = 0, 1, 2
+
+
+def winner_of(game: GameState) -> Optional[tuple]:
+    """(winner, end reason) once a player holds the enemy HQ or the enemy has no territories"""
+    for player in (1, 2):
+        enemy = engine.other_player(player)
+        if game.territories[game.players[enemy].hq_territory].owner == player:
+            return player, END_HQ
+        if game.player_stats(enemy).territories == 0:
+            return player, END_WIPE
+    return None
+
+
+def play_game(config: Dict, seed: int, first_player: int) -> Dict:
+    """One full game between the configured policies; returns a result row"""
+    game_map = load_map(config["map"])
+    store = game_map.store
+    if config["hq_units"] is not None:
+        store.units[store.is_hq] = config["hq_units"]
+    if config["garrison_scale"] != 1.0:
+        neutral = store.owner == 0
+        store.units[neutral] = np.rint(store.units[neutral] * config["garrison_scale"]).astype(store.units.dtype)
+    store.load_columns(store.owner, store.units)  # recount after the overrides
+
+    game = GameState(game_map, log_capacity=0, seed=seed)
+    rng = random.Random(seed)
+    players = {1: policies.POLICIES[config["policy_a"]], 2: policies.POLICIES[config["policy_b"]]}
+    engine.start_game(game, config["policy_a"], config["policy_b"], first_player)
+    outcome = None
+    while game.turn_count <= config["max_turns"]:
+        policies.play_turn(game, players[game.current_player], rng)
+        outcome = winner_of(game)
+        if outcome:
+            break
+    if outcome is None:
+        p1, p2 = game.player_stats(1).territories, game.player_stats(2).territories
+        outcome = (1 if p1 > p2 else 2 if p2 > p1 else 0), END_TURNS
+    s1, s2 = game.player_stats(1), game.player_stats(2)
+    return {"seed": seed, "first_player": first_player, "winner": outcome[0], "end": outcome[1],
+            "turns": game.turn_count - 1, "p1_territories": s1.territories, "p2_territories": s2.territories,
+            "p1_units": s1.units, "p2_units": s2.units}
+
+
+def run_chunk(config: Dict, chunk: int) -> Dict[str, np.ndarray]:
+    """Play one chunk of games; seeds depend only on the base seed and chunk number"""
+    start = chunk * config["chunk_size"]
+    count = min(config["chunk_size"], config["games"] - start)
+    seeds = np.random.SeedSequence([config["seed"], chunk]).generate_state(count, dtype=np.uint64)
+    rows = []
+    for offset in range(count):
+        index = start + offset
+        if config["first"] == "alternate":
+            first = 1 + index % 2
+        elif config["first"] == "random":
+            first = 1 + int(seeds[offset] % 2)
+        else:
+            first = 1 if config["first"] == "a" else 2
+        row = play_game(config, int(seeds[offset] >> np.uint64(1)), first)
+        row["game"] = index
+        rows.append(row)
+    return {name: np.array([row[name] for row in rows], dtype=np.int64) for name in COLUMNS}
+
+
+def _part_path(out_dir: str, chunk: int, fmt: str) -> str:
+    return os.path.join(out_dir, f"part-{chunk:06d}.{fmt}")
+
+
+def write_part(columns: Dict[str, np.ndarray], path: str):
+    tmp = path + ".tmp"
+    if path.endswith(".parquet"):
+        pyarrow.parquet.write_table(pyarrow.table(columns), tmp)
+    else:
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **columns)
+    os.replace(tmp, path)
+
+
+def read_part(path: str) -> Dict[str, np.ndarray]:
+    if path.endswith(".parquet"):
+        table = pyarrow.parquet.read_table(path)
+        return {name: table.column(name).to_numpy() for name in COLUMNS}
+    with np.load(path) as data:
+        return {name: data[name] for name in COLUMNS}
+
+
+def wilson(successes: int, trials: int, z: float = 1.96):
+    """95% Wilson score interval for a proportion"""
+    if trials == 0:
+        return 0.0, 0.0, 0.0
+    p = successes / trials
+    denom = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return p, center - half, center + half
+
+
+def summarize(columns: Dict[str, np.ndarray], config: Dict) -> List[str]:
+    n = len(columns["winner"])
+    winner, first = columns["winner"], columns["first_player"]
+    lines = [f"{n} games, {config['policy_a']} (player 1) vs {config['policy_b']} (player 2), "
+             f"mean length {columns['turns'].mean():.1f} turns" if n else "no games"]
+    rows = [
+        (f"player 1 ({config['policy_a']}) wins", int((winner == 1).sum())),
+        (f"player 2 ({config['policy_b']}) wins", int((winner == 2).sum())),
+        ("draws", int((winner == 0).sum())),
+        ("first mover wins", int((winner == first).sum())),
+    ]
+    for label, count in rows:
+        p, low, high = wilson(count, n)
+        lines.append(f"  {label:<28} {p:7.2%}  [{low:.2%}, {high:.2%}]")
+    for code, label in ((END_HQ, "HQ captured"), (END_WIPE, "wiped out"), (END_TURNS, "turn limit")):
+        lines.append(f"  ended by {label:<19} {(columns['end'] == code).mean() if n else 0:7.2%}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run self-play tournaments between scripted policies")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--policy-a", choices=sorted(policies.POLICIES), default="greedy", help="plays player 1")
+    parser.add_argument("--policy-b", choices=sorted(policies.POLICIES), default="greedy", help="plays player 2")
+    parser.add_argument("--first", choices=("alternate", "random", "a", "b"), default="alternate",
+                        help="who receives the Commissioner's Bonus and moves first")
+    parser.add_argument("--hq-units", type=int, default=None, help="override HQ starting units")
+    parser.add_argument("--garrison-scale", type=float, default=1.0, help="multiply neutral garrisons")
+    parser.add_argument("--max-turns", type=int, default=200)
+    parser.add_argument("--map", default=DEFAULT_MAP)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", choices=("parquet", "npz"), default="parquet" if pyarrow else "npz")
+    parser.add_argument("--out", default="tournament_results")
+    args = parser.parse_args(argv)
+    if args.format == "parquet" and pyarrow is None:
+        parser.error("parquet output needs pyarrow; use --format npz")
+
+    config = {key: getattr(args, key) for key in ("games", "policy_a", "policy_b", "first", "hq_units",
+                                                  "garrison_scale", "max_turns", "seed", "chunk_size")}
+    config["map"] = os.path.abspath(args.map)
+    config_hash = hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+    os.makedirs(args.out, exist_ok=True)
+    checkpoint_path = os.path.join(args.out, "checkpoint.json")
+    completed: Dict[int, str] = {}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as fh:
+            checkpoint = json.load(fh)
+        if checkpoint["config_hash"] != config_hash:
+            sys.exit(f"{args.out} holds results for a different configuration; pick another --out")
+        completed = {int(chunk): path for chunk, path in checkpoint["completed"].items()
+                     if os.path.exists(os.path.join(args.out, path))}
+
+    def save_checkpoint():
+        tmp = checkpoint_path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"config": config, "config_hash": config_hash,
+                       "completed": {str(k): v for k, v in sorted(completed.items())}}, fh, indent=1)
+        os.replace(tmp, checkpoint_path)
+
+    chunks = -(-args.games // args.chunk_size)
+    pending = [chunk for chunk in range(chunks) if chunk not in completed]
+    if completed:
+        print(f"resuming: {len(completed)} of {chunks} chunks already done")
+    started = time.perf_counter()
+    played = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        queue = iter(pending)
+        running = {}
+        # Keep a bounded number of chunks in flight so results stream out steadily
+        for chunk in queue:
+            running[pool.submit(run_chunk, config, chunk)] = chunk
+            if len(running) >= 2 * args.workers:
+                break
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = running.pop(future)
+                columns = future.result()
+                path = _part_path(args.out, chunk, args.format)
+                write_part(columns, path)
+                completed[chunk] = os.path.basename(path)
+                save_checkpoint()
+                played += len(columns["game"])
+                elapsed = time.perf_counter() - started
+                print(f"chunk {chunk + 1}/{chunks} done, {played / elapsed * 3600:,.0f} games/hour", flush=True)
+                following = next(queue, None)
+                if following is not None:
+                    running[pool.submit(run_chunk, config, following)] = following
+
+    parts = [read_part(os.path.join(args.out, completed[chunk])) for chunk in sorted(completed)]
+    columns = {name: np.concatenate([part[name] for part in parts]) if parts else np.zeros(0, np.int64)
+               for name in COLUMNS}
+    print("\n".join(summarize(columns, config)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,20 @@
 import streamlit as st
-import random
-from dataclasses import dataclass
-from typing import Dict, List, Optional
-import base64
+from typing import TYPE_CHECKING, Dict, List, Optional
 import html
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
-try:
-    from streamlit_image_coordinates import streamlit_image_coordinates
-except Exception:
-    streamlit_image_coordinates = None
-import numpy as np
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from realm import asset_bundle, engine, map_component, render_cache
+from realm.combat_odds import combat_odds
+from realm.hit_index import HitIndex
+from realm.replay import GameRecord
+from realm.state import GameState
+from realm.timing import Timings
+
+if TYPE_CHECKING:  # imported where they are used: online rooms, saved games, staged orders and previews
+    from realm.game_client import RoomClient
+    from realm.storage import GameStore
 
 # Configure page
 st.set_page_config(
@@ -20,76 +24,77 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@dataclass
-class Territory:
-    id: str
-    name: str
-    x: int  # X coordinate on map
-    y: int  # Y coordinate on map
-    radius: int  # Territory radius
-    owner: int  # 0=neutral, 1=player1, 2=player2
-    units: int
-    is_hq: bool = False
-
-@dataclass
-class Player:
-    name: str
-    nobles: int
-    color: str
-    hq_territory: str
-
-class GameState:
-    def __init__(self):
-        self.current_player = 1
-        self.phase = 'setup'  # setup, movement, reinforcement
-        self.selected_territory = None
-        self.turn_count = 1
-        self.game_log = []
-        
-        # Initialize players
-        self.players = {
-            1: Player("Red Kingdom", 10, "#FF6B6B", "hq1"),
-            2: Player("Blue Kingdom", 10, "#4ECDC4", "hq2")
-        }
-        # Initialize territories based on your map image
-        self.territories = {
-            "hq1": Territory("hq1", "Red HQ", 60, 300, 30, 1, 30, True),
-            "hq2": Territory("hq2", "Blue HQ", 740, 100, 30, 2, 30, True),
-            "t1": Territory("t1", "Northern Village", 250, 180, 25, 0, 2),
-            "t2": Territory("t2", "Central Plains", 380, 220, 25, 0, 2),
-            "t3": Territory("t3", "Eastern Outpost", 520, 280, 25, 0, 3),
-            "t4": Territory("t4", "Mountain Pass", 400, 150, 25, 0, 2),
-            "t5": Territory("t5", "River Crossing", 280, 320, 25, 0, 2),
-            "t6": Territory("t6", "Forest Grove", 500, 400, 25, 0, 1),
-            "t7": Territory("t7", "Hill Fort", 600, 200, 25, 0, 2),
-        }
-        # Territory adjacency
-        self.adjacency = {
-            "hq1": ["t1", "t5"],
-            "hq2": ["t7", "t4"],
-            "t1": ["hq1", "t2", "t4"],
-            "t2": ["t1", "t3", "t5"],
-            "t3": ["t2", "t6", "t7"],
-            "t4": ["hq2", "t1", "t7"],
-            "t5": ["hq1", "t2", "t6"],
-            "t6": ["t3", "t5"],
-            "t7": ["hq2", "t3", "t4"],
-        }
-    
-    def add_log(self, message: str):
-        """Add message to game log"""
-        self.game_log.append(message)
+# Seat the computer opponent takes when enabled in setup
+COMPUTER_SEAT = 2
+# Full game histories and replay records are kept here; the session keeps only the recent tail
+JOURNAL_DIR = "journals"
+LOG_LINES_SHOWN = 12
+# Chrome trace exports from the Debug Info panel
+TRACE_DIR = "traces"
+# How often a seat waiting for the other player polls its room
+ROOM_POLL_SECONDS = 2
+# How often the page checks on the computer's background search
+COMPUTER_POLL_SECONDS = 0.25
+# Nearest friendly territories offered as march destinations
+MARCH_OPTIONS_SHOWN = 30
+
+@st.cache_resource
+def load_assets():
+    """Preload the map, fonts and base map from the asset bundle, once per process.
+
+    Without a usable bundle this worker loads assets the usual way and builds
+    the bundle in the background for the next one; deploys should still run
+    ``python -m realm.asset_bundle`` so the first worker starts warm too.
+    """
+    bundle = asset_bundle.install(build=False)
+    if bundle is None:
+        asset_bundle.build_in_background()
+    return bundle
+
+@st.cache_resource
+def game_store() -> "GameStore":
+    """Saved-games database shared by every session"""
+    from realm.storage import GameStore
+    return GameStore()
+
+def attach_journals(game: GameState, part: int = 0):
+    """Journal game's log and record its commands; part > 0 numbers the files of a resumed game"""
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    game.game_log.journal_path = os.path.join(JOURNAL_DIR, f"{game.game_id}.jsonl.gz")
+    suffix = f".{part}" if part else ""
+    # Commands and snapshots for replaying the game later
+    GameRecord.attach(game, path=os.path.join(JOURNAL_DIR, f"{game.game_id}{suffix}.replay.gz"))
+
+def begin_local_game(game: GameState):
+    """Make game this session's fresh local game"""
+    attach_journals(game)
+    game.log("welcome")
+    st.session_state.game = game
+    st.session_state.orders = []  # staged orders name territories of the previous game's map
+    # Moves already in the saved-games database: before this session's history, and from it
+    st.session_state.moves_base = 0
+    st.session_state.saved_moves = 0
 
 def init_game_state():
     """Initialize game state in session state"""
     if 'game' not in st.session_state:
-        st.session_state.game = GameState()
-        st.session_state.game.add_log("🏰 Welcome to Conquest of the Realm!")
+        begin_local_game(GameState())
     # Movement and attack toggles (persist across reruns)
     if 'show_move' not in st.session_state:
         st.session_state.show_move = False
     if 'show_attack' not in st.session_state:
         st.session_state.show_attack = False
+    # Player seat taken by the MCTS opponent, if any, and its thinking time per turn
+    if 'computer_player' not in st.session_state:
+        st.session_state.computer_player = None
+    if 'computer_budget' not in st.session_state:
+        st.session_state.computer_budget = 2.0
+    # Client for a shared game room; None while playing locally
+    if 'room' not in st.session_state:
+        st.session_state.room = None
+    # Orders staged in queue mode, committed together at the end
+    if 'orders' not in st.session_state:
+        st.session_state.orders = []
 
 def inject_theme_css():
         """Inject global CSS to improve look & feel."""
@@ -129,56 +134,69 @@ def inject_theme_css():
                 unsafe_allow_html=True,
         )
 
-BASE_WIDTH = 800
-BASE_HEIGHT = 400
+def territory_positions(game_state: GameState, map_width: int, map_height: int):
+    """Rendered center and radius of every territory at the given map size"""
+    sx = map_width / game_state.game_map.width
+    sy = map_height / game_state.game_map.height
+    positions = {}
+    for territory in game_state.territories.values():
+        cx = int(round(territory.x * sx))
+        cy = int(round(territory.y * sy))
+        r0 = int(round(territory.radius * (sx + sy) / 2))
+        margin = 2
+        max_r = min(r0, cx - margin, map_width - margin - cx, cy - margin, map_height - margin - cy)
+        r = max(6, max_r) if max_r > 0 else 6
+        positions[territory.id] = {"cx": cx, "cy": cy, "r": r}
+    return positions
+
+def territory_layout(game_state: GameState, map_width: int, map_height: int) -> HitIndex:
+    """Hit index over the rendered territories, rebuilt only when the layout changes"""
+    key = (map_width, map_height, game_state.game_map.width, game_state.game_map.height,
+           game_state.store.layout_key)
+    return render_cache.get_layout(key, lambda: territory_positions(game_state, map_width, map_height))
+
+def territory_color(game_state: GameState, owner: int) -> str:
+    """Overlay fill for a territory held by owner"""
+    return game_state.players[owner].color if owner in (1, 2) else '#FFD700'
+
+def map_overlay(game_state: GameState, map_width=720, map_height=360):
+    """Overlay rows for the browser-side map component, and the hit index for its clicks"""
+    layout = territory_layout(game_state, map_width, map_height)
+    rows = []
+    for territory in game_state.territories.values():
+        p = layout.positions[territory.id]
+        rows.append([territory.id, p["cx"], p["cy"], p["r"], territory_color(game_state, territory.owner),
+                     territory.units, 'white' if territory.owner != 0 else 'black'])
+    return rows, layout
 
 def create_map_with_overlays(game_state: GameState, map_width=720, map_height=360):
-    """Create the game map with territory overlays and return positions for hit-testing"""
+    """Create the game map with territory overlays and return its hit index for click testing"""
+    # PIL is only needed when the server draws the map; the default browser overlay never loads it
+    from PIL import Image, ImageDraw
+    image_path = game_state.game_map.image
     try:
-        img = Image.open("GameMapV3.png").convert("RGB")
-        img = img.resize((map_width, map_height), Image.BICUBIC)
+        if not image_path:
+            raise FileNotFoundError
+        # The decoded, resized base layer is cached per process; draw on a copy
+        img = render_cache.get_base_map(image_path, map_width, map_height).copy()
     except FileNotFoundError:
         img = Image.new('RGB', (map_width, map_height), color='white')
         draw_temp = ImageDraw.Draw(img)
         draw_temp.ellipse([50, 50, 750, 350], fill='#87CEEB', outline='#4682B4', width=3)
         draw_temp.ellipse([20, 250, 120, 350], fill='#FFB6C1', outline='#FF69B4', width=2)
         draw_temp.ellipse([700, 50, 800, 150], fill='#90EE90', outline='#32CD32', width=2)
-        st.warning("⚠️ GameMapV3.png not found! Using fallback map.")
     draw = ImageDraw.Draw(img)
-    try:
-        font_units = ImageFont.truetype("arial.ttf", 18)
-        font_label = ImageFont.truetype("arial.ttf", 12)
-    except Exception:
-        try:
-            font_units = ImageFont.truetype("DejaVuSans.ttf", 18)
-            font_label = ImageFont.truetype("DejaVuSans.ttf", 12)
-        except Exception:
-            font_units = ImageFont.load_default()
-            font_label = ImageFont.load_default()
-    sx = map_width / BASE_WIDTH
-    sy = map_height / BASE_HEIGHT
-    render_positions = {}
+    font_units, font_label = render_cache.get_fonts()
+    layout = territory_layout(game_state, map_width, map_height)
     for territory in game_state.territories.values():
-        if territory.owner == 1:
-            color = game_state.players[1].color
-        elif territory.owner == 2:
-            color = game_state.players[2].color
-        else:
-            color = '#FFD700'
-        cx = int(round(territory.x * sx))
-        cy = int(round(territory.y * sy))
-        r0 = int(round(territory.radius * (sx + sy) / 2))
-        margin = 2
-        max_r = min(r0, cx - margin, map_width - margin - cx, cy - margin, map_height - margin - cy)
-        r = max(6, max_r) if max_r > 0 else 6
+        p = layout.positions[territory.id]
+        cx, cy, r = p["cx"], p["cy"], p["r"]
         left = cx - r
         top = cy - r
         right = cx + r
         bottom = cy + r
-        overlay_color = color
-        if territory.owner == 0:
-            overlay_color = '#FFD700'
-        draw.ellipse([left, top, right, bottom], fill=overlay_color, outline='#2A2A2A', width=4)
+        draw.ellipse([left, top, right, bottom], fill=territory_color(game_state, territory.owner),
+                     outline='#2A2A2A', width=4)
         if territory.id == game_state.selected_territory:
             halo_pad = 8
             draw.ellipse([left-halo_pad, top-halo_pad, right+halo_pad, bottom+halo_pad], outline='#FFFFFF', width=2)
@@ -186,12 +204,139 @@ def create_map_with_overlays(game_state: GameState, map_width=720, map_height=36
         text_color = 'white' if territory.owner != 0 else 'black'
         draw.text((cx, cy - 5), str(territory.units), fill=text_color, anchor="mm", font=font_units, stroke_width=2, stroke_fill="#000000")
         draw.text((cx, cy + 10), territory.id.upper(), fill='#111111', anchor="mm", font=font_label, stroke_width=2, stroke_fill="#FFFFFF")
-        render_positions[territory.id] = {"cx": cx, "cy": cy, "r": r}
-    return img, render_positions
+    return img, layout
+
+def map_fingerprint(game_state: GameState, map_width: int, map_height: int) -> str:
+    """Digest of everything the rendered map depends on"""
+    store = game_state.store
+    return render_cache.fingerprint(
+        store.owner, store.units, game_state.selected_territory,
+        game_state.players[1].color, game_state.players[2].color,
+        map_width, map_height, store.layout_key, game_state.game_map.image,
+        render_cache.file_stamp(game_state.game_map.image),  # a rewritten image is a new map
+    )
+
+def encoded_map(game_state: GameState, encoding: str, quality: int, map_width=720, map_height=360):
+    """Encoded map image and its hit index; drawn and encoded only when the fingerprint is new"""
+    image_path = game_state.game_map.image
+    if image_path and not os.path.exists(image_path):
+        st.warning(f"⚠️ {os.path.basename(image_path)} not found! Using fallback map.")
+    key = map_fingerprint(game_state, map_width, map_height)
+    image = render_cache.get_encoded(
+        key, lambda: create_map_with_overlays(game_state, map_width, map_height)[0], encoding, quality)
+    return image, territory_layout(game_state, map_width, map_height)
 
 def add_log(message: str):
     """Add message to game log"""
-    st.session_state.game.game_log.append(message)
+    st.session_state.game.add_log(message)
+
+def room_act(*action) -> Optional[dict]:
+    """Send an action to the shared room; None if the server refused it"""
+    from realm.game_client import RoomError
+    try:
+        return st.session_state.room.act(*action)
+    except (RoomError, OSError) as exc:
+        st.session_state.room_error = str(exc)
+        return None
+
+def enter_room(room: "RoomClient"):
+    """Play this session in a shared room from now on"""
+    st.session_state.room = room
+    st.session_state.game = room.game
+    st.session_state.orders = []
+    st.session_state.computer_player = None
+    st.session_state.show_move = False
+    st.session_state.show_attack = False
+    st.rerun()
+
+def autosave(game: GameState):
+    """Queue the game for the saved-games database once it has new moves"""
+    if game.history is None or len(game.history) == st.session_state.saved_moves:
+        return
+    st.session_state.saved_moves = game_store().save_game(
+        game, st.session_state.saved_moves, st.session_state.moves_base)
+
+def resume_game(game_id: str):
+    """Replace this session's game with a saved one"""
+    resumed = game_store().resume(game_id)
+    if resumed is None:
+        st.error(f"No saved game {game_id}")
+        return
+    game, saved = resumed
+    attach_journals(game, part=saved)
+    game.add_log("💾 Game resumed")
+    st.session_state.game = game
+    st.session_state.orders = []
+    st.session_state.moves_base = saved
+    st.session_state.saved_moves = 0
+    st.session_state.show_move = False
+    st.session_state.show_attack = False
+    st.rerun()
+
+def saved_games_panel():
+    """Sidebar list of saved games to resume"""
+    st.subheader("💾 Saved Games")
+    st.caption(f"This game autosaves as {st.session_state.game.game_id[:8]}")
+    games = game_store().list_games()
+    if not games:
+        return
+    labels = {g["game_id"]: f"{g['game_id'][:8]} • turn {g['turn']} • {g['phase']}" for g in games}
+    choice = st.selectbox("Resume a game", list(labels), format_func=labels.get)
+    if st.button("▶️ Resume", use_container_width=True):
+        resume_game(choice)
+
+def online_room_panel():
+    """Sidebar controls for creating, joining and leaving a shared game room"""
+    from realm.game_client import DEFAULT_PORT, RoomClient, RoomError  # the client alone; no server or SQLite
+    room = st.session_state.room
+    st.subheader("🌐 Online Room")
+    if room is not None:
+        seat = f"Player {room.seat}" if room.seat else "Spectator"
+        st.markdown(f"Room **{room.room}** • {seat} • v{room.version}")
+        cols = st.columns(2)
+        if cols[0].button("🔄 Refresh", use_container_width=True):
+            st.rerun()
+        if cols[1].button("🚪 Leave", use_container_width=True):
+            room.close()
+            st.session_state.room = None
+            del st.session_state.game
+            st.rerun()
+        return
+    server = st.text_input("Server", value=f"127.0.0.1:{DEFAULT_PORT}")
+    host, _, port = server.rpartition(":")
+    code = st.text_input("Room code")
+    cols = st.columns(2)
+    try:
+        if cols[0].button("Create room", use_container_width=True):
+            client = RoomClient(host, int(port))
+            client.create()
+            enter_room(client)
+        if cols[1].button("Join", use_container_width=True, disabled=not code):
+            client = RoomClient(host, int(port))
+            client.join(code.strip())
+            enter_room(client)
+    except (RoomError, OSError, ValueError) as exc:
+        st.error(f"Could not reach the room: {exc}")
+
+def waiting_for_room():
+    """Show whose move it is and poll the room until something changes"""
+    game = st.session_state.game
+    if game.phase == 'setup':
+        st.info("⏳ Waiting for the host to start the game...")
+    else:
+        st.info(f"⏳ Waiting for {game.players[game.current_player].name} ({game.phase} phase)...")
+
+    @st.fragment(run_every=ROOM_POLL_SECONDS)
+    def poll():
+        from realm.game_client import RoomError
+        try:
+            changed = st.session_state.room.sync()
+        except (RoomError, OSError):
+            return
+        if changed:
+            st.rerun()
+
+    poll()
 
 def setup_phase():
     """Handle game setup"""
@@ -204,6 +349,14 @@ def setup_phase():
         
     with col2:
         p2_name = st.text_input("Player 2 Name", value="Blue Kingdom")
+        computer = st.checkbox(f"🤖 Computer plays {p2_name}", disabled=st.session_state.room is not None)
+        budget = st.slider("Computer thinking time per turn (seconds)", 0.5, 10.0, 2.0, 0.5, disabled=not computer)
+    # Widget values vanish once setup is gone, keep the choice in plain session keys
+    st.session_state.computer_player = COMPUTER_SEAT if computer else None
+    st.session_state.computer_budget = budget
+    
+    if st.session_state.room is None:
+        generated_map_options()
     
     st.markdown("---")
     st.markdown("**To determine who goes first, each player must state when they last spent money in real life.**")
@@ -219,16 +372,24 @@ def setup_phase():
         if st.button(f"{p2_name} Goes First", use_container_width=True):
             start_game(p1_name, p2_name, 2)
 
+def generated_map_options():
+    """Swap the bundled map for a procedurally generated one before the game starts"""
+    with st.expander("🗺️ Play on a generated map"):
+        cols = st.columns(2)
+        territories = cols[0].number_input("Territories", min_value=10, max_value=20000, value=200, step=50)
+        seed = cols[1].number_input("Seed", min_value=0, max_value=2**31 - 1, value=0)
+        if st.button("Generate map"):
+            from realm import map_generator
+            with st.spinner(f"Generating {territories} territories..."):
+                begin_local_game(map_generator.new_game(int(territories), int(seed)))
+            st.rerun()
+
 def start_game(p1_name: str, p2_name: str, first_player: int):
     """Start the game with chosen player order"""
-    game = st.session_state.game
-    game.players[1].name = p1_name
-    game.players[2].name = p2_name
-    game.current_player = first_player
-    game.phase = 'movement'
-    
-    add_log(f"🎯 {game.players[first_player].name} wins the Commissioner's Bonus!")
-    add_log("⚔️ Game begins! Movement phase started.")
+    if st.session_state.room is not None:
+        room_act("start", p1_name, p2_name, first_player)
+    else:
+        engine.start_game(st.session_state.game, p1_name, p2_name, first_player)
     # Reset movement and attack UI
     st.session_state.show_move = False
     st.session_state.show_attack = False
@@ -251,8 +412,12 @@ def movement_phase():
         selected_territory = game.territories[game.selected_territory]
         st.info(f"📍 Selected: {selected_territory.name} ({game.selected_territory.upper()}) • {selected_territory.units} units")
     
+    queue_mode = st.toggle("📋 Queue orders", key="queue_orders",
+                           help="Stage several moves and attacks, check the projected board, then commit them at once")
+    if queue_mode:
+        order_queue_panel()
     # Show actions immediately for selected node
-    if game.selected_territory:
+    elif game.selected_territory:
         selected = game.territories[game.selected_territory]
         if selected.owner == game.current_player and selected.units > 1:
             cols = st.columns(2)
@@ -267,6 +432,73 @@ def movement_phase():
     if st.button("🔄 End Turn"):
         end_movement_phase()
 
+@st.fragment
+def order_queue_panel():
+    """Stage orders against the projected board and commit them in one engine pass.
+
+    Runs as a fragment, so staging or dropping an order reruns only this
+    panel; the whole app reruns once, when the orders are committed.
+    """
+    from realm import orders
+    game = st.session_state.game
+    staged = st.session_state.orders
+    try:
+        board = orders.project(game, staged)
+    except ValueError as exc:
+        # The game changed under the queue (another seat moved, or a new game)
+        st.warning(f"Dropped the staged orders: {exc}")
+        staged.clear()
+        board = orders.project(game, staged)
+
+    sources = orders.ready_sources(game, board)
+    if sources:
+        source_labels = {f"{game.territories[tid].name} ({tid.upper()}) • {board.units[game.store.index[tid]]} units": tid
+                         for tid in sources}
+        labels = list(source_labels)
+        default = sources.index(game.selected_territory) if game.selected_territory in sources else 0
+        source_id = source_labels[st.selectbox("From:", labels, index=default, key="order_source")]
+        src = game.store.index[source_id]
+        max_units = int(board.units[src]) - 1
+        target_labels = {}
+        for kind, tid, hops in orders.order_targets(game, board, source_id, MARCH_OPTIONS_SHOWN):
+            j = game.store.index[tid]
+            owner, units = int(board.owner[j]), int(board.units[j])
+            if kind == 'march':
+                label = f"🥾 {game.territories[tid].name} ({tid.upper()}) - {hops} hops ({units} units)"
+            elif owner == game.current_player:
+                label = f"🚶 {game.territories[tid].name} ({tid.upper()}) - Friendly ({units} units)"
+            else:
+                rule = 'neutral' if owner == 0 else 'pvp'
+                odds = combat_odds(rule, max_units, units)
+                label = (f"⚔️ {game.territories[tid].name} ({tid.upper()}) - {rule.title()} ({units} units)"
+                         f" • {odds.p_conquer:.0%} with {max_units}")
+            target_labels[label] = (kind, tid)
+        kind, target_id = target_labels[st.selectbox("To:", list(target_labels), key="order_target")]
+        units = max_units
+        if max_units > 1:
+            units = st.slider("Units:", 1, max_units, min(3, max_units), key="order_units")
+        # Callbacks run before the rerun they trigger, so the new order shows up right away
+        st.button(f"➕ Stage {units} units", on_click=staged.append, args=((kind, source_id, target_id, units),))
+    else:
+        st.info("No territory would have units left to order.")
+
+    if not staged:
+        return
+    st.markdown(f"**📋 {len(staged)} staged orders**")
+    for number, (kind, from_id, to_id, units) in enumerate(staged, 1):
+        verb = "March" if kind == 'march' else "Send"
+        st.caption(f"{number}. {verb} {units} from {game.territories[from_id].name} to {game.territories[to_id].name}")
+    projected = []
+    for tid in orders.changed_territories(game, board):
+        now, j = game.territories[tid], game.store.index[tid]
+        projected.append(f"{now.name}: P{now.owner} {now.units} → P{board.owner[j]} {board.units[j]}")
+    st.caption("Projected: " + " • ".join(projected))
+    cols = st.columns(3)
+    if cols[0].button(f"✅ Commit {len(staged)} orders", type="primary"):
+        commit_orders()
+    cols[1].button("↩️ Undo last", on_click=staged.pop)
+    cols[2].button("🗑️ Clear", on_click=staged.clear)
+
 def show_movement_options(from_territory_id: str):
     """Show movement options for selected territory"""
     game = st.session_state.game
@@ -327,6 +559,32 @@ def show_movement_options(from_territory_id: str):
             if st.button("✅ Move 1 unit"):
                 move_units(from_territory_id, destination_id, 1)
 
+    show_march_options(from_territory_id)
+
+def show_march_options(from_territory_id: str):
+    """Offer multi-hop marches to friendly territories beyond the adjacent ones"""
+    game = st.session_state.game
+    source = game.territories[from_territory_id]
+    # Adjacent territories are already covered by the plain move above
+    destinations = engine.march_destinations(game, from_territory_id, MARCH_OPTIONS_SHOWN)
+    if not destinations:
+        return
+    march_options = {}
+    for tid, hops in destinations:
+        territory = game.territories[tid]
+        march_options[f"{territory.name} ({tid.upper()}) - {hops} hops ({territory.units} units)"] = tid
+    st.markdown("**🥾 March to**")
+    dest_label = st.selectbox("Friendly destination:", list(march_options.keys()), key="march_select")
+    destination_id = march_options[dest_label]
+    max_units = source.units - 1
+    units_to_march = max_units
+    if max_units > 1:
+        units_to_march = st.slider("Units to march:", 1, max_units, max_units, key="march_slider")
+    route = engine.march_path(game, from_territory_id, destination_id)
+    st.caption(" → ".join(game.territories[tid].name for tid in route))
+    if st.button(f"🥾 March {units_to_march} units"):
+        march_units(from_territory_id, destination_id, units_to_march)
+
 def show_attack_options(from_territory_id: str):
     """Show attack options for selected territory (neutral or hostile)"""
     game = st.session_state.game
@@ -343,10 +601,13 @@ def show_attack_options(from_territory_id: str):
         st.session_state.show_attack = False
         return
     st.subheader(f"🗡️ Attack from {source.name}")
+    max_units = source.units - 1  # leave one behind
     options = {}
     for tid, territory in attack_targets:
         status = "Neutral" if territory.owner == 0 else "Hostile"
-        label = f"{territory.name} ({territory.id.upper()}) - {status} ({territory.units} units)"
+        odds = combat_odds(combat_rule(territory), max_units, territory.units)
+        label = (f"{territory.name} ({territory.id.upper()}) - {status} ({territory.units} units)"
+                 f" • {odds.p_conquer:.0%} with {max_units}")
         options[label] = tid
     # Select target
     selected_label = st.selectbox(
@@ -355,8 +616,8 @@ def show_attack_options(from_territory_id: str):
         key="attack_select"
     )
     destination_id = options[selected_label]
+    target = game.territories[destination_id]
     # Choose number of units to attack with
-    max_units = source.units - 1  # leave one behind
     if max_units > 1:
         units_to_attack = st.slider(
             "Units to attack with:",
@@ -365,136 +626,78 @@ def show_attack_options(from_territory_id: str):
             value=min(3, max_units),
             key="attack_units_slider"
         )
+        show_odds(target, units_to_attack)
         if st.button(f"⚔️ Attack {units_to_attack} units"):
             move_units(from_territory_id, destination_id, units_to_attack)
     elif max_units == 1:
+        units_to_attack = 1
+        show_odds(target, 1)
         if st.button("⚔️ Attack with 1 unit"):
             move_units(from_territory_id, destination_id, 1)
+    else:
+        return
+    if st.button("🔮 Preview a roll", help="Play this attack once with throwaway dice; the game is not changed"):
+        show_attack_preview(from_territory_id, destination_id, units_to_attack)
+
+def show_attack_preview(from_id: str, to_id: str, num_units: int):
+    """Play the attack on a copy-on-write branch with fresh dice and show how it went"""
+    from realm import cow_state
+    game = st.session_state.game
+    version, result = cow_state.preview(game, engine.apply_move, from_id, to_id, num_units)
+    target = game.territories[to_id]
+    if result.success:
+        _, garrison = version.territory(target.index)
+        st.caption(f"🔮 One possible roll: {target.name} falls and {garrison} units garrison it")
+    else:
+        st.caption(f"🔮 One possible roll: the attack fails and {result.units_lost} units are lost")
+
+def combat_rule(target) -> str:
+    """Which combat rule applies when attacking target"""
+    return 'neutral' if target.owner == 0 else 'pvp'
+
+def show_odds(target, attackers: int):
+    """Show exact battle odds from the precomputed table"""
+    odds = combat_odds(combat_rule(target), attackers, target.units)
+    st.caption(
+        f"🎯 Conquer chance {odds.p_conquer:.0%} • expected survivors {odds.expected_survivors:.1f}"
+        f" • expected losses {odds.expected_losses:.1f}"
+    )
 
 def move_units(from_id: str, to_id: str, num_units: int):
     """Move units between territories"""
     game = st.session_state.game
-    source = game.territories[from_id]
-    destination = game.territories[to_id]
-    
-    if destination.owner == 0:
-        # Moving to neutral territory = attack
-        add_log(f"⚔️ {game.players[game.current_player].name} attacks {destination.name} with {num_units} units!")
-        combat_result = resolve_neutral_combat(num_units, destination.units)
-        
-        if combat_result['success']:
-            # Conquer territory
-            destination.owner = game.current_player
-            destination.units = combat_result['surviving_attackers']
-            source.units -= num_units
-            add_log(f"🏰 {destination.name} conquered! {destination.units} units garrison.")
-            # Continue from new territory
-            game.selected_territory = destination.id
-            st.session_state.show_move = True
-        else:
-            # Attack failed
-            source.units -= combat_result['units_lost']
-            add_log(f"💔 Attack on {destination.name} failed! Lost {combat_result['units_lost']} units.")
-            # If still movable, stay on same source
-            if source.units > 1:
-                st.session_state.show_move = True
-            
-    elif destination.owner == game.current_player:
-        # Moving to own territory = reinforcement
-        destination.units += num_units
-        source.units -= num_units
-        add_log(f"🚶 Moved {num_units} units from {source.name} to {destination.name}")
-        # Update selection to the destination for QoL and highlight
-        game.selected_territory = destination.id
+    if st.session_state.room is not None:
+        result = room_act("move", from_id, to_id, num_units)
+        if result is not None:
+            game.selected_territory = result["selected"]
+            st.session_state.show_move = result["can_continue"]
+    elif engine.apply_move(game, from_id, to_id, num_units).can_continue:
         st.session_state.show_move = True
-    
+    st.rerun()
+
+def march_units(from_id: str, to_id: str, num_units: int):
+    """March units through friendly territory to a distant one"""
+    game = st.session_state.game
+    if st.session_state.room is not None:
+        result = room_act("march", from_id, to_id, num_units)
+        if result is not None:
+            game.selected_territory = result["selected"]
     else:
-        # Attack enemy territory
-        add_log(f"⚔️ {game.players[game.current_player].name} attacks {destination.name} with {num_units} units!")
-        combat_result = resolve_pvp_combat(num_units, destination.units)
-        
-        if combat_result['success']:
-            # Victory! Move surviving units to conquer territory
-            surviving_units = combat_result['surviving_attackers']
-            destination.units = surviving_units
-            destination.owner = game.current_player
-            source.units -= num_units
-            add_log(f"🏰 Conquered {destination.name} with {surviving_units} units!")
-            
-            # If any units left, allow continued movement
-            if surviving_units > 1:
-                game.selected_territory = destination.id
-                st.session_state.show_move = True
-        else:
-            # Defeat, units are lost
-            source.units -= combat_result['units_lost']
-            add_log(f"💔 Attack on {destination.name} failed! Lost {combat_result['units_lost']} units.")
-            # If still movable, stay on same source
-            if source.units > 1:
-                st.session_state.show_move = True
-    
+        engine.march(game, from_id, to_id, num_units)
     st.rerun()
 
-def resolve_neutral_combat(attacking_units: int, defending_units: int):
-    """Resolve combat against neutral territory"""
-    defeated_defenders = 0
-    units_lost = 0
-    
-    for i in range(attacking_units):
-        roll = random.randint(1, 6)
-        add_log(f"🎲 Unit {i+1} rolls {roll}")
-        
-        if roll >= 3:  # Success
-            defeated_defenders += 1
-            add_log(f"✅ Unit succeeds!")
-            
-            if defeated_defenders >= defending_units:
-                # Territory conquered!
-                surviving_attackers = attacking_units - i
-                return {
-                    'success': True,
-                    'surviving_attackers': surviving_attackers,
-                    'units_lost': i
-                }
-        else:
-            # Unit dies
-            units_lost += 1
-            add_log(f"💀 Unit dies in combat!")
-    
-    # Attack failed
-    return {
-        'success': False,
-        'surviving_attackers': 0,
-        'units_lost': units_lost
-    }
-
-def resolve_pvp_combat(attacking_units: int, defending_units: int):
-    """Resolve player vs player combat"""
-    # Simplified combat resolution: higher total wins
-    attack_roll = sum(random.randint(1, 6) for _ in range(attacking_units))
-    defense_roll = sum(random.randint(1, 6) for _ in range(defending_units))
-    
-    add_log(f"⚔️ Combat: {attacking_units}v{defending_units} - Rolls: {attack_roll} vs {defense_roll}")
-    
-    if attack_roll > defense_roll:
-        # Attackers win
-        units_lost = defending_units  # All defenders are lost
-        surviving_attackers = attacking_units - units_lost  # Assume equal loss
-        add_log(f"✅ Attack successful! Defenders lose all {units_lost} units.")
-        return {
-            'success': True,
-            'surviving_attackers': surviving_attackers,
-            'units_lost': units_lost
-        }
+def commit_orders():
+    """Resolve every staged order in one engine pass and rerun the app once"""
+    game = st.session_state.game
+    staged = list(st.session_state.orders)
+    st.session_state.orders.clear()
+    if st.session_state.room is not None:
+        result = room_act("orders", [list(order) for order in staged])
+        if result is not None:
+            game.selected_territory = result["selected"]
     else:
-        # Defenders win or tie
-        units_lost = attacking_units  # All attackers are lost
-        add_log(f"💔 Attack failed! {units_lost} attackers lost.")
-        return {
-            'success': False,
-            'surviving_attackers': 0,
-            'units_lost': units_lost
-        }
+        engine.apply_orders(game, staged)
+    st.rerun()
 
 def attack_neutral_territory(from_territory_id: str):
     """Attack a neutral territory (legacy function, now handled by move_units)"""
@@ -503,10 +706,11 @@ def attack_neutral_territory(from_territory_id: str):
 
 def end_movement_phase():
     """End movement phase and move to reinforcement"""
-    game = st.session_state.game
-    game.phase = 'reinforcement'
-    add_log(f"🔄 {game.players[game.current_player].name} ends movement phase")
-    add_log("🎲 Time to roll for reinforcements!")
+    st.session_state.orders.clear()  # uncommitted orders do not carry over
+    if st.session_state.room is not None:
+        room_act("end")
+    else:
+        engine.end_movement(st.session_state.game)
     st.rerun()
 
 def reinforcement_phase():
@@ -516,23 +720,70 @@ def reinforcement_phase():
     st.header(f"🎲 {game.players[game.current_player].name}'s Reinforcement Phase")
     
     if st.button("🎯 Roll for Reinforcements"):
-        roll = random.randint(1, 6)
-        add_log(f"🎲 Reinforcement roll: {roll}")
-        
-        if roll == 6:
-            hq_id = game.players[game.current_player].hq_territory
-            game.territories[hq_id].units += 2
-            add_log(f"🎉 Rolled a 6! +2 units added to {game.territories[hq_id].name}")
+        if st.session_state.room is not None:
+            room_act("reinforce")
         else:
-            add_log("😐 No reinforcements this turn")
-        
-        # End turn
-        game.current_player = 1 if game.current_player == 2 else 2
-        game.phase = 'movement'
-        game.turn_count += 1
-        add_log(f"🆕 {game.players[game.current_player].name}'s turn begins!")
+            engine.reinforce(game)
         st.rerun()
 
+@st.cache_resource
+def computer_executor() -> ThreadPoolExecutor:
+    """One search thread shared by every session; the search itself fans out to the MCTS process pool"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcts")
+
+def computer_turn():
+    """Let the MCTS opponent play its turn, one searched move per rerun.
+
+    Each move is searched on a clone of the game in a background thread, so the
+    rerun that starts a search returns at once; a fragment polls the search and
+    the script thread applies the move it picks. A search that finishes after the
+    board changed under it (e.g. an undo) is discarded and started again.
+    """
+    game = st.session_state.game
+    name = game.players[game.current_player].name
+    if game.phase != 'movement':
+        engine.reinforce(game)
+        game.selected_territory = None
+        st.rerun()
+    from realm import ai_mcts  # pulls in multiprocessing; only games with a computer seat need it
+    config = ai_mcts.MCTSConfig(turn_budget=st.session_state.computer_budget)
+    board = render_cache.fingerprint(game.game_id, game.turn_count, game.store.owner, game.store.units)
+    plan = st.session_state.get("computer_plan")
+    if plan is None or plan["turn"] != (game.game_id, game.turn_count):
+        plan = st.session_state.computer_plan = {"turn": (game.game_id, game.turn_count), "started": time.time(),
+                                                 "depth": 0, "future": None, "board": None}
+    future = plan["future"]
+    if future is not None and future.done():
+        plan["future"] = None
+        if plan["board"] == board:
+            action = future.result().action
+            if action == ai_mcts.END:
+                plan["depth"] = config.max_actions
+            else:
+                engine.apply_move(game, *action[1:])
+                plan["depth"] += 1
+                game.selected_territory = None
+                st.rerun()
+    if plan["future"] is None:
+        remaining = config.turn_budget - (time.time() - plan["started"])
+        if plan["depth"] >= config.max_actions or remaining <= 0 or not engine.legal_moves(game):
+            del st.session_state.computer_plan
+            engine.end_movement(game)
+            engine.reinforce(game)
+            game.selected_territory = None
+            st.rerun()
+        budget = ai_mcts.decision_budget(remaining, plan["depth"], config)
+        plan["future"] = computer_executor().submit(ai_mcts.choose_action, game.clone(), budget, config)
+        plan["board"] = board
+    st.info(f"🤖 {name} is thinking...")
+
+    @st.fragment(run_every=COMPUTER_POLL_SECONDS)
+    def poll():
+        if plan["future"] is None or plan["future"].done():
+            st.rerun()
+
+    poll()
+
 def display_game_info():
     """Display current game information in sidebar"""
     game = st.session_state.game
@@ -543,10 +794,9 @@ def display_game_info():
         # Player info with colored badges
         for player_id, player in game.players.items():
             st.subheader(f"{player.name}")
-            total_units = sum(t.units for t in game.territories.values() if t.owner == player_id)
-            territories_owned = len([t for t in game.territories.values() if t.owner == player_id])
+            stats = game.player_stats(player_id)
             color_class = 'friendly' if player_id == 1 else 'enemy'
-            st.markdown(f"<span class='badge {color_class}'>Units: {total_units}</span> &nbsp; <span class='badge {color_class}'>Territories: {territories_owned}</span>", unsafe_allow_html=True)
+            st.markdown(f"<span class='badge {color_class}'>Units: {stats.units}</span> &nbsp; <span class='badge {color_class}'>Territories: {stats.territories}</span> &nbsp; <span class='badge {color_class}'>Frontier: {stats.frontier}</span>", unsafe_allow_html=True)
             
         st.markdown("---")
         
@@ -554,47 +804,133 @@ def display_game_info():
         st.subheader("📜 Game Log")
         log_container = st.container()
         with log_container:
-            # Show last 12 messages in descending order (latest first)
-            safe_lines = [html.escape(m) for m in list(reversed(game.game_log[-12:]))]
+            # Show the latest messages first; only these are rendered to text
+            safe_lines = [html.escape(m) for m in reversed(game.game_log.tail(LOG_LINES_SHOWN))]
             st.markdown("<div class='game-log'>" + "<br>".join(safe_lines) + "</div>", unsafe_allow_html=True)
 
+        st.checkbox("🖼️ Draw the map in the browser", value=True, key="client_map",
+                    help="Send only territory overlays each rerun instead of a full map image")
+        if not st.session_state.client_map:
+            encoding = st.selectbox("Map image encoding", list(render_cache.ENCODINGS), key="map_encoding")
+            st.slider("Image quality", 30, 95, render_cache.DEFAULT_QUALITY, 5, key="map_quality",
+                      disabled=encoding not in ("webp", "jpeg"))
+
+        st.markdown("---")
+        online_room_panel()
+        if st.session_state.room is None:
+            st.markdown("---")
+            saved_games_panel()
+
+def rerun_timings() -> Timings:
+    """This session's rerun timings; tracing follows the Debug Info toggle"""
+    if 'timings' not in st.session_state:
+        st.session_state.timings = Timings()
+    timings = st.session_state.timings
+    timings.tracing = st.session_state.get("trace_spans", False)
+    return timings
+
+def show_timings(timings: Timings):
+    """Rolling per-stage rerun timings and Chrome trace export"""
+    # A markdown table rather than st.table, which would import pandas and pyarrow on the first rerun
+    rows = [f"| {s.name} | {s.count} | {s.last_ms:.2f} | {s.p50_ms:.2f} | {s.p95_ms:.2f} |" for s in timings.summary()]
+    st.markdown("**⏱️ Rerun timings** (ms, last %d reruns)\n\n" % timings.window
+                + "| stage | runs | last | p50 | p95 |\n|---|---:|---:|---:|---:|\n" + "\n".join(rows))
+    st.checkbox("Record a Chrome trace of every span", key="trace_spans")
+    if timings.trace_events and st.button("💾 Export trace"):
+        path = os.path.join(TRACE_DIR, f"{st.session_state.game.game_id[:8]}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        timings.export_chrome_trace(path)
+        st.success(f"Wrote {timings.trace_events} spans to {path} (open in chrome://tracing or Perfetto)")
+
+def image_coordinates_component():
+    """streamlit_image_coordinates, imported on first use; None when it is not installed"""
+    try:
+        from streamlit_image_coordinates import streamlit_image_coordinates
+    except Exception:
+        return None
+    return streamlit_image_coordinates
+
 def main():
     """Main game function"""
-    init_game_state()
-    inject_theme_css()
+    timings = rerun_timings()
+    with timings.span("rerun"):
+        render_app(timings)
+
+def render_app(timings: Timings):
+    """One rerun of the app, with each stage timed"""
+    with timings.span("load_assets"):
+        load_assets()
+    with timings.span("init_game_state"):
+        init_game_state()
+    with timings.span("inject_theme_css"):
+        inject_theme_css()
     
     st.title("⚔️ Conquest of the Realm")
     
+    room = st.session_state.room
+    if room is not None:
+        # Pick up whatever the other seat did since this session last looked
+        from realm.game_client import RoomError
+        with timings.span("room_sync"):
+            try:
+                room.sync()
+            except (RoomError, OSError) as exc:
+                st.session_state.room_error = str(exc)
+        if 'room_error' in st.session_state:
+            st.warning(f"Room: {st.session_state.pop('room_error')}")
     game = st.session_state.game
+    with timings.span("persist"):
+        # Events logged by the action that triggered this rerun go to disk now
+        game.flush()
+        if room is None:
+            autosave(game)
     
-    # Display game map smaller and clickable if extension is available
-    map_img, positions = create_map_with_overlays(game)
     coords = None
-    if streamlit_image_coordinates:
-        coords = streamlit_image_coordinates(map_img, key="map_click")
-    else:
-        st.image(map_img, caption="Realm Map", use_container_width=True)
-    # If clicked, find nearest territory within its radius and select it
+    with timings.span("map_render"):
+        if st.session_state.get("client_map", True):
+            # The browser keeps the base map cached and draws the overlay itself
+            image = map_component.publish_base_map(game.game_map.image)
+            if image is None and game.game_map.image:
+                st.warning(f"⚠️ {os.path.basename(game.game_map.image)} not found! Drawing territories only.")
+            rows, layout = map_overlay(game)
+            coords = map_component.realm_map(image, 720, 360, rows, game.selected_territory, key="map_overlay")
+        else:
+            # Display game map smaller and clickable if extension is available
+            map_img, layout = encoded_map(game, st.session_state.get("map_encoding", "png"),
+                                          st.session_state.get("map_quality", render_cache.DEFAULT_QUALITY))
+            streamlit_image_coordinates = image_coordinates_component()
+            if streamlit_image_coordinates:
+                # The bytes are passed through untouched; browsers sniff WebP despite the PNG data-URL type
+                image_format = "JPEG" if map_img.encoding == "jpeg" else "PNG"
+                coords = streamlit_image_coordinates(map_img, key="map_click", image_format=image_format)
+            else:
+                st.image(map_img.data, caption="Realm Map", use_container_width=True)
+    # If clicked, select the nearest territory whose circle contains the click
     if coords and isinstance(coords, dict) and "x" in coords and "y" in coords:
-        x = coords["x"]
-        y = coords["y"]
-        for tid, p in positions.items():
-            dx = x - p["cx"]
-            dy = y - p["cy"]
-            if dx*dx + dy*dy <= p["r"]*p["r"]:
+        # The component keeps returning its last click; act on each click only once
+        click = coords.get("time")
+        if click is None or click != st.session_state.get("last_map_click"):
+            st.session_state.last_map_click = click
+            with timings.span("hit_test"):
+                tid = layout.find(coords["x"], coords["y"])
+            if tid is not None:
                 game.selected_territory = tid
-                break
     
     # Display game information
-    display_game_info()
+    with timings.span("display_game_info"):
+        display_game_info()
     
     # Handle game phases
-    if game.phase == 'setup':
-        setup_phase()
-    elif game.phase == 'movement':
-        movement_phase()
-    elif game.phase == 'reinforcement':
-        reinforcement_phase()
+    with timings.span("phase_handler"):
+        if room is not None and not room.is_my_turn():
+            waiting_for_room()
+        elif game.phase != 'setup' and game.current_player == st.session_state.computer_player:
+            computer_turn()
+        elif game.phase == 'setup':
+            setup_phase()
+        elif game.phase == 'movement':
+            movement_phase()
+        elif game.phase == 'reinforcement':
+            reinforcement_phase()
     
     # Debug info (remove in production)
     with st.expander("🔧 Debug Info"):
@@ -602,6 +938,13 @@ def main():
         st.write("Current Player:", game.current_player)
         st.write("Selected Territory:", game.selected_territory)
         st.write("Turn Count:", game.turn_count)
+        if st.checkbox("Verify player stats against a full recount", key="verify_stats"):
+            try:
+                game.check_stats()
+                st.success("Player stats match a full recount.")
+            except AssertionError as exc:
+                st.error(f"Player stats out of sync: {exc}")
+        show_timings(timings)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
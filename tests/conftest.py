@@ -0,0 +1,23 @@
+import random
+
+import pytest
+
+from realm import engine, policies
+from realm.state import GameState
+
+
+@pytest.fixture
+def started_game() -> GameState:
+    game = GameState(seed=7)
+    engine.start_game(game, "Red", "Blue", 1)
+    return game
+
+
+@pytest.fixture
+def play():
+    """play(game, turns, seed=0): whole turns (movement and reinforcement) by the random policy"""
+    def play_turns(game: GameState, turns: int, seed: int = 0):
+        rng = random.Random(seed)
+        for _ in range(turns):
+            policies.play_turn(game, policies.random_policy, rng)
+    return play_turns
@@ -0,0 +1,61 @@
+import pickle
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from realm import ai_mcts, engine
+from realm.state import GameState
+
+
+def started_game() -> GameState:
+    game = GameState(seed=7)
+    engine.start_game(game, "Red", "Blue", 1)
+    return game
+
+
+def test_started_game_pickles():
+    # Worker processes receive the search root by pickle
+    game = started_game()
+    copy = pickle.loads(pickle.dumps(game))
+    assert copy.current_player == game.current_player
+    assert (copy.store.owner == game.store.owner).all()
+    assert (copy.store.units == game.store.units).all()
+
+
+def test_choose_action_uses_worker_processes():
+    try:
+        decision = ai_mcts.choose_action(started_game(), 1.0, ai_mcts.MCTSConfig(workers=2))
+    finally:
+        ai_mcts.shutdown_pool()
+    assert decision.workers > 1
+    assert decision.simulations > 0
+
+
+def legal(game: GameState, action) -> bool:
+    return action == ai_mcts.END or action in ai_mcts.candidate_actions(game, 0, ai_mcts.MCTSConfig())
+
+
+def test_choose_action_without_a_pool_searches_in_process(monkeypatch):
+    def no_pool(workers=None):
+        raise BrokenProcessPool("no processes here")
+
+    monkeypatch.setattr(ai_mcts, "warm_up", no_pool)
+    game = started_game()
+    with pytest.warns(RuntimeWarning, match="unavailable"):
+        decision = ai_mcts.choose_action(game, 0.3, ai_mcts.MCTSConfig(workers=4))
+    assert decision.workers == 1
+    assert decision.simulations > 0
+    assert legal(game, decision.action)
+
+
+def test_choose_action_survives_a_pool_that_breaks(monkeypatch):
+    class BrokenPool:
+        def submit(self, *args):
+            raise BrokenProcessPool("a worker died")
+
+    monkeypatch.setattr(ai_mcts, "warm_up", lambda workers=None: BrokenPool())
+    game = started_game()
+    with pytest.warns(RuntimeWarning, match="broke"):
+        decision = ai_mcts.choose_action(game, 0.3, ai_mcts.MCTSConfig(workers=4))
+    assert decision.workers == 1
+    assert legal(game, decision.action)
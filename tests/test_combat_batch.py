@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from realm.combat_batch import MAX_DICE_PER_ARMY, resolve_neutral_batch, resolve_pvp_batch, roll_sums
+from realm.combat_odds import build_table
+
+BATTLES = 200_000
+# Batch means may differ from the exact values by at most this many standard errors
+SIGMAS = 5
+
+
+@pytest.fixture(scope="module")
+def table():
+    return build_table(80)
+
+
+def assert_matches_exact(result, odds):
+    for sample, exact in ((result.success, odds.p_conquer),
+                          (result.surviving_attackers, odds.expected_survivors),
+                          (result.units_lost, odds.expected_losses)):
+        tolerance = SIGMAS * sample.std() / np.sqrt(len(sample)) + 1e-9
+        assert abs(sample.mean() - exact) <= tolerance, (sample.mean(), exact, tolerance)
+
+
+@pytest.mark.parametrize("attackers, defenders", [(1, 0), (3, 0), (4, 2), (6, 5), (10, 10), (25, 12)])
+def test_neutral_batch_matches_exact_odds(table, attackers, defenders):
+    rng = np.random.default_rng(attackers * 100 + defenders)
+    result = resolve_neutral_batch(attackers, defenders, rng, size=BATTLES)
+    assert_matches_exact(result, table.lookup("neutral", attackers, defenders))
+
+
+# 70v68 goes through the multinomial path for both sides
+@pytest.mark.parametrize("attackers, defenders", [(1, 0), (3, 0), (3, 2), (5, 5), (12, 10), (70, 68)])
+def test_pvp_batch_matches_exact_odds(table, attackers, defenders):
+    rng = np.random.default_rng(attackers * 100 + defenders)
+    result = resolve_pvp_batch(attackers, defenders, rng, size=BATTLES)
+    assert_matches_exact(result, table.lookup("pvp", attackers, defenders))
+
+
+def test_multinomial_roll_sums_match_dice_moments():
+    # Armies above MAX_DICE_PER_ARMY draw face counts instead of single dice
+    units = MAX_DICE_PER_ARMY + 6
+    sums = roll_sums(np.full(BATTLES, units), np.random.default_rng(1))
+    assert abs(sums.mean() - 3.5 * units) <= SIGMAS * sums.std() / np.sqrt(BATTLES)
+    assert abs(sums.var() / (units * 35 / 12) - 1) < 0.02
+
+
+def test_mixed_batch_broadcasts_per_battle():
+    rng = np.random.default_rng(0)
+    result = resolve_neutral_batch(np.array([1, 5, 9]), np.array([0, 2, 30]), rng)
+    assert len(result) == 3
+    assert (result.surviving_attackers + result.units_lost <= np.array([1, 5, 9])).all()
+    assert not result.success[2]  # 9 rolls cannot clear 30 defenders
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from realm import engine, policies
+from realm.cow_state import Timeline
+from realm.replay import GameRecord
+
+TURNS = 10
+
+
+def state(game):
+    return game.store.owner.copy(), game.store.units.copy(), game.turn_count, game.phase, game.current_player
+
+
+def assert_state(game, expected):
+    owner, units, turn, phase, player = expected
+    assert (game.store.owner == owner).all()
+    assert (game.store.units == units).all()
+    assert (game.turn_count, game.phase, game.current_player) == (turn, phase, player)
+    assert game.store.stats_mismatches() == []
+
+
+def play_turn(game, rng):
+    policies.play_turn(game, policies.greedy_policy, rng)
+
+
+def test_undo_and_redo_walk_every_turn(started_game):
+    game = started_game
+    timeline = Timeline(game)
+    rng = random.Random(1)
+    states = [state(game)]
+    for _ in range(TURNS):
+        timeline.apply(play_turn, rng)
+        states.append(state(game))
+    for expected in reversed(states[:-1]):
+        assert timeline.undo()
+        assert_state(game, expected)
+    assert not timeline.undo()
+    for expected in states[1:]:
+        assert timeline.redo()
+        assert_state(game, expected)
+    assert not timeline.redo()
+
+
+def test_checkout_switches_between_branches(started_game):
+    game = started_game
+    timeline = Timeline(game)
+    timeline.apply(play_turn, random.Random(1))
+    fork = timeline.version
+    branches = []
+    for seed in (2, 3):
+        timeline.checkout(fork)
+        for _ in range(3):
+            timeline.apply(play_turn, random.Random(seed))
+        branches.append((timeline.version, state(game)))
+    assert (branches[0][1][0] != branches[1][1][0]).any() or (branches[0][1][1] != branches[1][1][1]).any()
+    for _ in range(2):
+        for version, expected in branches:
+            timeline.checkout(version)
+            assert_state(game, expected)
+    assert not timeline.can_undo
+
+
+def test_preview_leaves_the_game_untouched(started_game):
+    game = started_game
+    history = GameRecord.attach(game)
+    timeline = Timeline(game)
+    before = state(game)
+    rng, log = game.rng, game.game_log
+    dice, logged, recorded = rng.getstate(), log.total, len(history)
+    source, target, units = engine.legal_moves(game)[0]
+    src = game.store.index[source]
+
+    version, _ = timeline.preview(engine.apply_move, source, target, units)
+    assert version.territory(src) != (int(before[0][src]), int(before[1][src]))
+    assert_state(game, before)
+
+    def fails(g):
+        engine.apply_move(g, source, target, units)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        timeline.preview(fails)
+    assert_state(game, before)
+    assert game.rng is rng and game.game_log is log and game.history is history
+    assert rng.getstate() == dice and log.total == logged and len(history) == recorded
+    assert not timeline.can_undo and not timeline.can_redo
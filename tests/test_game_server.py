@@ -0,0 +1,88 @@
+import asyncio
+
+from realm import engine, game_client, game_server
+from realm.game_server import GameServer
+from realm.storage import GameStore
+
+
+async def play_a_move(server: GameServer):
+    """Create a room, fill both seats, start the game and make one move; returns the responses"""
+    queue: asyncio.Queue = asyncio.Queue()
+    created = await server.handle({"op": "create"}, queue)
+    room_id = created["room"]
+    joined = await server.handle({"op": "join", "room": room_id}, queue)
+    started = await server.handle({"op": "act", "room": room_id, "token": created["token"], "version": 0,
+                                   "action": ["start", "Red", "Blue", 1]}, queue)
+    await server.handle({"op": "subscribe", "room": room_id, "since": 1}, queue)
+    source, target, units = engine.legal_moves(server.rooms[room_id].game)[0]
+    moved = await server.handle({"op": "act", "room": room_id, "token": created["token"], "version": 1,
+                                 "action": ["move", source, target, units]}, queue)
+    return created, joined, started, moved, queue
+
+
+def test_create_join_act_and_conflicts():
+    async def scenario():
+        server = GameServer()
+        created, joined, started, moved, queue = await play_a_move(server)
+        room_id = created["room"]
+        game = server.rooms[room_id].game
+        assert created["seat"] == 1 and created["state"]["full"]
+        assert joined["seat"] == 2 and joined["token"] != created["token"]
+        spectator = await server.handle({"op": "join", "room": room_id}, queue)
+        assert spectator["seat"] == 0 and spectator["token"] is None
+        assert started["state"]["version"] == 1 and started["state"]["phase"] == "movement"
+
+        # The diff names exactly the territories the move changed, and subscribers get the same diff
+        assert moved["state"]["version"] == 2
+        assert moved["state"]["territories"]
+        for tid, (owner, units) in moved["state"]["territories"].items():
+            territory = game.territories[tid]
+            assert [territory.owner, territory.units] == [owner, units]
+        pushed = queue.get_nowait()
+        assert pushed["territories"] == moved["state"]["territories"]
+        assert pushed["log"] == moved["state"]["log"]
+
+        # An action against a stale version is refused with a diff that catches the client up
+        stale = await server.handle({"op": "act", "room": room_id, "token": created["token"], "version": 1,
+                                     "action": ["end"]}, queue)
+        assert stale["error"] == "conflict"
+        assert stale["state"]["version"] == 2
+        assert stale["state"]["territories"] == moved["state"]["territories"]
+        assert server.rooms[room_id].version == 2 and game.phase == "movement"
+
+        wrong_seat = await server.handle({"op": "act", "room": room_id, "token": joined["token"], "version": 2,
+                                          "action": ["end"]}, queue)
+        assert wrong_seat["error"] == "not your turn"
+        current = await server.handle({"op": "state", "room": room_id, "since": 2}, queue)
+        assert current["state"]["territories"] == {} and current["state"]["log"] == []
+        old = await server.handle({"op": "state", "room": room_id, "since": 0}, queue)
+        assert old["state"]["version"] == 2 and set(moved["state"]["territories"]) <= set(old["state"]["territories"])
+
+    asyncio.run(scenario())
+
+
+def test_evicted_room_reloads_from_the_database(tmp_path):
+    async def scenario():
+        store = GameStore(str(tmp_path / "rooms.db"))
+        try:
+            server = GameServer(store)
+            created, _, _, moved, queue = await play_a_move(server)
+            room_id = created["room"]
+            owner = server.rooms[room_id].game.store.owner.copy()
+            store.flush()  # saves are group-committed in the background
+            server.rooms.clear()  # as evict_idle would
+            state = await server.handle({"op": "state", "room": room_id, "since": 0}, queue)
+            assert state["state"]["version"] == 2
+            assert (server.rooms[room_id].game.store.owner == owner).all()
+            ended = await server.handle({"op": "act", "room": room_id, "token": created["token"], "version": 2,
+                                         "action": ["end"]}, queue)
+            assert ended["state"]["phase"] == "reinforcement"
+        finally:
+            store.close()
+
+    asyncio.run(scenario())
+
+
+def test_client_default_port_matches_the_server():
+    # The client keeps its own copy so importing it does not load the server
+    assert game_client.DEFAULT_PORT == game_server.DEFAULT_PORT
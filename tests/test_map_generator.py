@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pytest
+
+from realm.map_generator import generate_map, generated_map_path, new_game
+from realm.pathing import UNREACHABLE, bfs
+
+
+@pytest.mark.parametrize("territories, seed", [(2, 0), (50, 1), (400, 2), (3000, 3)])
+def test_generated_map_is_connected(territories, seed):
+    store = generate_map(territories, seed).store
+    distance, _ = bfs(store.indptr, store.indices, 0)
+    assert len(store.ids) == territories
+    assert not np.any(distance == UNREACHABLE)
+
+
+def test_cache_path_differs_per_option_set(tmp_path):
+    paths = {
+        generated_map_path(100, 4, str(tmp_path)),
+        generated_map_path(100, 4, str(tmp_path), spacing=30.0),
+        generated_map_path(100, 4, str(tmp_path), spacing=40.0),
+        generated_map_path(100, 4, str(tmp_path), aspect=2.0),
+        generated_map_path(100, 4, str(tmp_path), aspect=2.0, spacing=30.0),
+        generated_map_path(100, 5, str(tmp_path)),
+    }
+    assert len(paths) == 6
+    assert generated_map_path(100, 4, str(tmp_path), aspect=2.0, spacing=30.0) == \
+        generated_map_path(100, 4, str(tmp_path), spacing=30.0, aspect=2.0)
+
+
+def test_new_game_writes_cache_without_temporary_files(tmp_path):
+    game = new_game(80, seed=6, cache_dir=str(tmp_path))
+    path = generated_map_path(80, 6, str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(path),
+                                                   os.path.basename(path)[:-4] + ".png"])
+    assert game.game_map.image == os.path.splitext(path)[0] + ".png"
+    again = new_game(80, seed=6, cache_dir=str(tmp_path))
+    assert again.game_map.image == game.game_map.image
+    assert np.array_equal(again.game_map.store.owner, game.game_map.store.owner)
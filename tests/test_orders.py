@@ -0,0 +1,11 @@
+import pytest
+
+from realm import engine, orders
+from realm.state import GameState
+
+
+def test_orders_for_another_map_are_rejected():
+    game = GameState(seed=7)
+    engine.start_game(game, "Red", "Blue", 1)
+    with pytest.raises(ValueError, match="unknown territory"):
+        orders.project(game, [("move", "g1234", game.players[1].hq_territory, 1)])
@@ -0,0 +1,45 @@
+import numpy as np
+
+from realm.map_generator import generate_map
+from realm.pathing import UNREACHABLE, FriendlyComponents, bfs
+from realm.store import NUM_OWNERS
+
+
+def canonical(labels: np.ndarray) -> np.ndarray:
+    """Labels renamed to the first territory of each component, so labelings compare directly"""
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    return first[inverse]
+
+
+def test_incremental_components_match_a_rebuild():
+    store = generate_map(400, seed=11).store
+    friendly = store.friendly
+    rng = np.random.default_rng(2)
+    # Mostly two big owners, so changes both split and merge large components
+    for step in range(600):
+        i = int(rng.integers(len(store)))
+        store.set_owner(i, int(rng.choice(NUM_OWNERS, p=[0.1, 0.45, 0.45])))
+        fresh = FriendlyComponents(store.indptr, store.indices, store.owner)
+        assert (canonical(friendly.labels) == canonical(fresh.labels)).all(), step
+
+
+def test_paths_and_distances_match_bfs():
+    store = generate_map(400, seed=11).store
+    rng = np.random.default_rng(3)
+    for i in range(len(store)):
+        store.set_owner(i, int(rng.choice(NUM_OWNERS, p=[0.2, 0.4, 0.4])))
+    friendly = store.friendly
+    for step in range(200):
+        a, b = (int(x) for x in rng.integers(len(store), size=2))
+        if step % 2:
+            b = int(rng.choice(friendly.component(a)))  # a pair that is connected
+        dist, _ = bfs(store.indptr, store.indices, a, allowed=store.owner == store.owner[a])
+        assert (friendly.distances(a) == dist).all()
+        path = friendly.path(a, b)
+        if dist[b] == UNREACHABLE:
+            assert path is None
+            continue
+        assert len(path) == dist[b] + 1 and path[0] == a and path[-1] == b
+        assert (store.owner[path] == store.owner[a]).all()
+        for u, v in zip(path, path[1:]):
+            assert v in store.neighbors(u)
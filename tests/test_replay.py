@@ -0,0 +1,36 @@
+import random
+
+from realm import policies
+from realm.replay import GameRecord, load_record, seek_turn, state_at
+
+TURNS = 12
+
+
+def board(game):
+    return game.store.owner.copy(), game.store.units.copy(), game.turn_count, game.phase, game.current_player
+
+
+def assert_same(game, expected):
+    owner, units, turn, phase, player = expected
+    assert (game.store.owner == owner).all()
+    assert (game.store.units == units).all()
+    assert (game.turn_count, game.phase, game.current_player) == (turn, phase, player)
+
+
+def test_saved_record_replays_the_live_game(tmp_path, started_game):
+    game = started_game
+    live = GameRecord.attach(game, snapshot_every=7)
+    rng = random.Random(3)
+    turn_starts = {}
+    for _ in range(TURNS):
+        turn_starts[game.turn_count] = board(game)
+        policies.play_turn(game, policies.greedy_policy, rng)
+    path = str(tmp_path / "game.replay.gz")
+    live.save(path)
+
+    for record in (live, load_record(path)):
+        assert len(record) == len(live) > 2 * TURNS  # the greedy policy made moves, not just turn changes
+        assert len(record.snapshots) > 2  # seeks start from later snapshots too
+        assert_same(state_at(record), board(game))
+        for turn, expected in turn_starts.items():
+            assert_same(seek_turn(record, turn), expected)
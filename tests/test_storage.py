@@ -0,0 +1,34 @@
+import pytest
+
+from realm.replay import GameRecord
+from realm.storage import GameStore
+
+
+def test_saved_game_round_trips(tmp_path, started_game, play):
+    store = GameStore(str(tmp_path / "games.db"))
+    game = started_game
+    try:
+        GameRecord.attach(game)
+        play(game, 6)
+        saved = store.save_game(game)
+        store.flush()
+
+        record = store.load(game.game_id)
+        assert (record["snapshot"]["owner"] == game.store.owner).all()
+        assert (record["snapshot"]["units"] == game.store.units).all()
+        assert len(store.moves(game.game_id)) == saved == len(game.history)
+
+        resumed, version = store.resume(game.game_id)
+        assert version == len(game.history)
+        assert (resumed.store.owner == game.store.owner).all()
+        assert (resumed.store.units == game.store.units).all()
+        assert (resumed.turn_count, resumed.phase, resumed.current_player) == (
+            game.turn_count, game.phase, game.current_player)
+        assert [g["game_id"] for g in store.list_games()] == [game.game_id]
+    finally:
+        store.close()
+
+
+def test_in_memory_database_is_rejected():
+    with pytest.raises(ValueError):
+        GameStore(":memory:")
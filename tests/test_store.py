@@ -0,0 +1,24 @@
+import numpy as np
+
+from realm.map_generator import generate_map
+from realm.store import NUM_OWNERS, RECOUNT_TERRITORIES_PER_WRITE
+
+
+def test_counters_follow_random_updates():
+    store = generate_map(2000, seed=5).store
+    n = len(store)
+    recount_above = 1 + n // RECOUNT_TERRITORIES_PER_WRITE
+    rng = np.random.default_rng(0)
+    for step in range(400):
+        kind = step % 4
+        i = int(rng.integers(n))
+        if kind == 0:
+            store.set_owner(i, int(rng.integers(NUM_OWNERS)))
+        elif kind == 1:
+            store.set_units(i, int(rng.integers(1, 50)))
+        else:
+            # Bulk writes on both sides of the recount threshold
+            size = int(rng.integers(1, recount_above + 1)) if kind == 2 else int(rng.integers(recount_above + 1, 300))
+            indices = rng.choice(n, size, replace=False).tolist()
+            store.write(indices, rng.integers(NUM_OWNERS, size=size).tolist(), rng.integers(1, 50, size=size).tolist())
+        assert store.stats_mismatches() == [], step